@@ -0,0 +1,867 @@
+"""
+Parse- og ingest-laget bag superligadata.py: F24/F7/F70 → EventTable/MatchBundle → tabeller pr. kamp
+og parquet-artefakter. Kun rene funktioner (ingen st.*), så det kan køre i process-poolens workers.
+
+Ligger i sit eget modul fordi Streamlit giver __main__ et nyt modul-objekt ved hver kørsel af scriptet:
+funktioner og klasser herfra pickles som superliga_ingest.<navn> og er de samme objekter i alle sessioner.
+"""
+import logging
+import os
+import re
+import unicodedata
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from itertools import groupby
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# --- Navne: normalisering og FCK-aliaser -----------------------------------
+# Navne-normalisering er ren strengleg – memoiseres (begrænset) så hvert navn kun regnes én gang
+NAME_CACHE_MAX = 4096
+
+def normalize_team_name(name):
+    """Normalize all Sønderjyske variants to one club name."""
+    if not isinstance(name, str):
+        return name
+    return _normalize_team_name(name)
+
+@lru_cache(maxsize=NAME_CACHE_MAX)
+def _normalize_team_name(name: str) -> str:
+    raw = name.replace("\xa0", " ").strip()
+
+    direct = {
+        "Sønderjyske": "Sønderjyske",
+        "Sønderjyske Fodbold": "Sønderjyske",
+        "Sonderjyske": "Sønderjyske",
+        "Sonderjyske Fodbold": "Sønderjyske",
+    }
+    if raw in direct:
+        return direct[raw]
+
+    norm = unicodedata.normalize("NFKD", raw).encode("ascii", "ignore").decode("ascii")
+    norm = re.sub(r"\s+", " ", norm).strip().lower()
+
+    if norm in {
+        "sonderjyske",
+        "sonderjyske fodbold",
+    }:
+        return "Sønderjyske"
+
+    return raw
+
+TEAM_ALIASES = {
+    "FC København", "F.C. København", "FC Copenhagen", "F.C. Copenhagen",
+    "København", "Copenhagen"
+}
+
+def _is_fck(name: str) -> bool:
+    if not name: return False
+    return name in TEAM_ALIASES
+
+# --- Disk-artefakter: én parquet-fil pr. kamp og tabel ----------------------
+LOCAL_CACHE = Path("./data").resolve()
+
+# Parsede kampe/tabeller på disk (overlever genstart og st.cache_data.clear())
+ARTIFACT_CACHE = Path(os.getenv("FCK_ARTIFACT_CACHE") or (LOCAL_CACHE / "artifacts")).expanduser().resolve()
+
+SCHEMA_VER = 21  # cache-bust
+
+try:
+    import pyarrow  # noqa: F401  (parquet-engine)
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+def _artifact_path(table: str, fingerprint: str) -> Path:
+    return ARTIFACT_CACHE / f"v{SCHEMA_VER}" / table / f"{fingerprint}.parquet"
+
+def _artifact_io(path: Path, build) -> pd.DataFrame:
+    """Læs parquet-filen hvis den findes, ellers build() + atomisk skrivning. Ingen st.*-kald."""
+    if path.exists():
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            pass  # korrupt/halvskrevet fil → byg igen
+    df = build()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except Exception:
+        pass  # cache er best effort
+    return df
+
+# --- F70: xG, fase og qualifiers -------------------------------------------
+PHASE_LABELS = {
+    22: "Regular play",
+    23: "Fast break",
+    24: "Set piece",
+    25: "Corner",
+    26: "Freekick",
+    96: "Corner situation",
+    97: "Direct freekick",
+    160: "Throw in",
+    215: "Individual play",
+}
+
+# Mest specifik → mindst specifik (Regular play og Individual play håndteres særskilt)
+PHASE_SPECIFIC_PRIORITY = [25, 96, 97, 26, 24, 160, 23]
+
+def _pick_phase_from_qset(qset: set[int]) -> str:
+    # 1) specifikke faser først
+    for pid in PHASE_SPECIFIC_PRIORITY:
+        if pid in qset:
+            return PHASE_LABELS[pid]
+    # 2) Regular play (22) trumfer Individual play
+    if 22 in qset:
+        return PHASE_LABELS[22]
+    # 3) Individual play (215) kun hvis intet andet
+    if 215 in qset:
+        return PHASE_LABELS[215]
+    # 4) Fallback
+    return PHASE_LABELS[22]
+
+QUALIFIER_XG = 321  # F70 xG-værdi
+
+@dataclass(frozen=True)
+class F70Event:
+    """Ét F70-event: xG (sidste q321, som de gamle F70-læsere), fase og alle qualifier-id'er."""
+    id: str
+    event_id: str
+    xg: float | None
+    phase: str
+    qualifiers: frozenset
+
+@dataclass(frozen=True, eq=False)
+class F70Index:
+    """
+    F70 læst én gang. by_id: F24 id -> event, by_event_id: F70 event_id (ellers id) -> event
+    (ved dubletter vinder det sidste). Kun events med xG kommer med.
+    """
+    events: tuple = ()
+
+    @cached_property
+    def by_id(self) -> dict[str, F70Event]:
+        return {e.id: e for e in self.events if e.id}
+
+    @cached_property
+    def by_event_id(self) -> dict[str, F70Event]:
+        return {e.event_id or e.id: e for e in self.events if e.event_id or e.id}
+
+    @cached_property
+    def xg(self) -> dict[str, float]:
+        """F24 id -> xG (det opslag indkast-vinduet og xG-fanerne bruger)."""
+        return {eid: e.xg for eid, e in self.by_id.items()}
+
+    def __bool__(self) -> bool:
+        return bool(self.events)
+
+def build_f70_index(f70_path: Path | None) -> F70Index:
+    """Ét gennemløb af F70 → F70Index (tomt hvis filen mangler eller ikke kan læses)."""
+    if not (f70_path and Path(f70_path).exists()):
+        return F70Index()
+    events = []
+    try:
+        for ev in ET.parse(str(f70_path)).getroot().iter("Event"):
+            xg_val, qset = None, set()
+            for q in ev.iterfind("Q"):
+                qid = _safe_int(q.get("qualifier_id"), None)
+                if qid is None:
+                    continue
+                qset.add(qid)
+                if qid == QUALIFIER_XG:   # ved dubletter vinder den sidste
+                    xg_val = _safe_float(q.get("value", "0"))
+            if xg_val is None:
+                continue
+            events.append(F70Event(
+                id=ev.get("id") or "", event_id=ev.get("event_id") or "",
+                xg=xg_val, phase=_pick_phase_from_qset(qset), qualifiers=frozenset(qset),
+            ))
+    except (ET.ParseError, OSError):
+        return F70Index()
+    return F70Index(tuple(events))
+
+# --- F7 kampark ------------------------------------------------------------
+def _safe_int(val, default=0):
+    try:
+        return int(val)
+    except Exception:
+        return default
+
+def _safe_float(val):
+    try:
+        return float(val)
+    except Exception:
+        return None
+
+def _id_keys(uid: str, prefix: str) -> list[str]:
+    """'t420' → ['t420', '420'] (Opta-id'er bruges både med og uden præfiks)."""
+    if uid.startswith(prefix) and uid[1:].isdigit():
+        return [uid, uid[1:]]
+    return [uid] if uid else []
+
+@dataclass(frozen=True, eq=False)
+class MatchSheet:
+    """
+    F7 (srml matchresults) for én kamp. Id-maps har nøgler både med og uden præfiks
+    ('t420'/'420', 'p451555'/'451555').
+    """
+    team_names: dict = field(default_factory=dict)     # team_id -> navn (normaliseret)
+    team_shorts: dict = field(default_factory=dict)    # team_id -> kort navn
+    team_sides: dict = field(default_factory=dict)     # team_id -> "Home"/"Away"
+    players: dict = field(default_factory=dict)        # player_id -> navn
+    shirts: dict = field(default_factory=dict)         # player_id -> trøjenummer
+    lineup: dict = field(default_factory=dict)         # player_id -> {"team", "status", "position", "sub_position"}
+    substitutions: tuple = ()                          # ({"team", "period", "time", "off", "on"}, ...)
+    home: str | None = None                            # rå holdnavne + dato (header til kamplisten)
+    away: str | None = None
+    date: str | None = None
+
+def parse_match_sheet(f7_path: Path | None) -> MatchSheet:
+    """Parser F7 én gang → MatchSheet (tomt hvis filen mangler eller ikke kan læses)."""
+    if not (f7_path and Path(f7_path).exists()):
+        return MatchSheet()
+    try:
+        root = ET.parse(str(f7_path)).getroot()
+    except (ET.ParseError, OSError):
+        return MatchSheet()
+
+    team_names, team_shorts, players, raw_names = {}, {}, {}, {}
+    for team in root.iter("Team"):
+        uid = team.get("uID") or ""
+        raw = (team.findtext("Name") or "").strip()
+        raw_names[uid] = raw or None
+        name = normalize_team_name(raw or team.get("TeamName"))
+        short = (team.findtext("ShortName") or "").strip()
+        if name:
+            for key in _id_keys(uid, "t"):
+                team_names[key] = name
+                team_shorts[key] = normalize_team_name(short) if short else name
+        for p in team.findall("Player"):
+            pid = (p.get("uID") or p.get("uid") or "").strip()
+            person = p.find("PersonName")
+            first = known = last = ""
+            if person is not None:
+                first = (person.findtext("First") or "").strip()
+                known = (person.findtext("Known") or "").strip()
+                last  = (person.findtext("Last") or person.findtext("FamilyName") or "").strip()
+            pname = known or " ".join(x for x in [first, last] if x) or "Unknown"
+            for key in _id_keys(pid, "p"):
+                players[key] = pname
+
+    team_sides, shirts, lineup, subs, header = {}, {}, {}, [], {}
+    for td in root.iter("TeamData"):
+        tref, side = td.get("TeamRef") or "", td.get("Side")
+        if side:
+            header[side] = raw_names.get(tref)
+            if tref:
+                for key in _id_keys(tref, "t"):
+                    team_sides[key] = side
+        for mp_el in td.iterfind("PlayerLineUp/MatchPlayer"):
+            info = {
+                "team": tref, "status": mp_el.get("Status"),
+                "position": mp_el.get("Position"), "sub_position": mp_el.get("SubPosition"),
+            }
+            shirt = _safe_int(mp_el.get("ShirtNumber"), None)
+            for key in _id_keys(mp_el.get("PlayerRef") or "", "p"):
+                lineup[key] = info
+                if shirt is not None:
+                    shirts[key] = shirt
+        for sub in td.iterfind("Substitution"):
+            subs.append({
+                "team": tref, "period": sub.get("Period"), "time": _safe_int(sub.get("Time"), None),
+                "off": sub.get("SubOff"), "on": sub.get("SubOn"),
+            })
+
+    return MatchSheet(
+        team_names=team_names, team_shorts=team_shorts, team_sides=team_sides,
+        players=players, shirts=shirts, lineup=lineup, substitutions=tuple(subs),
+        home=header.get("Home"), away=header.get("Away"),
+        date=(root.findtext(".//MatchData/MatchInfo/Date") or "").strip() or None,
+    )
+
+# --- F24: events som kolonner ----------------------------------------------
+EVENT_TYPE_PASS = 1
+EVENT_TYPE_BALL_OUT = 5
+QUALIFIER_THROW_IN = 107
+
+SHOT_TYPES = {13, 14, 15, 16}
+QUALIFIER_PENALTY = 9
+
+@dataclass(frozen=True)
+class EventProjection:
+    """
+    Hvad F24-parseren skal beholde: event-typer og qualifier-id'er (None = alle).
+    Alt andet springes over mens filen læses – der allokeres hverken rækker eller Q'er til det.
+    """
+    types: frozenset | None = None
+    qualifiers: frozenset | None = None
+
+    def __or__(self, other: "EventProjection") -> "EventProjection":
+        def _union(a, b):
+            return None if a is None or b is None else a | b
+        return EventProjection(_union(self.types, other.types), _union(self.qualifiers, other.qualifiers))
+
+# Indkast: bold ud (5) + afleveringer/skud til kæder; 107 indkast, 140/141 slutpunkt
+THROWIN_PROJECTION = EventProjection(
+    types=frozenset({EVENT_TYPE_BALL_OUT, EVENT_TYPE_PASS, *SHOT_TYPES}),
+    qualifiers=frozenset({QUALIFIER_THROW_IN, 140, 141}),
+)
+
+# xG / xG Chain: afleveringer + skud, 9 straffe
+XG_PROJECTION = EventProjection(
+    types=frozenset({EVENT_TYPE_PASS, *SHOT_TYPES}),
+    qualifiers=frozenset({QUALIFIER_PENALTY}),
+)
+
+# Navngivne projektioner (navnet indgår i bundle-cachens nøgle). Indkast og xG deler
+# én bundle pr. kamp; skud-tabellen slår op på tværs af alle events og får det hele.
+PROJECTIONS = {
+    "all": EventProjection(),
+    "analysis": THROWIN_PROJECTION | XG_PROJECTION,
+}
+
+def _iterparse_f24(f24_path):
+    """(game_no, game_attrib, Event) – færdige events ryddes løbende fra træet."""
+    game_no, game_attrib, game_el, n_events = -1, {}, None, 0
+    for kind, el in ET.iterparse(str(f24_path), events=("start", "end")):
+        if kind == "start":
+            if el.tag == "Game":
+                game_no += 1
+                game_attrib, game_el, n_events = dict(el.attrib), el, 0
+            continue
+        if el.tag == "Event":
+            n_events += 1
+            yield game_no, game_attrib, el
+            # forbrugeren er færdig med eventet → smid det og dets Q-børn
+            el.clear()
+            if game_el is not None:
+                game_el.clear()
+        elif el.tag == "Game":
+            if not n_events:
+                log.warning("F24 %s: <Game> nr. %d (id=%s) har ingen events – springes over",
+                            f24_path, game_no, game_attrib.get("id"))
+            el.clear()
+            game_el = None
+
+def iter_f24_games(f24_path):
+    """
+    Yield (game_attrib, events) pr. <Game> i en F24-fil, hvor events er en lazy
+    event-strøm. Drop-in kilde til _parse_game_table i stedet for ET.parse(...).
+    """
+    for _, grp in groupby(_iterparse_f24(f24_path), key=lambda t: t[0]):
+        _, game_attrib, first_ev = next(grp)
+        def _events(first=first_ev, rest=grp):
+            yield first
+            for _, _, ev in rest:
+                yield ev
+        yield game_attrib, _events()
+
+@dataclass(frozen=True, eq=False)
+class EventTable:
+    """
+    Én games events som kolonner (NumPy), sorteret på (period_id, time_s).
+    Manglende koordinater er NaN; team/player er heltalskoder ind i team_ids/player_ids
+    (team_names/team_sides følger team-koden). Qualifiers ligger som CSR: event i's
+    Q'er er q_ids/q_values[q_offsets[i]:q_offsets[i+1]]. Arrays er skrivebeskyttede.
+    """
+    event_id: np.ndarray        # str – F24 id
+    team_event_id: np.ndarray   # str – F24 event_id (løbenummer pr. hold)
+    type_id: np.ndarray         # int32
+    period_id: np.ndarray       # int32
+    min: np.ndarray             # int32
+    sec: np.ndarray             # int32
+    time_s: np.ndarray          # int32 (min*60 + sec)
+    x: np.ndarray               # float64
+    y: np.ndarray
+    team: np.ndarray            # int32 → team_ids
+    player: np.ndarray          # int32 → player_ids
+    q_offsets: np.ndarray       # int64, len = n+1
+    q_ids: np.ndarray           # int32 qualifier_id pr. Q
+    q_values: np.ndarray        # str | None (Q uden value) pr. Q
+    team_ids: tuple = ()
+    team_names: tuple = ()
+    team_sides: tuple = ()
+    player_ids: tuple = ()
+    game: np.ndarray | None = None   # int32 game-nr. pr. event – kun sat af concat (flere games)
+
+    def __post_init__(self):
+        self._freeze()
+
+    def __setstate__(self, state):   # unpickle fra worker-processer kalder ikke __post_init__
+        self.__dict__.update(state)
+        self._freeze()
+
+    def _freeze(self) -> None:
+        for v in self.__dict__.values():
+            if isinstance(v, np.ndarray):
+                v.flags.writeable = False
+
+    def __len__(self) -> int:
+        return len(self.type_id)
+
+    @property
+    def is_pass(self) -> np.ndarray:
+        return self.type_id == EVENT_TYPE_PASS
+
+    @property
+    def is_shot(self) -> np.ndarray:
+        return np.isin(self.type_id, list(SHOT_TYPES))
+
+    @property
+    def q_rows(self) -> np.ndarray:
+        """Event-række for hver Q (CSR → COO)."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.q_offsets))
+
+    def qualifier_mask(self, qid: int) -> np.ndarray:
+        """Bool pr. event: har qualifier qid (fx 107 indkast, 9 straffe)."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.q_rows[self.q_ids == qid]] = True
+        return mask
+
+    def qualifier_value(self, qid: int) -> np.ndarray:
+        """value for qid pr. event (None hvis ingen); ved dubletter vinder den sidste Q med value."""
+        out = np.full(len(self), None, dtype=object)
+        hits = np.flatnonzero((self.q_ids == qid) & np.not_equal(self.q_values, None))
+        rows = self.q_rows[hits]                                  # stigende (CSR-orden)
+        last = np.append(rows[1:] != rows[:-1], True) if len(rows) else np.zeros(0, bool)
+        out[rows[last]] = self.q_values[hits[last]]
+        return out
+
+    def qualifier_float(self, qid: int) -> np.ndarray:
+        """qualifier_value som float64 (NaN hvis manglende/ugyldig); _safe_float én gang pr. unik værdi."""
+        vals = self.qualifier_value(qid)
+        out = np.full(len(self), np.nan)
+        has = np.flatnonzero(np.not_equal(vals, None))
+        if len(has):
+            inv, uniq = pd.factorize(vals[has])
+            conv = [_safe_float(u) for u in uniq.tolist()]
+            out[has] = np.array([np.nan if v is None else v for v in conv], dtype=np.float64)[inv]
+        return out
+
+    @cached_property
+    def end_x(self) -> np.ndarray:   # q140
+        return self.qualifier_float(140)
+
+    @cached_property
+    def end_y(self) -> np.ndarray:   # q141
+        return self.qualifier_float(141)
+
+    @staticmethod
+    def concat(tables: list["EventTable"]) -> "EventTable":
+        """Flere games → én tabel (koderne lægges om til fælles team/player-lister; game = kildens nr.)."""
+        if len(tables) == 1:
+            return tables[0]
+        team_codes, player_codes, names, sides = {}, {}, [], []
+        team_parts, player_parts = [], []
+        for t in tables:
+            for tid, name, side in zip(t.team_ids, t.team_names, t.team_sides):
+                if tid not in team_codes:
+                    team_codes[tid] = len(team_codes); names.append(name); sides.append(side)
+            for pid in t.player_ids:
+                player_codes.setdefault(pid, len(player_codes))
+            team_parts.append(np.array([team_codes[tid] for tid in t.team_ids], dtype=np.int32)[t.team]
+                              if len(t) else t.team)
+            player_parts.append(np.array([player_codes[pid] for pid in t.player_ids], dtype=np.int32)[t.player]
+                                if len(t) else t.player)
+        cols = {
+            name: np.concatenate([getattr(t, name) for t in tables]) if tables else np.array([])
+            for name in ("event_id", "team_event_id", "type_id", "period_id", "min", "sec", "time_s",
+                         "x", "y", "q_ids", "q_values")
+        }
+        q_counts = np.concatenate([np.diff(t.q_offsets) for t in tables]) if tables else np.zeros(0, np.int64)
+        return EventTable(
+            **cols,
+            q_offsets=np.concatenate([[0], np.cumsum(q_counts)]).astype(np.int64),
+            team=np.concatenate(team_parts) if team_parts else np.zeros(0, np.int32),
+            player=np.concatenate(player_parts) if player_parts else np.zeros(0, np.int32),
+            team_ids=tuple(team_codes), team_names=tuple(names), team_sides=tuple(sides),
+            player_ids=tuple(player_codes),
+            game=np.repeat(np.arange(len(tables), dtype=np.int32), [len(t) for t in tables]),
+        )
+
+def _parse_game_table(game_elem, team_name_map=None, team_side_map=None, projection: EventProjection | None = None):
+    """
+    Ét <Game> (eller (game_attrib, events) fra iter_f24_games) → (game_meta, EventTable).
+    Med en projection beholdes kun de valgte event-typer/qualifiers.
+    """
+    if isinstance(game_elem, tuple):
+        game_attrib, ev_source = game_elem
+    else:
+        game_attrib, ev_source = game_elem.attrib, game_elem.findall("Event")
+    game_meta = {
+        "game_id": game_attrib.get("id", ""),
+        "game_date": game_attrib.get("game_date", ""),
+    }
+    event_id, team_event_id, type_id, period_id, mins, secs = [], [], [], [], [], []
+    xs, ys, teams, players = [], [], [], []
+    q_counts, q_ids, q_values = [], [], []
+    team_codes, player_codes = {}, {}
+    nan = float("nan")
+    keep_types = projection.types if projection else None
+    keep_qs = projection.qualifiers if projection else None
+    for ev in ev_source:
+        a = ev.attrib
+        tid = _safe_int(a.get("type_id", -1), -1)
+        if keep_types is not None and tid not in keep_types:
+            continue
+        event_id.append(a.get("id", ""))
+        team_event_id.append(a.get("event_id", ""))
+        type_id.append(tid)
+        period_id.append(_safe_int(a.get("period_id", -1), -1))
+        mins.append(_safe_int(a.get("min", 0), 0))
+        secs.append(_safe_int(a.get("sec", 0), 0))
+        x = _safe_float(a.get("x")); y = _safe_float(a.get("y"))
+        xs.append(nan if x is None else x); ys.append(nan if y is None else y)
+        teams.append(team_codes.setdefault(a.get("team_id", ""), len(team_codes)))
+        players.append(player_codes.setdefault(a.get("player_id", ""), len(player_codes)))
+
+        n_q = 0
+        for q in ev.findall("Q"):
+            qid = _safe_int(q.attrib.get("qualifier_id", -1), -1)
+            if keep_qs is not None and qid not in keep_qs:
+                continue
+            q_ids.append(qid)
+            q_values.append(q.attrib.get("value"))
+            n_q += 1
+        q_counts.append(n_q)
+
+    period_arr = np.array(period_id, dtype=np.int32)
+    mins_arr, secs_arr = np.array(mins, dtype=np.int32), np.array(secs, dtype=np.int32)
+    time_arr = mins_arr * 60 + secs_arr
+    order = np.lexsort((time_arr, period_arr))  # stabil – samme rækkefølge som list.sort
+
+    # CSR i sorteret rækkefølge: flyt hvert events Q-blok med
+    counts = np.array(q_counts, dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(counts)])[:-1]
+    new_counts = counts[order]
+    new_offsets = np.concatenate([[0], np.cumsum(new_counts)]).astype(np.int64)
+    q_take = np.repeat(starts[order] - new_offsets[:-1], new_counts) + np.arange(int(new_offsets[-1]))
+    q_val_arr = np.empty(len(q_values), dtype=object); q_val_arr[:] = q_values
+
+    team_ids = tuple(team_codes)
+    table = EventTable(
+        event_id=np.array(event_id, dtype=object)[order],
+        team_event_id=np.array(team_event_id, dtype=object)[order],
+        type_id=np.array(type_id, dtype=np.int32)[order],
+        period_id=period_arr[order],
+        min=mins_arr[order], sec=secs_arr[order],
+        time_s=time_arr[order],
+        x=np.array(xs, dtype=np.float64)[order], y=np.array(ys, dtype=np.float64)[order],
+        team=np.array(teams, dtype=np.int32)[order], player=np.array(players, dtype=np.int32)[order],
+        q_offsets=new_offsets,
+        q_ids=np.array(q_ids, dtype=np.int32)[q_take],
+        q_values=q_val_arr[q_take],
+        team_ids=team_ids,
+        team_names=tuple(normalize_team_name(team_name_map.get(t, t) if team_name_map else t) for t in team_ids),
+        team_sides=tuple(team_side_map.get(t) if team_side_map else None for t in team_ids),
+        player_ids=tuple(player_codes),
+    )
+    return game_meta, table
+
+# --- MatchBundle: én parse pr. kamp ----------------------------------------
+@dataclass(frozen=True)
+class MatchBundle:
+    """
+    Én kamp parset én gang: F24-events pr. game, F7-maps og F70 xG/fase.
+    """
+    f24_path: str
+    games: list = field(default_factory=list)          # [(game_meta, EventTable), ...]
+    sheet: MatchSheet = field(default_factory=MatchSheet)  # F7: hold, sider, spillere, opstilling
+    f70: F70Index = field(default_factory=F70Index)    # xG, fase og qualifiers fra F70
+    ok: bool = True                                    # False hvis F24 ikke kunne læses
+    projection: str = "all"                            # nøgle i PROJECTIONS
+
+    @property
+    def team_names(self) -> dict:
+        """team_id -> navn ('t420' og '420')."""
+        return self.sheet.team_names
+
+    @property
+    def team_sides(self) -> dict:
+        """team_id -> "Home"/"Away"."""
+        return self.sheet.team_sides
+
+    @property
+    def players(self) -> dict:
+        """player_id -> navn ('p451555' og '451555')."""
+        return self.sheet.players
+
+    @property
+    def xg(self) -> dict:
+        """F24 id -> xG (F70 q321)."""
+        return self.f70.xg
+
+    @property
+    def events(self) -> EventTable | None:
+        """Alle games samlet i én EventTable (None hvis F24 ikke kunne læses)."""
+        tables = [t for _, t in self.games]
+        return EventTable.concat(tables) if tables else None
+
+def build_match_bundle(
+    f24_path: Path, f7_path: Path | None = None, f70_path: Path | None = None, projection: str = "all"
+) -> MatchBundle:
+    """Parser F7, F70 og F24 for én kamp præcis én gang hver (F24 begrænset til PROJECTIONS[projection])."""
+    sheet = parse_match_sheet(f7_path)
+    f70 = build_f70_index(f70_path)
+
+    games, ok = [], True
+    try:
+        games = [_parse_game_table(game, team_name_map=sheet.team_names, team_side_map=sheet.team_sides,
+                                   projection=PROJECTIONS[projection])
+                 for game in iter_f24_games(f24_path)]
+    except (ET.ParseError, OSError):
+        games, ok = [], False
+
+    return MatchBundle(
+        f24_path=str(f24_path), games=games, sheet=sheet, f70=f70, ok=ok, projection=projection,
+    )
+
+def _build_bundle(
+    f24_str_path: str, f7_str_path: str | None, f70_str_path: str | None, projection: str = "all"
+) -> MatchBundle:
+    return build_match_bundle(
+        Path(f24_str_path),
+        Path(f7_str_path) if f7_str_path else None,
+        Path(f70_str_path) if f70_str_path else None,
+        projection,
+    )
+
+# --- Tabeller pr. kamp: indkast og skud ------------------------------------
+PITCH_LENGTH_M = 105.0
+PITCH_WIDTH_M  = 68.0
+
+def _zones_from_x(x: np.ndarray) -> np.ndarray:
+    """_zone_from_x over en float-kolonne (NaN → "Unknown")."""
+    return np.select(
+        [np.isnan(x), x <= 33.3333, x <= 66.6666],
+        ["Unknown", "First 1/3", "Second 1/3"], "Last 1/3",
+    ).astype(object)
+
+def _in_box_opta_arr(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """in_box_opta(side="offensive") over kolonner (NaN → False)."""
+    return (84.3 <= x) & (x <= 100.0) & (20.4 <= y) & (y <= 79.6)
+
+def _distances_m(x1, y1, x2, y2, length=PITCH_LENGTH_M, width=PITCH_WIDTH_M) -> list:
+    """_distance_m over kolonner – samme float-regning og afrunding, None hvis en koordinat mangler."""
+    dx_m = (x2 - x1) / 100.0 * float(length)
+    dy_m = (y2 - y1) / 100.0 * float(width)
+    dist = np.power(dx_m**2 + dy_m**2, 0.5)
+    return _none_list(np.array([round(d, 2) for d in dist.tolist()], dtype=np.float64))
+
+def _none_list(arr: np.ndarray):
+    """
+    Float-kolonne som rækkerne altid har givet den: float64 med NaN, men en ren None-kolonne
+    (object) hvis alle værdier mangler – så DataFrame-dtypes er uændrede.
+    """
+    return [None] * len(arr) if np.isnan(arr).all() else arr
+
+def _mmss(mins: np.ndarray, secs: np.ndarray) -> np.ndarray:
+    """"mm:ss" pr. række – formateret én gang pr. unikt (min, sec)."""
+    if len(secs) and not ((secs >= 0) & (secs < 60) & (mins >= 0)).all():
+        return np.array([f"{m:02d}:{s:02d}" for m, s in zip(mins.tolist(), secs.tolist())], dtype=object)
+    inv, uniq = pd.factorize(mins.astype(np.int64) * 60 + secs)
+    return np.array([f"{k // 60:02d}:{k % 60:02d}" for k in uniq.tolist()], dtype=object)[inv]
+
+def _compute_throwin_delays(ev: EventTable, player_name_map=None) -> pd.DataFrame:
+    """
+    Ét indkast pr. bold-ud (type 5): det første event efter bolden er ude som enten er et nyt
+    bold-ud eller en aflevering med q107, i samme periode – og kun hvis det er indkastet.
+    Parring via searchsorted over kandidat-maskerne; zone/boks/afstand regnes kolonnevis.
+    """
+    is_out = ev.type_id == EVENT_TYPE_BALL_OUT
+    is_throw = ev.is_pass & ev.qualifier_mask(QUALIFIER_THROW_IN)
+    cand = np.flatnonzero(is_out | is_throw)
+    outs = np.flatnonzero(is_out)
+
+    nxt = np.searchsorted(cand, outs, side="right")
+    has_next = nxt < len(cand)
+    i, j = outs[has_next], cand[nxt[has_next]]
+    keep = is_throw[j] & (ev.period_id[j] == ev.period_id[i])
+    i, j = i[keep], j[keep]
+    if not len(i):
+        return pd.DataFrame()
+
+    x, y = ev.x[j], ev.y[j]
+    end_x, end_y = ev.end_x[j], ev.end_y[j]
+    zone, end_zone = _zones_from_x(x).tolist(), _zones_from_x(end_x).tolist()
+    period = ev.period_id[i].tolist()
+
+    team_names = np.array(ev.team_names, dtype=object)
+    team_sides = np.array([s or "" for s in ev.team_sides], dtype=object)
+    team_ids = np.array(ev.team_ids, dtype=object)
+    team_fck = np.array([_is_fck(n) for n in ev.team_names], dtype=bool)
+    taker_ids = np.array(ev.player_ids, dtype=object)
+    takers = np.array([
+        (player_name_map.get(pid, pid) if player_name_map else pid) or "Unknown" for pid in ev.player_ids
+    ], dtype=object)
+    team, player = ev.team[j], ev.player[j]
+
+    return pd.DataFrame({
+        "Period": period,
+        "Ball out (mm:ss)": _mmss(ev.min[i], ev.sec[i]),
+        "Throw-in (mm:ss)": _mmss(ev.min[j], ev.sec[j]),
+        "Delay (s)": np.maximum(0, ev.time_s[j] - ev.time_s[i]).tolist(),
+        "Team": team_names[team].tolist(), "Side": team_sides[team].tolist(),
+        "x": _none_list(x), "y": _none_list(y),
+        "Zone": zone, "Third": zone,
+        "end_x": _none_list(end_x), "end_y": _none_list(end_y),
+        "End zone": end_zone, "End third": end_zone,
+        "Thrown into the box": _in_box_opta_arr(end_x, end_y).tolist(),
+        "Distance (m)": _distances_m(x, y, end_x, end_y),
+        "is_FCK": team_fck[team].tolist(),
+        "throwin_event_id": ev.event_id[j].tolist(),
+        "throwin_team_id": team_ids[team].tolist(),
+        "throwin_time_s": ev.time_s[j].tolist(),
+        "throwin_period": period,
+        "Taker id": taker_ids[player].tolist(),
+        "Taker": takers[player].tolist(),
+    })
+
+@dataclass(frozen=True)
+class SequenceEvents:
+    """
+    Det udsnit af en EventTable som kæde-/skud-berigelsen læser (samme attributnavne).
+    Kan gemmes som en flad tabel (frame/from_frame), så berigelsen kan køres igen uden XML.
+    """
+    event_id: np.ndarray
+    type_id: np.ndarray
+    period_id: np.ndarray
+    time_s: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    end_x: np.ndarray
+    end_y: np.ndarray
+    team: np.ndarray            # int → team_ids
+    team_ids: tuple = ()
+
+    def __len__(self) -> int:
+        return len(self.type_id)
+
+    @property
+    def is_pass(self) -> np.ndarray:
+        return self.type_id == EVENT_TYPE_PASS
+
+    @property
+    def is_shot(self) -> np.ndarray:
+        return np.isin(self.type_id, list(SHOT_TYPES))
+
+    @staticmethod
+    def frame(ev: EventTable, xg_map: dict | None = None) -> pd.DataFrame:
+        """EventTable → flad tabel med hold-id som tekst og F70-xG pr. event (NaN hvis ingen)."""
+        xg_map = xg_map or {}
+        team_ids = np.array(ev.team_ids, dtype=object)
+        return pd.DataFrame({
+            "event_id": ev.event_id, "type_id": ev.type_id, "period_id": ev.period_id, "time_s": ev.time_s,
+            "x": ev.x, "y": ev.y, "end_x": ev.end_x, "end_y": ev.end_y,
+            "team_id": team_ids[ev.team] if len(ev) else np.zeros(0, dtype=object),
+            "xg": np.array([_safe_float(xg_map.get(e)) for e in ev.event_id.tolist()], dtype=np.float64),
+        })
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> tuple["SequenceEvents", dict]:
+        """Flad tabel → (SequenceEvents, xg_map)."""
+        team, team_ids = pd.factorize(df["team_id"].fillna("").astype(str))
+        event_id = df["event_id"].to_numpy(dtype=str)
+        xg = df["xg"].to_numpy(dtype=np.float64)
+        ok = ~np.isnan(xg)
+        return cls(
+            event_id=event_id,
+            **{c: df[c].to_numpy() for c in ("type_id", "period_id", "time_s", "x", "y", "end_x", "end_y")},
+            team=team.astype(np.int32), team_ids=tuple(team_ids.tolist()),
+        ), dict(zip(event_id[ok].tolist(), xg[ok].tolist()))
+
+def _event_lookup_from_bundle(bundle) -> dict[str, dict]:
+    """{ event_id: {"team_id", "player_id", "min", "sec"} } fra en allerede parset MatchBundle."""
+    ev = bundle.events
+    if ev is None:
+        return {}
+    return {
+        str(teid or eid): {
+            "team_id": ev.team_ids[t], "player_id": ev.player_ids[p], "min": mn, "sec": sc,
+        }
+        for teid, eid, t, p, mn, sc in zip(
+            ev.team_event_id.tolist(), ev.event_id.tolist(), ev.team.tolist(), ev.player.tolist(),
+            ev.min.tolist(), ev.sec.tolist(),
+        )
+        if (teid or eid)
+    }
+
+def _parse_shots(bundle) -> pd.DataFrame:
+    f70 = bundle.f70
+    if not f70:
+        return pd.DataFrame()
+
+    f24_lk = _event_lookup_from_bundle(bundle)
+    name_map = bundle.players
+    team_map = bundle.team_names
+
+    rows = []
+    for eid, d in f70.by_event_id.items():
+        meta = f24_lk.get(eid, {})
+        pid = meta.get("player_id", "")
+        pid_num = pid[1:] if isinstance(pid, str) and pid.startswith("p") else pid
+        pname = name_map.get(pid) or name_map.get(pid_num) or pid_num or "Unknown"
+        team_id = meta.get("team_id", "")
+        team = team_map.get(team_id, team_id)
+        rows.append({
+            "event_id": eid,
+            "Team": team,
+            "Player": pname,
+            "min": meta.get("min", None),
+            "sec": meta.get("sec", None),
+            "xG": d.xg,
+            "Phase": d.phase,
+        })
+
+    df = pd.DataFrame(rows)
+    df["Team"] = df["Team"].map({t: normalize_team_name(t) for t in df["Team"].unique()})  # én gang pr. hold
+    df["time_s"] = df["min"].astype(float)*60 + df["sec"].astype(float)
+    return df.sort_values(["time_s", "event_id"]).reset_index(drop=True)
+
+def _parse_throwin_delays(bundle) -> pd.DataFrame:
+    """Rå indkast for én kamp – kun det der ikke afhænger af ThrowinParams; _game peger ind i events."""
+    if not bundle.ok:
+        return pd.DataFrame()
+    parts = []
+    for g, (game_meta, events) in enumerate(bundle.games):
+        df = _compute_throwin_delays(events, player_name_map=bundle.players)
+        if not df.empty:
+            parts.append(df.assign(**{"Game date": game_meta.get("game_date", ""), "_game": g}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+def _throwin_event_frame(bundle) -> pd.DataFrame:
+    """Alle games' events (analysis-projektionen) som én SequenceEvents-tabel med _game."""
+    parts = [SequenceEvents.frame(events, bundle.xg).assign(_game=g) for g, (_, events) in enumerate(bundle.games)]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+# --- Workers til process-poolen -------------------------------------------
+_TABLE_BUILDERS = {"throwins": _parse_throwin_delays, "shots": _parse_shots}
+_TABLE_PROJECTIONS = {"throwins": "analysis", "shots": "all"}
+# Ekstra artefakter bygget af samme bundle (så en kold kamp kun parses én gang)
+_TABLE_COMPANIONS = {"throwins": {"throwin_events": _throwin_event_frame}}
+
+def _ingest_worker(table: str, fingerprint: str, f24: str, f7: str | None, f70: str | None) -> pd.DataFrame:
+    """Én kamp → tabel. Kører i en worker-proces, så kun rene funktioner (ingen st.cache)."""
+    def build():
+        if table == "shots" and not (Path(f24).exists() and f70 and Path(f70).exists()):
+            return pd.DataFrame()
+        bundle = _build_bundle(f24, f7, f70, _TABLE_PROJECTIONS[table])
+        if _HAS_PARQUET:
+            for other, builder in _TABLE_COMPANIONS.get(table, {}).items():
+                path = _artifact_path(other, fingerprint)
+                if not path.exists():
+                    _artifact_io(path, lambda: builder(bundle))
+        return _TABLE_BUILDERS[table](bundle)
+    if not _HAS_PARQUET:
+        return build()
+    return _artifact_io(_artifact_path(table, fingerprint), build)
+
+def _bundle_worker(f24: str, f7: str | None, f70: str | None, projection: str) -> MatchBundle:
+    return _build_bundle(f24, f7, f70, projection)
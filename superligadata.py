@@ -4,245 +4,53 @@ from pathlib import Path
 import pandas as pd
 import streamlit as st
 import numpy as np
-import time, hashlib
+import time, hashlib, json, pickle, threading
 import xml.etree.ElementTree as ET
 from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 import unicodedata
 import base64
 
 # --- Dropbox sync (folder -> zip) --------------------------------------------
-import os, io, zipfile, requests
+import os, io, zipfile, shutil, requests
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Parse/ingest-laget: eget modul, så process-poolens workers kan pickles (se superliga_ingest)
+from superliga_ingest import (
+    ARTIFACT_CACHE, EVENT_TYPE_PASS, EventTable, LOCAL_CACHE, MatchBundle, MatchSheet,
+    NAME_CACHE_MAX, PITCH_LENGTH_M, PITCH_WIDTH_M, QUALIFIER_PENALTY, SCHEMA_VER, SHOT_TYPES,
+    SequenceEvents, TEAM_ALIASES, _HAS_PARQUET, _TABLE_COMPANIONS, _TABLE_PROJECTIONS, _artifact_io,
+    _artifact_path, _build_bundle, _bundle_worker, _ingest_worker, _parse_shots,
+    _parse_throwin_delays, _throwin_event_frame, normalize_team_name, parse_match_sheet,
+)
+
+log = logging.getLogger(__name__)
 
 # === SHOTS MODULE: imports ===
 import altair as alt
 
-def normalize_team_name(name):
-    """Normalize all Sønderjyske variants to one club name."""
-    if not isinstance(name, str):
-        return name
-
-    raw = name.replace("\xa0", " ").strip()
-
-    direct = {
-        "Sønderjyske": "Sønderjyske",
-        "Sønderjyske Fodbold": "Sønderjyske",
-        "Sonderjyske": "Sønderjyske",
-        "Sonderjyske Fodbold": "Sønderjyske",
-    }
-    if raw in direct:
-        return direct[raw]
-
-    norm = unicodedata.normalize("NFKD", raw).encode("ascii", "ignore").decode("ascii")
-    norm = re.sub(r"\s+", " ", norm).strip().lower()
-
-    if norm in {
-        "sonderjyske",
-        "sonderjyske fodbold",
-    }:
-        return "Sønderjyske"
-
-    return raw
-
-# === SHOTS MODULE: constants ===
-PHASE_LABELS = {
-    22: "Regular play",
-    23: "Fast break",
-    24: "Set piece",
-    25: "Corner",
-    26: "Freekick",
-    96: "Corner situation",
-    97: "Direct freekick",
-    160: "Throw in",
-    215: "Individual play",
-}
-# Mest specifik → mindst specifik (Regular play og Individual play håndteres særskilt)
-PHASE_SPECIFIC_PRIORITY = [25, 96, 97, 26, 24, 160, 23]
-
-def _safe_int(x, default=0):
-    try:
-        return int(x)
-    except Exception:
-        return default
-
-def build_player_map_from_f7(f7_path: Path) -> dict:
-    """Returnerer både 'p451555' og '451555' som nøgler til samme navn."""
-    mp = {}
-    if not (f7_path and f7_path.exists()):
-        return mp
-    root = ET.parse(str(f7_path)).getroot()
-    for p in root.findall(".//Player"):
-        uid = p.get("uID") or ""
-        num = uid[1:] if uid.startswith("p") else uid
-        known = (p.findtext("./PersonName/Known") or "").strip()
-        first = (p.findtext("./PersonName/First") or "").strip()
-        last  = (p.findtext("./PersonName/Last") or "").strip()
-        name = known or " ".join([w for w in [first, last] if w])
-        if not name:
-            name = num or uid
-        if num: mp[num] = name
-        if uid: mp[uid] = name
-    return mp
-
-def build_team_maps_from_f7(f7_path: Path):
-    """({id->navn}, {id->short}) hvor id kan være 't420' og '420'."""
-    names, shorts = {}, {}
-    if not (f7_path and f7_path.exists()):
-        return names, shorts
-    root = ET.parse(str(f7_path)).getroot()
-    for team in root.findall(".//Team"):
-        tid = team.get("uID") or ""
-        num = tid[1:] if tid.startswith("t") else tid
-        raw_name = (team.findtext("./Name") or "").strip()
-        raw_short = (team.findtext("./ShortName") or "").strip()
-        name = normalize_team_name(raw_name)
-        short = normalize_team_name(raw_short) if raw_short else raw_short
-        for key in filter(None, [tid, num]):
-            names[key] = name or names.get(key, key)
-            shorts[key] = short or shorts.get(key, short or name or key)
-    return names, shorts
-
-def list_round_dirs(base_dir: str) -> list[Path]:
-    """Finder mapper der hedder R1, R2, ... i base_dir."""
-    p = Path(base_dir)
-    if not p.exists():
-        return []
-    def rnum(x: Path):
-        m = re.search(r"R(\d+)$", x.name)
-        return int(m.group(1)) if m else None
-    return sorted([d for d in p.iterdir() if d.is_dir() and rnum(d) is not None], key=lambda d: int(re.search(r"R(\d+)$", d.name).group(1)))
-
-def collect_round_data(round_dir: Path) -> list[dict]:
-    """
-    Finder kampfiler inde i en R*-mappe.
-    Antager navne ala:
-      f24-<comp>-<season>-<matchid>-eventdetails.xml
-      f70-<comp>-<season>-<matchid>-expectedgoals.xml
-      srml-<comp>-<season>-f<matchid>-matchresults.xml
-    """
-    rows = []
-    for f24 in sorted(round_dir.glob("f24-*-eventdetails.xml")):
-        base = f24.name.replace("-eventdetails.xml", "")
-        # forsøg at finde matchende f70/srml
-        # (samme mønster som dine uploadede filer)
-        parts = base.split("-")  # f24, comp, season, matchid
-        if len(parts) < 4:
-            continue
-        comp, season, matchid = parts[1], parts[2], parts[3]
-        f70 = round_dir / f"f70-{comp}-{season}-{matchid}-expectedgoals.xml"
-        f7  = round_dir / f"srml-{comp}-{season}-f{matchid}-matchresults.xml"
-        rows.append({
-            "Match": matchid,
-            "F24 file": f24.name,
-            "F70 file": f70.name if f70.exists() else "(mangler)",
-            "F7 file":  f7.name  if f7.exists()  else "(mangler)",
-        })
-    return rows
 
-# === SHOTS: fase-logik og parsere ===
-# Brug dine konstanter fra step 2:
-# PHASE_LABELS = {...}
-# PHASE_SPECIFIC_PRIORITY = [25, 96, 97, 26, 24, 160, 23]
-
-def _pick_phase_from_qset(qset: set[int]) -> str:
-    # 1) specifikke faser først
-    for pid in PHASE_SPECIFIC_PRIORITY:
-        if pid in qset:
-            return PHASE_LABELS[pid]
-    # 2) Regular play (22) trumfer Individual play
-    if 22 in qset:
-        return PHASE_LABELS[22]
-    # 3) Individual play (215) kun hvis intet andet
-    if 215 in qset:
-        return PHASE_LABELS[215]
-    # 4) Fallback
-    return PHASE_LABELS[22]
-
-def _build_xg_phase_from_f70(f70_path: Path) -> dict[str, dict]:
-    """
-    Læs F70 → alle Event med Q@qualifier_id=321 (xG).
-    Returnér: { event_id: {"xG": float, "phase": str} }
-    """
-    out = {}
-    if not (f70_path and f70_path.exists()):
-        return out
-    root = ET.parse(str(f70_path)).getroot()
-    for ev in root.findall(".//Event"):
-        eid = ev.get("event_id") or ev.get("id")
-        if not eid:
-            continue
-        qset = set()
-        xg_val = None
-        for q in ev.findall("./Q"):
-            qid = q.get("qualifier_id")
-            if qid and qid.isdigit():
-                qset.add(int(qid))
-            if qid == "321":
-                try:
-                    xg_val = float(q.get("value", "0"))
-                except Exception:
-                    xg_val = None
-        if xg_val is not None:
-            out[str(eid)] = {"xG": xg_val, "phase": _pick_phase_from_qset(qset)}
-    return out
-
-def _build_event_lookup_from_f24(f24_path: Path) -> dict[str, dict]:
-    """{ event_id: {"team_id": str, "player_id": str, "min": int, "sec": int} }"""
-    lk = {}
-    if not (f24_path and f24_path.exists()):
-        return lk
-    root = ET.parse(str(f24_path)).getroot()
-    for ev in root.findall(".//Event"):
-        eid = ev.get("event_id") or ev.get("id")
-        if not eid:
-            continue
-        lk[str(eid)] = {
-            "team_id": ev.get("team_id", ""),
-            "player_id": ev.get("player_id", ""),
-            "min": _safe_int(ev.get("min"), 0),
-            "sec": _safe_int(ev.get("sec"), 0),
-        }
-    return lk
+# === SHOTS: kamp- og sæsontabeller ===
 
-@st.cache_data(show_spinner=False)
 def parse_shots_from_match(f24_path: str, f70_path: str, f7_path: str | None) -> pd.DataFrame:
     """Én kamp → alle xG-skud med spiller, tid og fase (fra F70)."""
-    f24 = Path(f24_path); f70 = Path(f70_path) if f70_path else None; f7  = Path(f7_path) if f7_path else None
-    if not (f24.exists() and f70 and f70.exists()):
-        return pd.DataFrame()
+    return _parse_shots_cached(f24_path, f70_path, f7_path, match_fingerprint(f24_path, f7_path, f70_path))
 
-    xg_phase = _build_xg_phase_from_f70(f70)
-    if not xg_phase:
+@st.cache_data(show_spinner=False)
+def _parse_shots_cached(f24_path: str, f70_path: str, f7_path: str | None, fingerprint: str) -> pd.DataFrame:
+    f24 = Path(f24_path); f70 = Path(f70_path) if f70_path else None
+    if not (f24.exists() and f70 and f70.exists()):
         return pd.DataFrame()
-
-    f24_lk = _build_event_lookup_from_f24(f24)
-    name_map = build_player_map_from_f7(f7) if (f7 and f7.exists()) else {}
-    team_map, _ = build_team_maps_from_f7(f7) if (f7 and f7.exists()) else ({}, {})
-
-    rows = []
-    for eid, d in xg_phase.items():
-        meta = f24_lk.get(eid, {})
-        pid = meta.get("player_id", "")
-        pid_num = pid[1:] if isinstance(pid, str) and pid.startswith("p") else pid
-        pname = name_map.get(pid) or name_map.get(pid_num) or pid_num or "Unknown"
-        team_id = meta.get("team_id", "")
-        team = team_map.get(team_id, team_id)
-        rows.append({
-            "event_id": eid,
-            "Team": team,
-            "Player": pname,
-            "min": meta.get("min", None),
-            "sec": meta.get("sec", None),
-            "xG": d["xG"],
-            "Phase": d["phase"],
-        })
-
-    df = pd.DataFrame(rows)
-    df["Team"] = df["Team"].apply(normalize_team_name)
-    df["time_s"] = df["min"].astype(float)*60 + df["sec"].astype(float)
-    return df.sort_values(["time_s", "event_id"]).reset_index(drop=True)
+    return load_artifact(
+        "shots", fingerprint,
+        lambda: _parse_shots(_load_match_bundle(f24_path, f7_path, f70_path, fingerprint, SCHEMA_VER)),
+    )
 
 
-@st.cache_data(show_spinner=False)
 def collect_shots_all_rounds(base_dir: str, round_min: int, round_max: int) -> pd.DataFrame:
     # Find runde-mapper
     all_round_dirs = list_round_dirs(base_dir)
@@ -255,26 +63,7 @@ def collect_shots_all_rounds(base_dir: str, round_min: int, round_max: int) -> p
         return int(m.group(1)) if m else None
     selected = [p for p in all_round_dirs if (rnum(p) is not None and round_min <= rnum(p) <= round_max)]
 
-    all_rows = []
-    for rd in selected:
-        rows = collect_round_data(rd)
-        if not rows:
-            continue
-        df_round = pd.DataFrame(rows)
-        for _, r in df_round.iterrows():
-            f24 = rd / r["F24 file"]
-            f70 = (rd / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-            f7  = (rd / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-            if not (f24.exists() and f70 and f70.exists()):
-                continue
-            df_match = parse_shots_from_match(str(f24), str(f70), str(f7) if f7 else None)
-            if df_match.empty:
-                continue
-            df_match["Round"] = rd.name
-            df_match["Match"] = r["Match"]
-            all_rows.append(df_match)
-
-    return pd.concat(all_rows, ignore_index=True) if all_rows else pd.DataFrame()
+    return ingest_matches("shots", match_jobs(selected))
 
 
 REMOTE_DROPBOX_FOLDER = os.getenv(
@@ -282,7 +71,6 @@ REMOTE_DROPBOX_FOLDER = os.getenv(
     "https://www.dropbox.com/scl/fo/qm6y55m4o9u1y357vni7e/ADRY08n0Ugs9yzttqKge_kE?rlkey=n9l1rbo2y7cq4es6w3ykh64ct&st=bi4fdp6c&dl=0"
 ).replace("dl=0", "dl=1")  # force direct download
 
-LOCAL_CACHE = Path("./data").resolve()
 
 LOGO_DROPBOX_FOLDER = "https://www.dropbox.com/scl/fo/s869q2kb2jwn3zvsgts88/ACMNFC5T62ltbtIKbk4zsFg?dl=1"
 LOGO_CACHE = (LOCAL_CACHE / "logos").resolve()
@@ -374,9 +162,6 @@ with st.sidebar:
         st.rerun()
 
 
-
-
-
 # === Player photos (Dropbox sync) ============================================
 PLAYER_PHOTO_URLS = "https://www.dropbox.com/scl/fo/suiphvo7fv8ibegjomubm/AOakYVyH_ri3WF3OD0A9UJo?rlkey=xeulwe99avd9m1vzip0jw9r0z&st=4zkyp7so&dl=1"
 
@@ -462,6 +247,10 @@ _TEAM_TO_SLUG = {
 def _norm(s: str) -> str:
     if not isinstance(s, str):
         return ""
+    return _norm_str(s)
+
+@lru_cache(maxsize=NAME_CACHE_MAX)
+def _norm_str(s: str) -> str:
     s = (s.replace("Æ", "Ae").replace("Ø", "O").replace("Å", "Aa")
            .replace("æ", "ae").replace("ø", "o").replace("å", "aa"))
     s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
@@ -470,7 +259,13 @@ def _norm(s: str) -> str:
     return s
 
 def _team_to_slug(team: str) -> str | None:
-    key = _norm(team)
+    if not isinstance(team, str):
+        return None
+    return _team_to_slug_str(team)
+
+@lru_cache(maxsize=NAME_CACHE_MAX)
+def _team_to_slug_str(team: str) -> str | None:
+    key = _norm_str(team)
     return _TEAM_TO_SLUG.get(key, key.replace(" ", "-") if key else None)
 
 @st.cache_resource(show_spinner=False)
@@ -559,10 +354,6 @@ def _logo_lookup(logo_map: dict[str,str], team: str) -> str | None:
             best = best or v
     return best
 
-TEAM_ALIASES = {
-    "FC København", "F.C. København", "FC Copenhagen", "F.C. Copenhagen",
-    "København", "Copenhagen"
-}
 
 # === Module switcher ===
 with st.sidebar:
@@ -759,7 +550,6 @@ section[data-testid="stSidebar"] .stHeading,
 """, unsafe_allow_html=True)
 
 
-
 # “Filter card” helper (ikke-collapsible, men med kort-baggrund)
 @contextmanager
 def filter_card(title: str):
@@ -781,6 +571,7 @@ st.sidebar.subheader("Indstillinger")
 if st.sidebar.button("🔄 Sync data from Dropbox"):
     try:
         _download_dropbox_folder_zip(REMOTE_DROPBOX_FOLDER, LOCAL_CACHE)
+        st.session_state["fixtures_stale"] = True  # zip overskriver filer uden at ændre mappe-mtime
         st.success("Synkroniseret fra Dropbox.")
         st.rerun()
     except Exception as e:
@@ -840,166 +631,157 @@ def extract_match_id(name: str):
 
 def is_f7_like_filename(path: Path) -> bool:
     up = path.stem.upper()
-    return ("F7" in up or "SRML" in up or "MATCHRESULTS" in up)
+    if "SRML" in up or "MATCHRESULTS" in up:
+        return True
+    return "F7" in up and not is_f70_filename(path)  # "f70-..." indeholder også "F7"
 
 def is_f70_filename(path: Path) -> bool:
     return "F70" in path.stem.upper()
 
-def get_match_info_from_f24(f24_path: Path):
-    home = away = None
-    date = None
+def read_match_header(f24_path: Path, f7_path: Path | None = None) -> tuple[str | None, str | None, str | None]:
+    """
+    (hjemmehold, udehold, dato-streng). Læser kun F24 frem til første <Game>-start-tag
+    (ikke hele filen); mangler der noget, suppleres fra F7 MatchData.
+    """
+    home = away = date = None
     try:
-        root = ET.parse(f24_path).getroot()
-        game = root.find(".//Game")
+        parser = ET.XMLPullParser(events=("start",))
+        with open(f24_path, "rb") as fh:
+            game = None
+            while game is None:
+                chunk = fh.read(4096)  # <Game> ligger i de første par hundrede bytes
+                if not chunk:
+                    break
+                parser.feed(chunk)
+                game = next((el for _, el in parser.read_events() if el.tag == "Game"), None)
         if game is not None:
             home = game.get("home_team_name")
             away = game.get("away_team_name")
             date = game.get("game_date") or game.get("GameDate") or game.get("date")
-        if not (home and away):
-            home_el = root.find(".//Team[@Side='Home']") or root.find(".//Team[@side='Home']")
-            away_el = root.find(".//Team[@Side='Away']") or root.find(".//Team[@side='Away']")
-            if home_el is not None and away_el is not None:
-                home = home_el.get("TeamName") or home_el.get("name")
-                away = away_el.get("TeamName") or away_el.get("name")
     except Exception:
         pass
+    if not (home and away and date) and f7_path:
+        f7_home, f7_away, f7_date = _read_f7_header(f7_path)
+        home, away, date = home or f7_home, away or f7_away, date or f7_date
+    return home, away, date
 
-    match_name = f"{home} - {away}" if home and away else f24_path.stem
-    match_date = None
+def _read_f7_header(f7_path: Path) -> tuple[str | None, str | None, str | None]:
+    """(hjemmehold, udehold, dato) fra F7: MatchData/MatchInfo/Date + TeamData[@Side] → Team/Name."""
+    sheet = match_sheet(f7_path)
+    return sheet.home, sheet.away, sheet.date
+
+def _parse_match_date(date: str | None):
     if date:
         try:
-            match_date = pd.to_datetime(date).date()
+            return pd.to_datetime(date).date()
         except Exception:
             pass
-    return match_name, match_date
+    return None
 
-def collect_round_data(round_dir: Path):
-    f24_files = [f for f in round_dir.iterdir()
-                 if f.is_file() and f.suffix.lower()==".xml" and "F24" in f.stem.upper()]
-    f7_files  = [f for f in round_dir.iterdir()
-                 if f.is_file() and f.suffix.lower()==".xml" and is_f7_like_filename(f)]
-    f70_files = [f for f in round_dir.iterdir()
-                 if f.is_file() and f.suffix.lower()==".xml" and is_f70_filename(f)]
+# --- Fixture-manifest: kampliste pr. runde, invalideret af mappens mtime ------
+FIXTURE_FILE = ARTIFACT_CACHE / "fixtures.json"
+
+@st.cache_resource(show_spinner=False)
+def _fixture_store() -> dict:
+    """{"rounds": {abs_dir: {"mtime_ns", "fixtures": [...]}}} – delt af sessioner og gemt på disk."""
+    try:
+        rounds = json.loads(FIXTURE_FILE.read_text())
+    except Exception:
+        rounds = {}
+    return {"rounds": rounds, "lock": threading.Lock()}
 
-    f7_by_id  = {(extract_match_id(f.name)  or f.stem): f for f in f7_files}
-    f70_by_id = {(extract_match_id(f.name) or f.stem): f for f in f70_files}
+def _scan_round(round_dir: Path) -> list[dict]:
+    """Én iterdir: klassificér F24/F7/F70 og læs hold + dato fra hver F24."""
+    files = [f for f in round_dir.iterdir() if f.is_file() and f.suffix.lower() == ".xml"]
+    f24_files = [f for f in files if "F24" in f.stem.upper()]
+    f7_by_id  = {(extract_match_id(f.name) or f.stem): f for f in files if is_f7_like_filename(f)}
+    f70_by_id = {(extract_match_id(f.name) or f.stem): f for f in files if is_f70_filename(f)}
 
-    rows = []
+    fixtures = []
     for f24 in f24_files:
         mid = extract_match_id(f24.name) or f24.stem
-        f7  = f7_by_id.get(mid)
-        f70 = f70_by_id.get(mid)
-        match_name, match_date = get_match_info_from_f24(f24)
+        f7, f70 = f7_by_id.get(mid), f70_by_id.get(mid)
+        home, away, date = read_match_header(f24, f7)
+        match_name = f"{home} - {away}" if home and away else f24.stem
+        match_date = _parse_match_date(date)
+        fixtures.append({
+            "match_id": mid, "home": home, "away": away,
+            "name": match_name, "date": match_date.isoformat() if match_date else None,
+            "f24": f24.name, "f7": f7.name if f7 else None, "f70": f70.name if f70 else None,
+        })
+    return fixtures
+
+def round_fixtures(round_dir: Path) -> list[dict]:
+    """Fixture-liste for én runde; scannes kun igen når mappens mtime ændrer sig."""
+    try:
+        mtime_ns = round_dir.stat().st_mtime_ns
+    except OSError:
+        return []
+    key = os.path.abspath(round_dir)
+    store = _fixture_store()
+    ent = store["rounds"].get(key)
+    if ent and ent["mtime_ns"] == mtime_ns:
+        return ent["fixtures"]
+    fixtures = _scan_round(round_dir)
+    if time.time_ns() - mtime_ns > _FP_SETTLE_NS:  # mappen er faldet til ro → tør huskes
+        with store["lock"]:
+            store["rounds"][key] = {"mtime_ns": mtime_ns, "fixtures": fixtures}
+            _save_fixtures(store["rounds"])
+    return fixtures
+
+def _save_fixtures(rounds: dict) -> None:
+    try:
+        FIXTURE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = FIXTURE_FILE.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(rounds))
+        os.replace(tmp, FIXTURE_FILE)
+    except Exception:
+        pass  # best effort
+
+def invalidate_fixtures() -> None:
+    """Glem alle runder (fx efter Dropbox-sync, der overskriver filer uden at ændre mappens mtime)."""
+    store = _fixture_store()
+    with store["lock"]:
+        store["rounds"].clear()
+        _save_fixtures(store["rounds"])
+
+def collect_round_data(round_dir: Path):
+    rows = []
+    for fx in round_fixtures(round_dir):
+        match_date = pd.Timestamp(fx["date"]).date() if fx["date"] else None
         rows.append({
             "Date": match_date.strftime("%d-%m-%Y") if match_date else "",
-            "Match": match_name,
-            "F24 file": f24.name,
-            "F7 file":  f7.name  if f7  else "(mangler)",
-            "F70 file": f70.name if f70 else "(mangler)",
+            "Match": fx["name"],
+            "F24 file": fx["f24"],
+            "F7 file":  fx["f7"]  or "(mangler)",
+            "F70 file": fx["f70"] or "(mangler)",
             "_sortdate": match_date
         })
     return rows
 
+if st.session_state.pop("fixtures_stale", False):
+    invalidate_fixtures()
+
 # =========================
 # Throw-in analyse – parsing
 # =========================
-EVENT_TYPE_PASS = 1
-EVENT_TYPE_BALL_OUT = 5
-QUALIFIER_THROW_IN = 107
-
-SHOT_TYPES = {13, 14, 15, 16}
-def _is_pass(ev): return ev.get("type_id") == EVENT_TYPE_PASS
-def _is_shot(ev): return ev.get("type_id") in SHOT_TYPES
-def _is_goal(ev): return ev.get("type_id") == 16
 
-def _safe_int(val, default=0):
-    try:
-        return int(val)
-    except Exception:
-        return default
 
-def _safe_float(val):
-    try:
-        return float(val)
-    except Exception:
-        return None
+# --- F7 kampark: ét gennemløb, delt af alle moduler ---------------------------
+F7_CACHE_MAX = 512  # kampark i hukommelsen
 
-def build_team_maps_from_f7(f7_path: Path):
-    name_map, side_map = {}, {}
-    try:
-        root = ET.parse(str(f7_path)).getroot()
-        for team in root.findall(".//Team"):
-            uid = team.attrib.get("uID")
-            name_el = team.find("Name")
-            raw_name = (name_el.text if name_el is not None else None) or team.attrib.get("TeamName")
-            name = normalize_team_name(raw_name)
-            if uid and name:
-                name_map[uid] = name
-                if uid.startswith("t") and uid[1:].isdigit():
-                    name_map[uid[1:]] = name
-        for td in root.findall(".//MatchData/TeamData"):
-            tref = td.attrib.get("TeamRef"); side = td.attrib.get("Side")
-            if tref and side:
-                side_map[tref] = side
-                if tref.startswith("t") and tref[1:].isdigit():
-                    side_map[tref[1:]] = side
-    except Exception:
-        pass
-    return name_map, side_map
 
-def build_player_map_from_f7(f7_path: Path) -> dict[str, str]:
-    """
-    Map: player_id (uID; også uden 'p' prefix) -> spillerens navn.
-    """
-    out = {}
-    try:
-        root = ET.parse(str(f7_path)).getroot()
-        for team in root.findall(".//Team"):
-            for p in team.findall("Player"):
-                pid = (p.attrib.get("uID") or p.attrib.get("uid") or "").strip()
-                person = p.find("PersonName")
-                first = (person.findtext("First") or "").strip() if person is not None else ""
-                known = (person.findtext("Known") or "").strip() if person is not None else ""
-                last  = (person.findtext("Last")  or person.findtext("FamilyName") or "").strip() if person is not None else ""
-                name = known if known else (" ".join(x for x in [first, last] if x).strip() or first or last or "")
-                if not name:
-                    name = "Unknown"
-                if pid:
-                    out[pid] = name
-                    if len(pid) > 1 and pid[1:].isdigit():
-                        out[pid[1:]] = name
-    except Exception:
-        pass
-    return out
+def match_sheet(f7_path) -> MatchSheet:
+    """Cachet MatchSheet (nøglet på filens fingerprint). Kun i hovedprocessen – workers bruger parse_match_sheet."""
+    if not f7_path:
+        return MatchSheet()
+    return _match_sheet_cached(str(f7_path), file_fingerprint(f7_path))
 
-def build_xg_map_from_f70(f70_path: Path):
-    """Opta F70 xG (qualifier_id=321) -> event_id -> xG."""
-    xg_map: dict[str, float] = {}
-    try:
-        if not f70_path or not Path(f70_path).exists():
-            return xg_map
-        root = ET.parse(str(f70_path)).getroot()
-        game = root.find(".//Game")
-        if game is None:
-            return xg_map
-        for ev in game.findall("Event"):
-            eid = ev.attrib.get("id")
-            if not eid:
-                continue
-            for q in ev.findall("Q"):
-                if q.attrib.get("qualifier_id") == "321":
-                    try:
-                        xg_map[str(eid)] = float(q.attrib.get("value", "0"))
-                    except Exception:
-                        pass
-                    break
-    except Exception:
-        pass
-    return xg_map
+@st.cache_resource(show_spinner=False, max_entries=F7_CACHE_MAX)
+def _match_sheet_cached(f7_str_path: str, fingerprint: str) -> MatchSheet:
+    return parse_match_sheet(Path(f7_str_path))
 
 # --- Pitch dims + distance helper --------------------------------------------
-PITCH_LENGTH_M = 105.0
-PITCH_WIDTH_M  = 68.0
 
 def _distance_m(x1, y1, x2, y2, length=PITCH_LENGTH_M, width=PITCH_WIDTH_M):
     """Euclidisk afstand (meter) mellem to Opta-koordinater (0..100)."""
@@ -1023,1379 +805,1188 @@ def in_box_opta(x, y, side="offensive"):
         return (0.0 <= float(x) <= 15.7) and (20.4 <= float(y) <= 79.6)
     return False
 
-def _parse_game_events(game_elem, team_name_map=None, team_side_map=None):
-    game_meta = {
-        "game_id": game_elem.attrib.get("id", ""),
-        "game_date": game_elem.attrib.get("game_date", ""),
-    }
-    events = []
-    for ev in game_elem.findall("Event"):
-        event_id = ev.attrib.get("id", "")
-        type_id   = _safe_int(ev.attrib.get("type_id", -1), -1)
-        period_id = _safe_int(ev.attrib.get("period_id", -1), -1)
-        team_id   = ev.attrib.get("team_id", "")
-        player_id = ev.attrib.get("player_id", "")
-        min_ = _safe_int(ev.attrib.get("min", 0), 0)
-        sec_ = _safe_int(ev.attrib.get("sec", 0), 0)
-        time_s = min_ * 60 + sec_
-
-        x = _safe_float(ev.attrib.get("x"))
-        y = _safe_float(ev.attrib.get("y"))
-
-        qmap = {}; qset = set()
-        for q in ev.findall("Q"):
-            qid = _safe_int(q.attrib.get("qualifier_id", -1), -1)
-            qset.add(qid)
-            if "value" in q.attrib:
-                qmap[qid] = q.attrib["value"]
-
-        end_x = _safe_float(qmap.get(140))
-        end_y = _safe_float(qmap.get(141))
-
-        team_name = normalize_team_name(team_name_map.get(team_id, team_id) if team_name_map else team_id)
-        team_side = team_side_map.get(team_id) if team_side_map else None
-        events.append({
-            "event_id": event_id,
-            "type_id": type_id, "period_id": period_id,
-            "team_id": team_id, "team_name": team_name, "team_side": team_side,
-            "player_id": player_id,
-            "min": min_, "sec": sec_, "time_s": time_s,
-            "x": x, "y": y, "end_x": end_x, "end_y": end_y,
-            "qualifiers": qset, "qmap": qmap,
-            "game_date": game_meta["game_date"],
-        })
-    events.sort(key=lambda x: (x["period_id"], x["time_s"]))
-    return game_meta, events
-
 def _zone_from_x(x):
     if x is None: return "Unknown"
     if x <= 33.3333: return "First 1/3"
     elif x <= 66.6666: return "Second 1/3"
     else: return "Last 1/3"
 
-def _is_fck(name: str) -> bool:
-    if not name: return False
-    return name in TEAM_ALIASES
-
-def _compute_throwin_delays(events, player_name_map=None):
-    rows, n = [], len(events)
-    for i, e in enumerate(events):
-        if e["type_id"] != EVENT_TYPE_BALL_OUT:
-            continue
-        period = e["period_id"]
-        t_out = e["time_s"]
-        j = i + 1
-        while j < n and events[j]["period_id"] == period:
-            nxt = events[j]
-            if nxt["type_id"] == EVENT_TYPE_BALL_OUT:
-                break
-            if nxt["type_id"] == EVENT_TYPE_PASS and (QUALIFIER_THROW_IN in nxt["qualifiers"]):
-                delay = max(0, nxt["time_s"] - t_out)
-                z = _zone_from_x(nxt.get("x"))
-
-                end_x = nxt.get("end_x"); end_y = nxt.get("end_y")
-                z_end = _zone_from_x(end_x)
-                end_in_box = in_box_opta(end_x, end_y, side="offensive")
-
-                # distance i meter
-                dist_m = _distance_m(nxt.get("x"), nxt.get("y"), end_x, end_y)
-
-                taker_id = nxt.get("player_id", "")
-                taker = player_name_map.get(taker_id, taker_id) if player_name_map else taker_id
-                if not taker:
-                    taker = "Unknown"
-
-                rows.append({
-                    "Period": period,
-                    "Ball out (mm:ss)": f"{e['min']:02d}:{e['sec']:02d}",
-                    "Throw-in (mm:ss)": f"{nxt['min']:02d}:{nxt['sec']:02d}",
-                    "Delay (s)": round(delay, 1),
-                    "Team": nxt["team_name"], "Side": nxt["team_side"] or "",
-                    "x": nxt.get("x"), "y": nxt.get("y"),
-                    "Zone": z, "Third": z,
-                    "end_x": end_x, "end_y": end_y,
-                    "End zone": z_end, "End third": z_end,
-                    "Thrown into the box": end_in_box,
-                    "Distance (m)": dist_m,
-                    "is_FCK": _is_fck(nxt["team_name"]),
-                    "throwin_event_id": nxt.get("event_id", ""),
-                    "throwin_team_id": nxt.get("team_id", ""),
-                    "throwin_time_s": nxt.get("time_s", None),
-                    "throwin_period": nxt.get("period_id", None),
-                    "Taker id": taker_id,
-                    "Taker": taker,
-                })
-                break
-            j += 1
-    return rows
 
 # --- Pasningskæde helpers -----------------------------------------------------
-def _forward_chain(seq_events, start_idx, max_gap_s=10):
-    start = seq_events[start_idx]
-    team = start["team_id"]; period = start["period_id"]
-    chain = [start_idx]
-    cur = start_idx
-    while cur + 1 < len(seq_events):
-        nxt = seq_events[cur + 1]
-        if nxt["period_id"] != period: break
-        if nxt["team_id"]  != team:    break
-        if (nxt["time_s"] - seq_events[cur]["time_s"]) > max_gap_s: break
-        chain.append(cur + 1)
-        cur += 1
-    return chain
-
-def _xml_event_has_qualifier(ev, qid: int) -> bool:
-    qid_str = str(qid)
-    for q in ev.findall("Q"):
-        if q.attrib.get("qualifier_id") == qid_str:
-            return True
-    return False
+def _chain_ids(period_id: np.ndarray, team: np.ndarray, time_s: np.ndarray, max_gap_s=10,
+               game: np.ndarray | None = None) -> np.ndarray:
+    """
+    Run-length kæde-id pr. event: ny kæde ved skift af periode eller hold, eller pause > max_gap_s –
+    og ved skift af game, når events fra flere games ligger i samme tabel (EventTable.concat).
+    """
+    if not len(period_id):
+        return np.zeros(0, dtype=np.int64)
+    boundary = (np.diff(period_id) != 0) | (np.diff(team) != 0) | (np.diff(time_s) > max_gap_s)
+    if game is not None:
+        boundary |= np.diff(game) != 0
+    return np.concatenate([[0], np.cumsum(boundary)])
+
+def _chain_last(chain_id: np.ndarray) -> np.ndarray:
+    """Position af sidste event i hver events kæde."""
+    ends = np.flatnonzero(np.append(chain_id[1:] != chain_id[:-1], True))
+    return ends[chain_id]
+
+def _lookup_rows(keys: list, query: list, keep: str) -> np.ndarray:
+    """Række i keys for hver query-nøgle (én eller flere kolonner); keep="first"/"last" ved dubletter, -1 hvis ingen."""
+    idx = pd.MultiIndex.from_arrays(keys) if len(keys) > 1 else pd.Index(keys[0], dtype=object)
+    q = pd.MultiIndex.from_arrays(query) if len(query) > 1 else pd.Index(query[0], dtype=object)
+    uniq = np.flatnonzero(~idx.duplicated(keep=keep))
+    if not len(uniq):
+        return np.full(len(q), -1, dtype=np.int64)
+    hit = idx[uniq].get_indexer(q)
+    return np.where(hit >= 0, uniq[np.maximum(hit, 0)], -1)
+
+def _with_none(values, ok) -> list:
+    """Liste med None hvor ok er False (samme dtype-inferens som de gamle række-dicts)."""
+    return [v if o else None for v, o in zip(np.asarray(values).tolist(), np.asarray(ok).tolist())]
 
-def _summarize_chain(seq_events, chain_idx_list):
-    start = seq_events[chain_idx_list[0]]
-    last  = seq_events[chain_idx_list[-1]]
-    n_pass = sum(1 for i in chain_idx_list if _is_pass(seq_events[i]))
-    n_evt  = len(chain_idx_list)
-    dur    = max(0, last["time_s"] - start["time_s"])
-    ends_shot = _is_shot(last)
-    if _is_pass(last):
-        ex, ey = last.get("end_x"), last.get("end_y")
-    else:
-        ex, ey = last.get("x"), last.get("y")
-    return {
-        "Seq events": n_evt,
-        "Seq passes": n_pass,
-        "Seq duration (s)": round(float(dur), 1),
-        "Seq ends with shot": bool(ends_shot),
-        "Seq last x": ex, "Seq last y": ey,
-        "Seq last type": ("Shot" if ends_shot else "Pass"),
-    }
 
 def _enrich_throwins_with_sequences(
-    events: list[dict],
+    ev: EventTable | SequenceEvents,
     df_throw: pd.DataFrame,
     xg_map: dict[str, float] | None,
     max_gap_s: int = 10,
     shot_window_s: int = 30
 ) -> pd.DataFrame:
+    """
+    Pasningskæde (afleveringer/skud) fra hvert indkast og første eget skud inden for shot_window_s.
+    Kæderne segmenteres én gang pr. kamp (_chain_ids); skud-vinduet slås op med searchsorted.
+    Indkastet findes på event id, ellers på (periode, tid, hold).
+    """
     if df_throw.empty:
         return df_throw
 
-    seq_events = [e for e in events if _is_pass(e) or _is_shot(e)]
-
-    by_eid_seq = {e.get("event_id",""): idx for idx, e in enumerate(seq_events) if e.get("event_id")}
-    sig_map_seq = defaultdict(list)
-    for idx, e in enumerate(seq_events):
-        sig_map_seq[(e.get("period_id"), e.get("time_s"), e.get("team_id"))].append(idx)
-
-    by_eid_all = {e.get("event_id",""): idx for idx, e in enumerate(events) if e.get("event_id")}
-    sig_map_all = defaultdict(list)
-    for idx, e in enumerate(events):
-        sig_map_all[(e.get("period_id"), e.get("time_s"), e.get("team_id"))].append(idx)
-
-    def _first_shot_within(all_events, start_idx_all, team_id, period_id, window_s):
-        t0 = all_events[start_idx_all]["time_s"]
-        k = start_idx_all
-        while k < len(all_events):
-            ev = all_events[k]
-            if ev["period_id"] != period_id:
-                break
-            dt = ev["time_s"] - t0
-            if dt > window_s:
-                break
-            if ev["team_id"] == team_id and _is_shot(ev):
-                return ev, dt
-            k += 1
-        return None, None
-
-    out_rows = []
-    for r in df_throw.to_dict("records"):
-        add = {
-            "Seq events": None, "Seq passes": None, "Seq duration (s)": None,
-            "Seq ends with shot": None, "Seq last x": None, "Seq last y": None, "Seq last type": None,
-            "Shot in 30s": False, "Goal in 30s": False,
-            "Shot time from TI (s)": None, "Shot x": None, "Shot y": None,
-            "Shot xG (30s)": None, "Shot event id": None,
-        }
-
-        idx_seq = None
-        eid = r.get("throwin_event_id", "")
-        if eid and eid in by_eid_seq:
-            idx_seq = by_eid_seq[eid]
-        else:
-            sig = (r.get("throwin_period"), r.get("throwin_time_s"), r.get("throwin_team_id"))
-            cand = sig_map_seq.get(sig, [])
-            if cand: idx_seq = cand[0]
-
-        if idx_seq is not None and seq_events:
-            chain = _forward_chain(seq_events, idx_seq, max_gap_s=max_gap_s)
-            add.update(_summarize_chain(seq_events, chain))
-
-        idx_all = None
-        if eid and eid in by_eid_all:
-            idx_all = by_eid_all[eid]
-        else:
-            sig = (r.get("throwin_period"), r.get("throwin_time_s"), r.get("throwin_team_id"))
-            cand = sig_map_all.get(sig, [])
-            if cand: idx_all = cand[0]
-
-        if idx_all is not None:
-            shot_ev, dt = _first_shot_within(events, idx_all, r.get("throwin_team_id"), r.get("throwin_period"), shot_window_s)
-            if shot_ev is not None:
-                add["Shot in 30s"] = True
-                add["Goal in 30s"] = _is_goal(shot_ev)
-                add["Shot time from TI (s)"] = round(float(dt), 1)
-                add["Shot x"] = shot_ev.get("x"); add["Shot y"] = shot_ev.get("y")
-                add["Shot event id"] = shot_ev.get("event_id")
-                if xg_map:
-                    add["Shot xG (30s)"] = float(xg_map.get(str(shot_ev.get("event_id","")), None)) if xg_map is not None else None
-
-        out_rows.append({**r, **add})
-
-    return pd.DataFrame(out_rows)
+    n_ti = len(df_throw)
+    t_eid = df_throw["throwin_event_id"].fillna("").astype(str).to_numpy(dtype=object)
+    t_period = df_throw["throwin_period"].to_numpy()
+    t_time = df_throw["throwin_time_s"].to_numpy()
+    t_team_id = df_throw["throwin_team_id"].to_numpy(dtype=object)
+    team_code = {tid: c for c, tid in enumerate(ev.team_ids)}
+    t_team = np.array([team_code.get(t, -1) for t in t_team_id.tolist()], dtype=np.int64)
+    has_eid = t_eid != ""
+    team_ids_arr = np.array(ev.team_ids, dtype=object)
+
+    def _find(rows: np.ndarray) -> np.ndarray:
+        """Indkastets position blandt rows: sidste med samme id, ellers første med samme signatur."""
+        found = _lookup_rows([ev.event_id[rows]], [t_eid], keep="last")
+        found[~has_eid] = -1
+        miss = np.flatnonzero(found < 0)
+        if len(miss):
+            found[miss] = _lookup_rows(
+                [ev.period_id[rows], ev.time_s[rows], team_ids_arr[ev.team[rows]]],
+                [t_period[miss], t_time[miss], t_team_id[miss]], keep="first",
+            )
+        return found
+
+    # --- kæde fra indkastet (kun afleveringer/skud; indkastet er selv en aflevering) ---
+    seq_rows = np.flatnonzero(ev.is_pass | ev.is_shot)
+    pos = _find(seq_rows)
+    in_seq = pos >= 0
+    start = np.maximum(pos, 0)
+    cid = _chain_ids(ev.period_id[seq_rows], ev.team[seq_rows], ev.time_s[seq_rows], max_gap_s)
+    end = _chain_last(cid)[start]
+    cum_pass = np.concatenate([[0], np.cumsum(ev.is_pass[seq_rows])])
+    first_row, last_row = seq_rows[start], seq_rows[end]
+    last_type = ev.type_id[last_row]
+    ends_shot = np.isin(last_type, list(SHOT_TYPES))
+    last_is_pass = last_type == EVENT_TYPE_PASS
+    last_x = np.where(last_is_pass, ev.end_x[last_row], ev.x[last_row])
+    last_y = np.where(last_is_pass, ev.end_y[last_row], ev.y[last_row])
+    dur = np.maximum(0, ev.time_s[last_row] - ev.time_s[first_row]).astype(np.float64)
+
+    # --- første eget skud i vinduet: searchsorted på (hold, række) blandt skuddene ---
+    idx_all = _find(np.arange(len(ev)))
+    i0 = np.maximum(idx_all, 0)
+    shot_rows = np.flatnonzero(ev.is_shot)
+    shot_key = ev.team[shot_rows].astype(np.int64) * len(ev) + shot_rows
+    order = np.argsort(shot_key, kind="stable")
+    shot_key, shot_rows = shot_key[order], np.append(shot_rows[order], 0)  # 0 = vagt for "ingen"
+    k = shot_rows[np.searchsorted(shot_key, t_team * len(ev) + i0)]
+    dt = ev.time_s[k] - ev.time_s[i0]
+    has_shot = (
+        (idx_all >= 0) & ev.is_shot[k] & (ev.team[k] == t_team) & (k >= i0)
+        & (ev.period_id[i0] == t_period) & (ev.period_id[k] == t_period) & (dt <= shot_window_s)
+    )
+    shot_eid = ev.event_id[k]
+    shot_xg = np.full(n_ti, None, dtype=object)
+    if xg_map:
+        shot_xg[:] = [xg_map.get(e) for e in shot_eid.tolist()]
+    xg_ok = has_shot & np.not_equal(shot_xg, None)
+
+    add = pd.DataFrame({
+        "Seq events": _with_none(end - start + 1, in_seq),
+        "Seq passes": _with_none(cum_pass[end + 1] - cum_pass[start], in_seq),
+        "Seq duration (s)": _with_none(np.round(dur, 1), in_seq),
+        "Seq ends with shot": _with_none(ends_shot, in_seq),
+        "Seq last x": _with_none(last_x, in_seq & ~np.isnan(last_x)),
+        "Seq last y": _with_none(last_y, in_seq & ~np.isnan(last_y)),
+        "Seq last type": _with_none(np.where(ends_shot, "Shot", "Pass"), in_seq),
+        "Shot in window": has_shot.tolist(),
+        "Goal in window": (has_shot & (ev.type_id[k] == 16)).tolist(),
+        "Shot time from TI (s)": _with_none(np.round(dt.astype(np.float64), 1), has_shot),
+        "Shot x": _with_none(ev.x[k], has_shot & ~np.isnan(ev.x[k])),
+        "Shot y": _with_none(ev.y[k], has_shot & ~np.isnan(ev.y[k])),
+        "Shot xG (window)": _with_none(shot_xg.astype(object), xg_ok),
+        "Shot event id": _with_none(shot_eid, has_shot),
+    }, index=df_throw.index)
+    return pd.concat([df_throw.drop(columns=add.columns, errors="ignore"), add], axis=1)
+
+# --- xG Chain: kæder med skud-xG pr. kamp --------------------------------------
+def xg_chain_frames(ev: EventTable, player_map: dict | None, xg_map: dict | None,
+                    include_pen: bool = True, max_gap_s: int = 10, last_pass_only: bool = False):
+    """
+    Én kamps afleveringer/skud delt i kæder (_chain_ids) → (bidrag, alle).
+    bidrag: én række pr. (skud, unik Team/Player) i kæden frem til skuddet, med skuddets xG
+    (kun skud med xG > 0; straffe fravælges med include_pen=False).
+    alle: Team/Player for hver aflevering/skud – nævneren for "all chains".
+    """
+    seq = np.flatnonzero(ev.is_pass | ev.is_shot)
+    names = np.array([(player_map.get(pid, pid) if player_map else pid) or "Unknown"
+                      for pid in ev.player_ids], dtype=object)
+    team = np.array(ev.team_names, dtype=object)[ev.team[seq]]
+    player = names[ev.player[seq]]
+    everyone = pd.DataFrame({"Team": team, "Player": player})
+
+    cid = _chain_ids(ev.period_id[seq], ev.team[seq], ev.time_s[seq], max_gap_s,
+                     game=None if ev.game is None else ev.game[seq])
+    starts = np.flatnonzero(np.append(True, cid[1:] != cid[:-1])) if len(cid) else np.zeros(0, np.int64)
+    run_start = starts[cid]
+
+    shot_mask = ev.is_shot[seq]
+    if not include_pen:
+        shot_mask &= ~ev.qualifier_mask(QUALIFIER_PENALTY)[seq]
+    shot_pos = np.flatnonzero(shot_mask)
+    eids = ev.event_id[seq]
+    xg = np.array([float((xg_map or {}).get(str(e), 0.0)) for e in eids[shot_pos].tolist()], dtype=np.float64)
+    shot_pos, xg = shot_pos[xg > 0], xg[xg > 0]
+
+    if last_pass_only:
+        # kun sidste aflevering i kæden før skuddet + skytten
+        last_pass = np.maximum.accumulate(np.where(ev.is_pass[seq], np.arange(len(seq)), -1))[shot_pos]
+        has = last_pass >= run_start[shot_pos]
+        shot_of = np.concatenate([np.flatnonzero(has), np.arange(len(shot_pos))])
+        member = np.concatenate([last_pass[has], shot_pos])
+        order = np.argsort(shot_of, kind="stable")
+        shot_of, member = shot_of[order], member[order]
+    else:
+        lengths = shot_pos - run_start[shot_pos] + 1
+        shot_of = np.repeat(np.arange(len(shot_pos)), lengths)
+        offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        member = np.repeat(run_start[shot_pos], lengths) + offsets
+
+    contribs = pd.DataFrame({"shot": shot_of, "Team": team[member], "Player": player[member]})
+    contribs = contribs.drop_duplicates(["shot", "Team", "Player"])   # én kredit pr. spiller pr. kæde
+    shot_eid = eids[shot_pos][contribs["shot"].to_numpy()]
+    contribs = contribs.drop(columns="shot").assign(
+        EventID=shot_eid, ShotEventID=shot_eid, xGChain=xg[contribs["shot"].to_numpy()],
+    )
+    return contribs.reset_index(drop=True), everyone
 
 # --- Outlier / retention / versions ------------------------------------------
 OUTLIER_THR = 40
 BALL_RETENTION_THR_S = 7.0
-SCHEMA_VER = 18  # cache-bust
+SEQ_MAX_GAP_S = 10
+SHOT_WINDOW_S = 30
+THROWIN_PARAM_CACHE_MAX = 8  # parametersæt holdt i hukommelsen
 # -----------------------------------------------------------------------------
 
+@dataclass(frozen=True)
+class ThrowinParams:
+    """
+    Tærskler bag de afledte indkast-kolonner. Rå indkast og events caches uafhængigt af dem,
+    så et nyt sæt kun kører berigelsen igen (enrich_throwins) – ingen XML-parse, ingen SCHEMA_VER.
+    """
+    max_gap_s: int = SEQ_MAX_GAP_S                  # pause der afslutter en pasningskæde
+    shot_window_s: int = SHOT_WINDOW_S              # skud så længe efter indkastet tæller med
+    retention_s: float = float(BALL_RETENTION_THR_S)  # kæde-varighed for "Ball retention"
+    outlier_s: float = float(OUTLIER_THR)           # delay over dette er outlier
+
 def _mark_outliers(df: pd.DataFrame, thr: float = OUTLIER_THR) -> pd.Series:
     d = pd.to_numeric(df.get("Delay (s)"), errors="coerce")
     return d > float(thr)
 
-@st.cache_data(show_spinner=False)
-def parse_throwin_delays_from_f24_cached(
-    f24_str_path: str,
-    f7_str_path: str | None,
-    f70_str_path: str | None,
-    cache_buster: int = SCHEMA_VER
-):
-    f24_path = Path(f24_str_path)
-    f7_path = Path(f7_str_path) if f7_str_path else None
-    f70_path = Path(f70_str_path) if f70_str_path else None
+# --- Disk-cache for parsede kampe (én parquet-fil pr. kamp og tabel) ---------
 
-    name_map, side_map = {}, {}
-    player_map = {}
-    if f7_path and f7_path.exists():
-        name_map, side_map = build_team_maps_from_f7(f7_path)
-        player_map = build_player_map_from_f7(f7_path)
+def _file_digest(path) -> str:
+    """Indholds-hash af en fil ('' hvis den mangler)."""
+    if not path or not Path(path).exists():
+        return ""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-    xg_map = {}
-    if f70_path and f70_path.exists():
-        xg_map = build_xg_map_from_f70(f70_path)
+# --- Fingerprints: (størrelse, mtime) som hurtig-tjek, indholds-hash ved ændring --
+FINGERPRINT_FILE = ARTIFACT_CACHE / "fingerprints.json"
+_FP_SETTLE_NS = 2_000_000_000  # filer ændret inden for 2s huskes ikke (mtime-opløsning)
 
-    all_rows = []
+@st.cache_resource(show_spinner=False)
+def _fingerprint_memo() -> dict:
+    """{abs_path: [size, mtime_ns, digest]} – delt af alle sessioner og gemt mellem genstarter."""
     try:
-        root = ET.parse(str(f24_path)).getroot()
+        files = json.loads(FINGERPRINT_FILE.read_text())
     except Exception:
-        return pd.DataFrame()
-
-    for game in root.findall(".//Game"):
-        game_meta, events = _parse_game_events(game, team_name_map=name_map, team_side_map=side_map)
-        base_rows = _compute_throwin_delays(events, player_name_map=player_map)
-
-        df_enriched = _enrich_throwins_with_sequences(
-            events, pd.DataFrame(base_rows), xg_map=xg_map, max_gap_s=10, shot_window_s=30
-        )
+        files = {}
+    return {"files": files, "lock": threading.Lock(), "dirty": False}
 
-        df_enriched["Seq duration (s)"] = pd.to_numeric(df_enriched.get("Seq duration (s)"), errors="coerce")
-        df_enriched["Ball retention"] = df_enriched["Seq duration (s)"].fillna(0) >= float(BALL_RETENTION_THR_S)
-
-        for r in df_enriched.to_dict("records"):
-            r["Game date"] = game_meta.get("game_date", "")
-            all_rows.append(r)
-    return pd.DataFrame(all_rows)
-
-# =============================================================================
-#                                  MODULES
-# =============================================================================
-def render_throwins_module():
-    # NY: Tilføj “Spillerikoner”-fane
-    tab_superliga, tab_Comparison, tab_individuals, tab_icons, tab_data, tab_matches = st.tabs(
-        ["Throw in overview", "Comparison", "Individuals", "Spillerikoner", "Throw in Data", "Matches"]
-    )
+def file_fingerprint(path) -> str:
+    """Indholds-hash af en fil; genberegnes kun når størrelse eller mtime har ændret sig."""
+    if not path:
+        return ""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    key = os.path.abspath(path)
+    memo = _fingerprint_memo()
+    hit = memo["files"].get(key)
+    if hit and hit[0] == stat.st_size and hit[1] == stat.st_mtime_ns:
+        return hit[2]
+    digest = _file_digest(path)
+    if time.time_ns() - stat.st_mtime_ns > _FP_SETTLE_NS:
+        with memo["lock"]:
+            memo["files"][key] = [stat.st_size, stat.st_mtime_ns, digest]
+            memo["dirty"] = True
+    return digest
+
+def match_fingerprint(f24_path, f7_path=None, f70_path=None) -> str:
+    """Samlet fingerprint for én kamps filer – bruges som cache-nøgle i stedet for stierne."""
+    parts = [file_fingerprint(p) for p in (f24_path, f7_path, f70_path)]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+def save_fingerprints() -> None:
+    """Skriv fingerprint-memo til disk hvis der er nye hashes (atomisk, best effort)."""
+    memo = _fingerprint_memo()
+    if not memo["dirty"]:
+        return
+    with memo["lock"]:
+        payload = json.dumps(memo["files"])
+        memo["dirty"] = False
+    try:
+        FINGERPRINT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = FINGERPRINT_FILE.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(payload)
+        os.replace(tmp, FINGERPRINT_FILE)
+    except Exception:
+        pass
 
-def render_xg_module():
-    st.header("xG totals")
 
-    round_dirs_all = list_round_dirs(DATA_BASE)
-    if not round_dirs_all:
-        st.info("Ingen runder fundet.")
-        st.stop()
+@st.cache_resource(show_spinner=False)
+def _prune_artifacts(schema_ver: int = SCHEMA_VER) -> None:
+    """Fjern artefakter fra gamle SCHEMA_VER-versioner (én gang pr. proces)."""
+    if not ARTIFACT_CACHE.exists():
+        return
+    for d in ARTIFACT_CACHE.iterdir():
+        if d.is_dir() and d.name.startswith("v") and d.name != f"v{schema_ver}":
+            shutil.rmtree(d, ignore_errors=True)
+
+def load_artifact(table: str, fingerprint: str, build) -> pd.DataFrame:
+    """
+    Læs tabellen for én kamp fra disk-cachen – nøglet på match_fingerprint() + SCHEMA_VER –
+    eller byg den med build() og gem den. Uden pyarrow bygges der bare hver gang.
+    """
+    if not _HAS_PARQUET:
+        return build()
+    _prune_artifacts(SCHEMA_VER)
+    return _artifact_io(_artifact_path(table, fingerprint), build)
 
-    # Vælg runder (samme UX som Throw-ins)
-    def _round_num(p: Path):
-        m = re.search(r"R(\d+)$", p.name)
-        return int(m.group(1)) if m else None
 
-    rnums = [n for n in (_round_num(p) for p in round_dirs_all) if n is not None]
-    min_r, max_r = min(rnums), max(rnums)
+# --- MatchBundle: én parse pr. kamp, delt af alle moduler --------------------
+# Alt fra st.cache_resource herunder (MatchBundle, MatchSheet, F70Index, events og sæson-/kube-/
+# spillertabeller) deles af alle sessioner og må kun læses. EventTable-arrays er skrivebeskyttede,
+# og de offentlige tabel-funktioner returnerer copy(deep=False) – med copy-on-write en billig
+# kopi, så kalderens ændringer aldrig rammer cachen. _-funktionerne giver det delte objekt.
+BUNDLE_CACHE_MAX = 256  # kampe holdt i hukommelsen (≈ en sæson + lidt)
 
-    with filter_card("Rounds"):
-        sel_min, sel_max = st.slider(" ",
-                                     min_value=min_r, max_value=max_r,
-                                     value=(min_r, max_r), step=1, key="xg_rounds")
 
-    sel_rounds = {r for r in range(sel_min, sel_max + 1)}
-    round_dirs = [p for p in round_dirs_all if _round_num(p) in sel_rounds]
+def load_match_bundle(
+    f24_str_path: str,
+    f7_str_path: str | None,
+    f70_str_path: str | None,
+    cache_buster: int = SCHEMA_VER,
+    projection: str = "all",
+) -> MatchBundle:
+    fingerprint = match_fingerprint(f24_str_path, f7_str_path, f70_str_path)
+    return _load_match_bundle(f24_str_path, f7_str_path, f70_str_path, fingerprint, cache_buster, projection)
 
-    # Saml xG pr. hold på tværs af de valgte runder
-    all_rows = []
-    for round_dir in round_dirs:
-        rows = collect_round_data(round_dir)
-        if not rows:
-            continue
-        df_round = pd.DataFrame(rows)
-        for _, r in df_round.iterrows():
-            f24_path = round_dir / r["F24 file"]
-            f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-            if not f24_path.exists() or not (f70_path and f70_path.exists()):
-                continue
+@st.cache_resource(show_spinner=False)
+def _loaded_bundles() -> set:
+    """(fingerprint, projection) der er bygget ind i bundle-cachen (kan være evicted igen – kun et hint)."""
+    return set()
 
-            # Parse holdnavne (genbrug fra kodebasen)
-            name_map, _ = build_team_maps_from_f7(round_dir / r["F7 file"]) if r["F7 file"] != "(mangler)" else ({}, {})
-            xg_map = build_xg_map_from_f70(f70_path)
+@st.cache_resource(show_spinner=False, max_entries=BUNDLE_CACHE_MAX)
+def _load_match_bundle(
+    f24_str_path: str,
+    f7_str_path: str | None,
+    f70_str_path: str | None,
+    fingerprint: str,
+    cache_buster: int = SCHEMA_VER,
+    projection: str = "all",
+    _prebuilt: MatchBundle | None = None,   # fra prefetch_match_bundles (hashes ikke)
+) -> MatchBundle:
+    _loaded_bundles().add((fingerprint, projection))
+    return _prebuilt or _build_bundle(f24_str_path, f7_str_path, f70_str_path, projection)
 
-            try:
-                root = ET.parse(str(f24_path)).getroot()
-            except Exception:
-                continue
 
-            for game in root.findall(".//Game"):
-                # Shots = type_id in {13,14,15,16}
-                for ev in game.findall("Event"):
-                    if ev.attrib.get("type_id") not in {"13", "14", "15", "16"}:
-                        continue
-                    ev_id = ev.attrib.get("id")
-                    team_id = ev.attrib.get("team_id")
-                    team = name_map.get(team_id, team_id)
-                    xg = float(xg_map.get(str(ev_id), 0.0))
-                    all_rows.append({
-                        "Round": round_dir.name,
-                        "Match": r["Match"],
-                        "Team": team,
-                        "xG": xg
-                    })
-
-    if not all_rows:
-        st.info("Ingen xG-data fundet for det valgte interval.")
-        st.stop()
+def parse_throwin_delays_from_f24_cached(
+    f24_str_path: str,
+    f7_str_path: str | None,
+    f70_str_path: str | None,
+    cache_buster: int = SCHEMA_VER,
+    params: ThrowinParams = ThrowinParams(),
+):
+    fingerprint = match_fingerprint(f24_str_path, f7_str_path, f70_str_path)
+    return _parse_throwin_delays_cached(f24_str_path, f7_str_path, f70_str_path, fingerprint, cache_buster, params)
 
-    xg_df = pd.DataFrame(all_rows)
-    g = xg_df.groupby("Team", dropna=False)
-    out = pd.DataFrame({
-        "Games": g["Match"].nunique(),
-        "Shots": g.size(),
-        "xG": g["xG"].sum()
-    }).reset_index()
-    out["xG per game"] = (out["xG"] / out["Games"]).round(2)
-    out["xG per shot"] = (out["xG"] / out["Shots"]).round(3)
-
-    # Plot (FCK highlight)
-    import altair as alt
-    plot_df = out.copy()
-    plot_df["is_FCK"] = plot_df["Team"].apply(lambda t: t in TEAM_ALIASES)
-    metric = st.selectbox("Metric", ["xG", "xG per game", "xG per shot", "Shots", "Games"], index=0)
-    plot_df = plot_df.sort_values([metric, "Team"], ascending=[False, True])
-    order = plot_df["Team"].tolist()
-
-    chart = (
-        alt.Chart(plot_df, height=max(320, len(plot_df)*28), width="container")
-          .mark_bar()
-          .encode(
-              y=alt.Y("Team:N", sort=order),
-              x=alt.X(f"{metric}:Q", title=metric),
-              color=alt.condition(alt.datum.is_FCK, alt.value(BRAND["primary"]), alt.value("#A1A1A1")),
-              tooltip=["Team", "xG", "xG per game", "xG per shot", "Shots", "Games"]
-          )
-          .configure_legend(disable=True)
+@st.cache_data(show_spinner=False, max_entries=THROWIN_PARAM_CACHE_MAX * 64)
+def _parse_throwin_delays_cached(
+    f24_str_path: str,
+    f7_str_path: str | None,
+    f70_str_path: str | None,
+    fingerprint: str,
+    cache_buster: int = SCHEMA_VER,
+    params: ThrowinParams = ThrowinParams(),
+):
+    raw = load_artifact(
+        "throwins", fingerprint,
+        lambda: _parse_throwin_delays(
+            _load_match_bundle(f24_str_path, f7_str_path, f70_str_path, fingerprint, cache_buster,
+                               _TABLE_PROJECTIONS["throwins"])
+        ),
     )
-    st.altair_chart(chart, use_container_width=True)
-
-    with st.expander("xG – fuld tabel"):
-        show_cols = ["Team", "Games", "Shots", "xG", "xG per game", "xG per shot"]
-        st.dataframe(out[show_cols].sort_values("xG", ascending=False), hide_index=True)
-
-    # ---- Superliga/FCK throw-ins (oversigt) ----
-    with tab_superliga:
-        st.header("Superliga throw-ins 2025/26")
-
-        round_dirs_all = list_round_dirs(DATA_BASE)
-        if not round_dirs_all:
-            st.stop()
-
-        def _round_num(p: Path):
-            m = re.search(r"R(\d+)$", p.name)
-            return int(m.group(1)) if m else None
-
-        round_nums = [n for n in (_round_num(p) for p in round_dirs_all) if n is not None]
-        min_r, max_r = min(round_nums), max(round_nums)
-
+    if raw.empty:
+        return raw
+    events = _throwin_events(f24_str_path, f7_str_path, f70_str_path, fingerprint, cache_buster)
+    return enrich_throwins(raw, events, params)
 
+@st.cache_resource(show_spinner=False, max_entries=BUNDLE_CACHE_MAX)
+def _throwin_events(
+    f24_str_path: str,
+    f7_str_path: str | None,
+    f70_str_path: str | None,
+    fingerprint: str,
+    cache_buster: int = SCHEMA_VER,
+) -> pd.DataFrame:
+    """Kampens events som SequenceEvents-tabel (artefakt "throwin_events")."""
+    return load_artifact(
+        "throwin_events", fingerprint,
+        lambda: _throwin_event_frame(
+            _load_match_bundle(f24_str_path, f7_str_path, f70_str_path, fingerprint, cache_buster,
+                               _TABLE_PROJECTIONS["throwins"])
+        ),
+    )
 
-        # ---------- FILTERS ABOVE GRAPH ----------
-        with filter_card("Rounds"):
-            sel_min, sel_max = st.slider(" ",
-                                         min_value=min_r, max_value=max_r,
-                                         value=(min_r, max_r), step=1, key="ov_rounds")
-
-        c1, c2, c3, c4, c5, c6 = st.columns(6)
-        with c1:
-            with filter_card("Home/Away"):
-                side_filter = st.radio(" ", ["All", "Home", "Away"], horizontal=False, key="superliga_side_filter")
-        with c2:
-            with filter_card("Third"):
-                third_filter = st.radio("  ", ["All", "First 1/3", "Second 1/3", "Last 1/3"],
-                                        horizontal=False, key="superliga_third_filter")
-        with c3:
-            with filter_card("Thrown into the box"):
-                thrown_box_filter = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="superliga_thrownbox_filter")
-        with c4:
-            with filter_card("Ball retention (≥7s)"):
-                retention_filter = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="superliga_retention_filter")
-        with c5:
-            with filter_card("Shot ≤30s"):
-                shot30_filter = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="superliga_shot30_filter")
-        with c6:
-            with filter_card("Goal ≤30s"):
-                goal30_filter = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="superliga_goal30_filter")
-        # ----------------------------------------
 
-        selected_rounds = {r for r in range(sel_min, sel_max + 1)}
-        round_dirs = [p for p in round_dirs_all if _round_num(p) in selected_rounds]
+def enrich_throwins(raw: pd.DataFrame, events: pd.DataFrame, params: ThrowinParams = ThrowinParams()) -> pd.DataFrame:
+    """
+    Rå indkast for én kamp + dens events → kæde, skud-vindue og ball retention efter params.
+    Kolonner som Game date/Round/Match føres uændret igennem til sidst.
+    """
+    meta = [c for c in ("Game date", "Round", "Match") if c in raw.columns]
+    parts = []
+    for g, part in raw.groupby("_game", sort=True):
+        ev, xg_map = SequenceEvents.from_frame(events[events["_game"] == g])
+        df = _enrich_throwins_with_sequences(
+            ev, part.drop(columns=meta + ["_game"]), xg_map=xg_map,
+            max_gap_s=params.max_gap_s, shot_window_s=params.shot_window_s,
+        )
+        df["Seq duration (s)"] = pd.to_numeric(df.get("Seq duration (s)"), errors="coerce")
+        df["Ball retention"] = df["Seq duration (s)"].fillna(0) >= float(params.retention_s)
+        parts.append(pd.concat([df, part[meta]], axis=1))
+    return pd.concat(parts, ignore_index=True).infer_objects()
 
-        all_rows = []
-        for round_dir in round_dirs:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(str(f24_path), str(f7_path) if f7_path else None,
-                                                                str(f70_path) if f70_path else None, SCHEMA_VER)
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows.append(df_throw)
+# --- Parallel sæson-ingest ---------------------------------------------------
+INGEST_WORKERS = int(os.getenv("FCK_INGEST_WORKERS") or 0) or min(8, os.cpu_count() or 1)
 
-        if not all_rows:
-            st.info("Ingen indkast fundet i det valgte interval.")
-            st.stop()
+def match_jobs(round_dirs) -> list[dict]:
+    """Alle (F24, F7, F70)-tripler i de givne runder – én dict pr. kamp, i visningsrækkefølge."""
+    jobs = []
+    for round_dir in round_dirs:
+        for r in collect_round_data(round_dir):
+            f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
+            f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
+            jobs.append({
+                "Round": round_dir.name,
+                "Match": r["Match"],
+                "f24": str(round_dir / r["F24 file"]),
+                "f7":  str(f7_path)  if f7_path  else None,
+                "f70": str(f70_path) if f70_path else None,
+            })
+    return jobs
+
+def _run_parallel(fn, arg_lists: list[tuple], workers: int) -> list:
+    """
+    fn(*args) for hver args – i en process-pool når det kan betale sig, ellers serielt.
+    Fejl i fn går videre til kalderen; en død pool (BrokenProcessPool) eller et job der ikke kan
+    pickles (PicklingError/AttributeError) giver seriel fallback.
+
+    fn skal ligge i superliga_ingest: Streamlit exec'er scriptet som __main__ med et nyt modul-objekt
+    ved hver kørsel, så funktioner herfra kan ikke pickles på tværs af sessioner. fork fra den
+    flertrådede server er sikkert her, fordi fn kun er rene modul-funktioner (_ingest_worker/
+    _bundle_worker: XML-parse, numpy/pandas og parquet-skrivning) – de tager ingen af app'ens låse og
+    kalder aldrig st.*, så en lås som en anden tråd holdt under fork bliver aldrig forsøgt taget i barnet.
+    """
+    workers = min(workers, len(arg_lists))
+    if workers > 1 and "fork" in mp.get_all_start_methods():
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork")) as ex:
+                return list(ex.map(fn, *zip(*arg_lists)))
+        except BrokenProcessPool as e:
+            log.warning("Process-pool døde (%s) – kører %d jobs serielt", e, len(arg_lists))
+        except (pickle.PicklingError, AttributeError) as e:
+            log.warning("Job kunne ikke pickles (%s) – kører %d jobs serielt", e, len(arg_lists))
+    return [fn(*args) for args in arg_lists]
 
-        season_df = pd.concat(all_rows, ignore_index=True)
-
-        if "Thrown into the box" not in season_df.columns and "End in box" in season_df.columns:
-            season_df["Thrown into the box"] = season_df["End in box"]
-
-        for col, default in [
-            ("Thrown into the box", False),
-            ("end_x", None), ("end_y", None),
-            ("End zone", None), ("End third", None),
-            ("Seq events", None), ("Seq passes", None), ("Seq duration (s)", None),
-            ("Seq ends with shot", None), ("Seq last type", None), ("Seq last x", None), ("Seq last y", None),
-            ("Ball retention", False),
-            ("Shot in 30s", False), ("Goal in 30s", False),
-            ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (30s)", 0.0),
-            ("Distance (m)", None),
-        ]:
-            if col not in season_df.columns:
-                season_df[col] = default
-
-        if side_filter != "All":
-            season_df = season_df[season_df["Side"] == side_filter]
-        if third_filter != "All":
-            season_df = season_df[season_df["Third"] == third_filter]
-        if thrown_box_filter != "All":
-            season_df = season_df[season_df["Thrown into the box"] == (thrown_box_filter == "Yes")]
-        if retention_filter != "All":
-            season_df = season_df[season_df["Ball retention"] == (retention_filter == "Retained")]
-        if shot30_filter != "All":
-            season_df = season_df[season_df["Shot in 30s"] == (shot30_filter == "Yes")]
-        if goal30_filter != "All":
-            season_df = season_df[season_df["Goal in 30s"] == (goal30_filter == "Yes")]
-
-        if season_df.empty:
-            st.info("Ingen indkast efter valgte filtre.")
-            st.stop()
 
-        season_df["Delay (s)"] = pd.to_numeric(season_df["Delay (s)"], errors="coerce")
-        season_df["Team"] = season_df["Team"].apply(normalize_team_name)
-        season_df["Shot xG (30s)"] = pd.to_numeric(season_df["Shot xG (30s)"], errors="coerce")
-        season_df["is_outlier"] = _mark_outliers(season_df)
-        season_df_used = season_df[~season_df["is_outlier"]].copy()
-
-        g = season_df_used.groupby("Team", dropna=False)
-
-        games = g["Match"].nunique().rename("Games")
-        tot_throw = g.size().rename("Total throw-ins")
-        avg_delay = g["Delay (s)"].mean().round(2).rename("Avg. delay (s)")
-        lt7 = g.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay = g["Delay (s)"].sum().round(1).rename("Total delay (s)")
-
-        thrown_cnt = g.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        thrown_pct = ((thrown_cnt / tot_throw) * 100).round(1).rename("% thrown into box")
-        thrown_per_game = (thrown_cnt / games).round(2).rename("Thrown into box per game")
-
-        retained_cnt = g.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        pct_retained = ((retained_cnt / tot_throw) * 100).round(1).rename("Retention %")
-        retained_per_game = (retained_cnt / games).round(2).rename("Retained per game")
-
-        shot30_cnt = g.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("Shots ≤30s")
-        shot30_pct = ((shot30_cnt / tot_throw) * 100).round(1).rename("% Shots ≤30s")
-        goal30_cnt = g.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("Goals ≤30s")
-        goal30_pct = ((goal30_cnt / tot_throw) * 100).round(1).rename("% Goals ≤30s")
-        xg30_sum   = g["Shot xG (30s)"].sum().round(2).rename("xG ≤30s")
-        xg30_per_ti = (xg30_sum / tot_throw).round(3).rename("xG per ≤30s")
-        xg30_per_game = (xg30_sum / games).round(2).rename("xG per game ≤30s")
-
-        overview = pd.concat(
-            [games, tot_throw, avg_delay, lt7, total_delay,
-             thrown_cnt, thrown_pct, thrown_per_game,
-             retained_cnt, pct_retained, retained_per_game,
-             shot30_cnt, shot30_pct, goal30_cnt, goal30_pct, xg30_sum, xg30_per_ti, xg30_per_game],
-            axis=1
-        ).reset_index()
-        overview["Throw-ins per game"] = (overview["Total throw-ins"] / overview["Games"]).round(2)
-        overview["Delay per throw-in (s)"] = (overview["Total delay (s)"] / overview["Total throw-ins"]).round(2)
+def ingest_matches(table: str, jobs: list[dict], workers: int | None = None) -> pd.DataFrame:
+    """
+    Sæsontabel ("throwins"/"shots") for alle kampe i jobs, med Round/Match påsat.
+    Kampe uden artefakt på disk parses parallelt (FCK_INGEST_WORKERS, default ≤ 8).
+    """
+    return _ingest_matches_cached(table, _keyed_jobs(jobs), SCHEMA_VER, _workers=workers or INGEST_WORKERS)
 
-        import altair as alt
-        metric = st.selectbox(
-            "Choose metric",
-            ["Avg. delay (s)", "Delay per throw-in (s)", "Throw-ins per game",
-             "Total throw-ins", "Throw-ins <7s", "Total delay (s)",
-             "Thrown into box", "% thrown into box", "Thrown into box per game",
-             "Retained throw-ins", "Retention %", "Retained per game",
-             "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-             "xG ≤30s", "xG per ≤30s", "xG per game ≤30s"]
-        )
-        overview_sorted = overview.sort_values([metric, "Team"], ascending=[False, True]).reset_index(drop=True)
-        chart_df = pd.DataFrame({
-            "Team": overview_sorted["Team"],
-            "Value": pd.to_numeric(overview_sorted[metric], errors="coerce"),
-        }).dropna()
-        chart_df["is_FCK"] = chart_df["Team"].apply(lambda t: t in TEAM_ALIASES)
-        team_order = overview_sorted["Team"].tolist()
-        chart_h = max(300, len(chart_df) * 32)
-
-        chart = (
-            alt.Chart(chart_df, height=chart_h, width="container")
-              .mark_bar()
-              .encode(
-                  y=alt.Y("Team:N", sort=team_order, title="Team"),
-                  x=alt.X("Value:Q", title=metric),
-                  color=alt.condition(alt.datum.is_FCK, alt.value(BRAND["primary"]), alt.value("#A1A1A1")),
-                  tooltip=["Team", "Value"]
-              )
-              .configure_legend(disable=True)
-        )
-        st.altair_chart(chart, use_container_width=True)
-
-        with st.expander("Raw indkast (alle kampe)"):
-            raw_cols = [
-                "Round", "Match", "Side", "Third", "Zone", "x", "y", "end_x", "end_y",
-                "End zone", "End third", "Thrown into the box", "Ball retention",
-                "Distance (m)",
-                "Period", "Ball out (mm:ss)", "Throw-in (mm:ss)", "Delay (s)", "Team", "Game date",
-                "is_outlier", "is_FCK",
-                "Seq events", "Seq passes", "Seq duration (s)", "Seq ends with shot", "Seq last type", "Seq last x", "Seq last y",
-                "Shot in 30s", "Goal in 30s", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (30s)",
-                "throwin_event_id", "throwin_team_id", "throwin_time_s", "throwin_period",
-            ]
-            raw_cols = [c for c in season_df.columns if c in raw_cols]
-            st.dataframe(season_df[raw_cols], hide_index=True)
-
-         # ---- Comparison ----
-    with tab_Comparison:
-        st.header("Comparison")
-
-        round_dirs_all = list_round_dirs(DATA_BASE)
-        if not round_dirs_all:
-            st.info("Ingen runder fundet.")
-            st.stop()
-
-        def _round_num2(p: Path):
-            m = re.search(r"R(\d+)$", p.name)
-            return int(m.group(1)) if m else None
-
-        round_nums2 = [n for n in (_round_num2(p) for p in round_dirs_all) if n is not None]
-        min_r2, max_r2 = min(round_nums2), max(round_nums2)
-
-        with filter_card("Rounds (comparison)"):
-            sel_min2, sel_max2 = st.slider("   ",
-                                           min_value=min_r2, max_value=max_r2,
-                                           value=(min_r2, max_r2), step=1, key="cmp_rounds")
-
-        c1, c2 = st.columns(2)
-        with c1:
-            with filter_card("Home/Away"):
-                side_filter2 = st.radio("    ", ["All", "Home", "Away"], horizontal=False, key="cmp_side")
-        with c2:
-            with filter_card("Third"):
-                third_filter2 = st.radio("     ", ["All", "First 1/3", "Second 1/3", "Last 1/3"],
-                                         horizontal=False, key="cmp_third")
-
-        selected_rounds2 = {r for r in range(sel_min2, sel_max2 + 1)}
-        round_dirs2 = [p for p in round_dirs_all if _round_num2(p) in selected_rounds2]
-
-        all_rows2 = []
-        for round_dir in round_dirs2:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path),
-                    str(f7_path) if f7_path else None,
-                    str(f70_path) if f70_path else None,
-                    SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows2.append(df_throw)
-
-        if not all_rows2:
-            st.info("Ingen indkast i det valgte interval.")
-            st.stop()
-
-        season_cmp = pd.concat(all_rows2, ignore_index=True)
-
-        # Sikr kolonner
-        if "Thrown into the box" not in season_cmp.columns and "End in box" in season_cmp.columns:
-            season_cmp["Thrown into the box"] = season_cmp["End in box"]
-        for col, default in [
-            ("Thrown into the box", False), ("Ball retention", False),
-            ("Shot in 30s", False), ("Goal in 30s", False),
-            ("Shot xG (30s)", 0.0), ("Distance (m)", None)
-        ]:
-            if col not in season_cmp.columns:
-                season_cmp[col] = default
-
-        # Filtre
-        if side_filter2 != "All":
-            season_cmp = season_cmp[season_cmp["Side"] == side_filter2]
-        if third_filter2 != "All":
-            season_cmp = season_cmp[season_cmp["Third"] == third_filter2]
-
-        if season_cmp.empty:
-            st.info("Ingen data efter filtre.")
-            st.stop()
-
-        # Rens tal + outliers
-        season_cmp["Delay (s)"] = pd.to_numeric(season_cmp["Delay (s)"], errors="coerce")
-        season_cmp["Team"] = season_cmp["Team"].apply(normalize_team_name)
-        season_cmp["Shot xG (30s)"] = pd.to_numeric(season_cmp["Shot xG (30s)"], errors="coerce")
-        season_cmp["is_outlier"] = _mark_outliers(season_cmp)
-        season_cmp_used = season_cmp[~season_cmp["is_outlier"]].copy()
-
-        # Aggreger pr. hold
-        gcmp = season_cmp_used.groupby("Team", dropna=False)
-        games_cmp = gcmp["Match"].nunique().rename("Games")
-        tot_throw_cmp = gcmp.size().rename("Total throw-ins")
-        avg_delay_cmp = gcmp["Delay (s)"].mean().rename("Avg. delay (s)")
-        lt7_cmp = gcmp.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay_cmp = gcmp["Delay (s)"].sum().rename("Total delay (s)")
-
-        thrown_cnt_cmp = gcmp.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        thrown_pct_cmp = ((thrown_cnt_cmp / tot_throw_cmp) * 100).rename("% thrown into box")
-        thrown_per_game_cmp = (thrown_cnt_cmp / games_cmp).rename("Thrown into box per game")
-
-        retained_cnt_cmp = gcmp.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        pct_retained_cmp = ((retained_cnt_cmp / tot_throw_cmp) * 100).rename("Retention %")
-        retained_per_game_cmp = (retained_cnt_cmp / games_cmp).rename("Retained per game")
-
-        shot30_cnt_cmp = gcmp.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("TI shots ≤30s")
-        shot30_pct_cmp = ((shot30_cnt_cmp / tot_throw_cmp) * 100).rename("% TI shots ≤30s")
-        goal30_cnt_cmp = gcmp.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("TI goals ≤30s")
-        goal30_pct_cmp = ((goal30_cnt_cmp / tot_throw_cmp) * 100).rename("% TI goals ≤30s")
-        xg30_sum_cmp   = gcmp["Shot xG (30s)"].sum().rename("TI xG ≤30s")
-        xg30_per_ti_cmp = (xg30_sum_cmp / tot_throw_cmp).rename("xG per TI ≤30s")
-        xg30_per_game_cmp = (xg30_sum_cmp / games_cmp).rename("xG per game ≤30s")
-
-        overview_cmp = pd.concat(
-            [games_cmp, tot_throw_cmp, avg_delay_cmp, lt7_cmp, total_delay_cmp,
-             thrown_cnt_cmp, thrown_pct_cmp, thrown_per_game_cmp,
-             retained_cnt_cmp, pct_retained_cmp, retained_per_game_cmp,
-             shot30_cnt_cmp, shot30_pct_cmp, goal30_cnt_cmp, goal30_pct_cmp,
-             xg30_sum_cmp, xg30_per_ti_cmp, xg30_per_game_cmp],
-            axis=1
-        ).reset_index()
-
-        # Afledte kolonner
-        overview_cmp["Throw-ins per game"] = (overview_cmp["Total throw-ins"] / overview_cmp["Games"])
-        overview_cmp["Delay per throw-in (s)"] = (overview_cmp["Total delay (s)"] / overview_cmp["Total throw-ins"])
-
-        # Fjern dublette kolonner og tving til numerisk
-        overview_cmp = overview_cmp.loc[:, ~overview_cmp.columns.duplicated()].copy()
-        metric_options = [
-            "Avg. delay (s)",
-            "Delay per throw-in (s)",
-            "Throw-ins per game",
-            "Total throw-ins",
-            "Throw-ins <7s",
-            "Total delay (s)",
-            "Games",
-            "Thrown into box", "% thrown into box", "Thrown into box per game",
-            "Retained throw-ins", "Retention %", "Retained per game",
-            "TI shots ≤30s", "% TI shots ≤30s", "TI goals ≤30s", "% TI goals ≤30s",
-            "TI xG ≤30s", "xG per TI ≤30s", "xG per game ≤30s",
-        ]
-        for col in metric_options:
-            if col in overview_cmp.columns:
-                overview_cmp[col] = pd.to_numeric(overview_cmp[col], errors="coerce")
-
-        overview_cmp["is_FCK"] = overview_cmp["Team"].apply(lambda t: t in TEAM_ALIASES)
-
-        # ==== GitHub RAW logos via Altair mark_image ====
-        import altair as alt
-        from urllib.parse import quote
-
-        # Base to your GitHub repo (raw)
-        GH_RAW_BASE = "https://raw.githubusercontent.com/nrssp/Superliga-data/main/Logos"
-
-        # Alias (hvis Opta-navn != filnavn)
-        TEAM_LOGO_ALIAS = {
-            "FC Copenhagen": "FC København",
-            "F.C. København": "FC København",
-            "København": "FC København",
-            "Brondby": "Brøndby IF",
-            "Nordsjaelland": "FC Nordsjælland",
-            "OB": "Odense Boldklub",
-            "Sonderjyske": "Sønderjyske",
-            "Lyngby": "Lyngby BK",
-            "Randers": "Randers FC",
-            "Vejle": "Vejle BK",
-            "Viborg": "Viborg FF",
-            "AGF": "AGF Aarhus",
-            # tilføj flere hvis du støder på afvigelser
-        }
-
-        def to_logo_name(team: str) -> str:
-            # Brug alias hvis vi har et; ellers team-strengen som er
-            return TEAM_LOGO_ALIAS.get(team, team)
-
-        def gh_logo_url(team: str) -> str | None:
-            """
-            Bygger en URL til GitHub raw:
-              https://raw.githubusercontent.com/nrssp/Superliga-data/main/Logos/<filnavn>.png
-            Husk at URL-encode (mellemrum, æ/ø/å osv.).
-            """
-            if not isinstance(team, str) or not team:
-                return None
-            fname = f"{to_logo_name(team)}.png"
-            return f"{GH_RAW_BASE}/{quote(fname, safe='')}"
-
-        # ---- Select axes ----
-        d1, d2 = st.columns(2)
-        with d1:
-            with filter_card("X-axis"):
-                x_metric = st.selectbox("        ", metric_options, index=0, key="cmp_x")
-        with d2:
-            with filter_card("Y-axis"):
-                y_metric = st.selectbox("         ", metric_options, index=2, key="cmp_y")
-
-        # Byg plot-datasæt
-        plot_df = overview_cmp.loc[:, ~overview_cmp.columns.duplicated()].copy()
-        plot_df = plot_df[plot_df["Games"] > 0]
-        plot_df["x"] = pd.to_numeric(plot_df[x_metric], errors="coerce")
-        plot_df["y"] = pd.to_numeric(plot_df[y_metric], errors="coerce")
-        plot_df["logo_url"] = plot_df["Team"].map(gh_logo_url)
-        plot_df = plot_df.dropna(subset=["x", "y", "logo_url"])
-
-        if plot_df.empty:
-            st.info("Ingen gyldige datapunkter for de valgte akser/filtre.")
-            st.stop()
-
-        # Median-linjer
-        avg_x = float(plot_df["x"].mean())
-        avg_y = float(plot_df["y"].mean())
-        rule_x = alt.Chart(pd.DataFrame({"x": [avg_x]})).mark_rule(strokeDash=[4,2], color="#888").encode(x="x:Q")
-        rule_y = alt.Chart(pd.DataFrame({"y": [avg_y]})).mark_rule(strokeDash=[4,2], color="#888").encode(y="y:Q")
-
-        # Logoer som punkter
-        chart = (
-            alt.Chart(plot_df, height=520, width="container")
-              .mark_image(width=20, height=20)
-              .encode(
-                  x=alt.X("x:Q", title=x_metric),
-                  y=alt.Y("y:Q", title=y_metric),
-                  url="logo_url:N",
-                  tooltip=["Team", x_metric, y_metric, "Total throw-ins", "Games"],
-              )
-        )
-
-        st.altair_chart(chart + rule_x + rule_y, use_container_width=True)
-        
-    # ---- Individuals (spillere) ----
-
-    with tab_individuals:
-        st.header("Player throw-in information")
-
-        round_dirs_all = list_round_dirs(DATA_BASE)
-        if not round_dirs_all:
-            st.stop()
-
-        def _round_num_ind(p: Path):
-            m = re.search(r"R(\d+)$", p.name)
-            return int(m.group(1)) if m else None
-
-        round_nums_ind = [n for n in (_round_num_ind(p) for p in round_dirs_all) if n is not None]
-        min_ri, max_ri = min(round_nums_ind), max(round_nums_ind)
-
-        with filter_card("Rounds"):
-            sel_min_i, sel_max_i = st.slider("     ",
-                                             min_value=min_ri, max_value=max_ri,
-                                             value=(min_ri, max_ri), step=1, key="ind_rounds")
-
-        # Filters
-        c1, c2, c3, c4, c5, c6 = st.columns(6)
-        with c1:
-            with filter_card("Home/Away"):
-                side_i = st.radio(" ", ["All", "Home", "Away"], horizontal=False, key="ind_side")
-        with c2:
-            with filter_card("Third"):
-                third_i = st.radio("  ", ["All", "First 1/3", "Second 1/3", "Last 1/3"], horizontal=False, key="ind_third")
-        with c3:
-            with filter_card("Thrown into the box"):
-                box_i = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="ind_box")
-        with c4:
-            with filter_card("Ball retention (≥7s)"):
-                ret_i = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="ind_ret")
-        with c5:
-            with filter_card("Shot ≤30s"):
-                shot_i = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="ind_shot")
-        with c6:
-            with filter_card("Goal ≤30s"):
-                goal_i = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="ind_goal")
-
-        selected_rounds_i = {r for r in range(sel_min_i, sel_max_i + 1)}
-        round_dirs_i = [p for p in round_dirs_all if _round_num_ind(p) in selected_rounds_i]
-
-        all_rows_i = []
-        for round_dir in round_dirs_i:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path), str(f7_path) if f7_path else None, str(f70_path) if f70_path else None, SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows_i.append(df_throw)
-
-        if not all_rows_i:
-            st.info("Ingen indkast i det valgte interval.")
-            st.stop()
-
-        indiv_df = pd.concat(all_rows_i, ignore_index=True)
-
-        if "Thrown into the box" not in indiv_df.columns and "End in box" in indiv_df.columns:
-            indiv_df["Thrown into the box"] = indiv_df["End in box"]
-        if "Taker" not in indiv_df.columns:
-            indiv_df["Taker"] = indiv_df.get("Taker id", "").fillna("").replace({"": "Unknown"})
-        if "Distance (m)" not in indiv_df.columns:
-            indiv_df["Distance (m)"] = None
-
-        if side_i != "All":
-            indiv_df = indiv_df[indiv_df["Side"] == side_i]
-        if third_i != "All":
-            indiv_df = indiv_df[indiv_df["Third"] == third_i]
-        if box_i != "All":
-            indiv_df = indiv_df[indiv_df["Thrown into the box"] == (box_i == "Yes")]
-        if ret_i != "All":
-            indiv_df = indiv_df[indiv_df["Ball retention"] == (ret_i == "Retained")]
-        if shot_i != "All":
-            indiv_df = indiv_df[indiv_df["Shot in 30s"] == (shot_i == "Yes")]
-        if goal_i != "All":
-            indiv_df = indiv_df[indiv_df["Goal in 30s"] == (goal_i == "Yes")]
-
-        if indiv_df.empty:
-            st.info("Ingen indkast efter valgte filtre.")
-            st.stop()
-
-        indiv_df["Delay (s)"] = pd.to_numeric(indiv_df["Delay (s)"], errors="coerce")
-        indiv_df["Shot xG (30s)"] = pd.to_numeric(indiv_df["Shot xG (30s)"], errors="coerce").fillna(0.0)
-        indiv_df["Distance (m)"] = pd.to_numeric(indiv_df["Distance (m)"], errors="coerce")
-        indiv_df["is_outlier"] = _mark_outliers(indiv_df)
-        indiv_used = indiv_df[~indiv_df["is_outlier"]].copy()
-        indiv_used["is_FCK"] = indiv_used["Team"].apply(lambda t: t in TEAM_ALIASES)
-
-        gpi = indiv_used.groupby(["Team", "Taker"], dropna=False)
-        games_pi = gpi["Match"].nunique().rename("Games")
-        tot_ti_pi = gpi.size().rename("Total throw-ins")
-        avg_delay_pi = gpi["Delay (s)"].mean().round(2).rename("Avg. delay (s)")
-        lt7_pi = gpi.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay_pi = gpi["Delay (s)"].sum().round(1).rename("Total delay (s)")
-
-        box_cnt_pi = gpi.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        box_pct_pi = ((box_cnt_pi / tot_ti_pi) * 100).round(1).rename("% thrown into box")
-
-        ret_cnt_pi = gpi.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        ret_pct_pi = ((ret_cnt_pi / tot_ti_pi) * 100).round(1).rename("Retention %")
-
-        shot_cnt_pi = gpi.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("Shots ≤30s")
-        shot_pct_pi = ((shot_cnt_pi / tot_ti_pi) * 100).round(1).rename("% Shots ≤30s")
-        goal_cnt_pi = gpi.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("Goals ≤30s")
-        goal_pct_pi = ((goal_cnt_pi / tot_ti_pi) * 100).round(1).rename("% Goals ≤30s")
-        xg_sum_pi   = gpi["Shot xG (30s)"].sum().round(2).rename("xG ≤30s")
-        xg_per_ti_pi = (xg_sum_pi / tot_ti_pi).round(3).rename("xG per ≤30s")
-
-        # Distance-metrics
-        avg_dist_pi  = gpi["Distance (m)"].mean().round(2).rename("Avg. distance (m)")
-        max_dist_pi  = gpi["Distance (m)"].max().round(2).rename("Max distance (m)")
-        sum_dist_pi  = gpi["Distance (m)"].sum().round(1).rename("Total distance (m)")
-
-        overview_pi = pd.concat(
-            [games_pi, tot_ti_pi, avg_delay_pi, lt7_pi, total_delay_pi,
-             box_cnt_pi, box_pct_pi,
-             ret_cnt_pi, ret_pct_pi,
-             shot_cnt_pi, shot_pct_pi, goal_cnt_pi, goal_pct_pi,
-             xg_sum_pi, xg_per_ti_pi,
-             avg_dist_pi, max_dist_pi, sum_dist_pi],
-            axis=1
-        ).reset_index().rename(columns={"Team": "Team", "Taker": "Player"})
-        # Label bevares som "Player — Team" for unikhed, men vi viser kun Player via labelExpr
-        overview_pi["Label"] = overview_pi["Player"].fillna("Unknown") + " — " + overview_pi["Team"].fillna("Unknown")
-        overview_pi["is_FCK"] = overview_pi["Team"].apply(lambda t: t in TEAM_ALIASES)
-
-        # --- NYT: slider for minimum antal kast pr. spiller ---
-        max_ti = int(overview_pi["Total throw-ins"].max()) if not overview_pi.empty else 1
-        default_min = 3 if max_ti >= 3 else max_ti
-        min_ti = st.slider(
-            "Minimum throw-ins",
-            min_value=1,
-            max_value=max_ti,
-            value=default_min,
-            step=1,
-            key="ind_min_ti"
-        )
-        overview_pi = overview_pi[overview_pi["Total throw-ins"] >= min_ti]
-
-        # Hvis intet matcher, vis besked og stop resten af fanen
-        if overview_pi.empty:
-            st.info(f"No players with at least {min_ti} throw-ins after filters.")
-            st.stop()
-
-        import altair as alt
-        metric_ind = st.selectbox(
-            "Choose metric",
-            ["Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
-             "Thrown into box", "% thrown into box",
-             "Retained throw-ins", "Retention %",
-             "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-             "xG ≤30s", "xG per ≤30s", "Games",
-             "Avg. distance (m)", "Max distance (m)", "Total distance (m)"],
-            index=0
-        )
-
-        # Sortér efter valgt metric (faldende) – bruges både til Top 3 og bar-chart
-        overview_pi_sorted = overview_pi.sort_values(
-            [metric_ind, "Player", "Team"],
-            ascending=[False, True, True]
-        ).reset_index(drop=True)
-
-        # --- TOP 3 KORT (følger filtre + valgt metric) -------------------------------
-        # Byg indeks for logos (fallback) og spillerfotos
-        _logo_dir = _ensure_logos_synced(force=st.session_state.get('force_logo_resync', False))
-        _logo_map = _build_logo_dataurl_map(_logo_dir) if _logo_dir else {}
-        st.session_state['force_logo_resync'] = False
-        _photo_index = build_player_photo_index(st.session_state.get('img_version', 0))
-
-        def _fmt_value(v):
-            try:
-                f = float(v)
-                return f"{f:.0f}" if abs(f - round(f)) < 1e-9 else f"{f:.2f}"
-            except Exception:
-                return str(v)
-
-        top3_df = overview_pi_sorted.head(3).copy()
-        if not top3_df.empty:
-            st.markdown("#### Top 3")
-            cols = st.columns(len(top3_df))
-            for i, ((_, row), col) in enumerate(zip(top3_df.iterrows(), cols), start=1):
-                player = row.get("Player", "Unknown")
-                team   = row.get("Team", "—")
-                value  = _fmt_value(row.get(metric_ind))
-
-                st.markdown("""
-<style>
-.top3-card { margin-bottom: 0; }
-</style>
-""", unsafe_allow_html=True)
-
-
-                # → først prøv spillerfoto, ellers klublogo (robust lookup)
-                img = get_player_photo_dataurl(team, player, _photo_index) or _logo_lookup(_logo_map, team)
-
-                with col:
-                    st.markdown(
-                        f"""
-                        <div class="top3-card">
-                          <div class="top3-rank">#{i}</div>
-                          <div class="top3-img">{f'<img src="{_cache_bust_url(img)}"/>' if img else ''}</div>
-                          <div class="top3-meta">
-                            <div class="top3-name">{player}</div>
-                            <div class="top3-team">{team}</div>
-                          </div>
-                          <div class="top3-value">{value}</div>
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                    
-        # ---------------------------------------------------------------------------    
-
-        # Bar-chart (bevarer din eksisterende logik)
-        chart_df_pi = pd.DataFrame({
-            "Label": overview_pi_sorted["Label"],
-            "Value": pd.to_numeric(overview_pi_sorted[metric_ind], errors="coerce"),
-            "is_FCK": overview_pi_sorted["is_FCK"]
-        }).dropna(subset=["Value"])
-        taker_order = overview_pi_sorted["Label"].tolist()
-        chart_h_pi = max(320, len(chart_df_pi) * 28)
-
-        chart_pi = (
-            alt.Chart(chart_df_pi, height=chart_h_pi, width="container")
-              .mark_bar()
-              .encode(
-                  y=alt.Y(
-                      "Label:N",
-                      sort=taker_order,
-                      title="Player",
-                      axis=alt.Axis(labelExpr="split(datum.label, ' — ')[0]")
-                  ),
-                  x=alt.X("Value:Q", title=metric_ind),
-                  color=alt.condition(alt.datum.is_FCK, alt.value(BRAND["primary"]), alt.value("#A1A1A1")),
-                  tooltip=["Label", "Value"]
-              )
-              .configure_legend(disable=True)
-        )
-        st.altair_chart(chart_pi, use_container_width=True)
-
-        with st.expander("Players – full table"):
-            show_cols_pi = ["Player", "Team", "Games", "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s",
-                            "Thrown into box", "% thrown into box",
-                            "Retained throw-ins", "Retention %",
-                            "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-                            "xG ≤30s", "xG per ≤30s",
-                            "Avg. distance (m)", "Max distance (m)", "Total distance (m)",
-                            "Total delay (s)"]
-            show_cols_pi = [c for c in show_cols_pi if c in overview_pi_sorted.columns]
-            st.dataframe(overview_pi_sorted[show_cols_pi], hide_index=True)
-
-        # ---- NY: Spillerikoner ---------------------------------------------------
-    with tab_icons:
-        st.header("Spillerikoner")
-
-        # 1) Hent data (samme approach som Individuals-tab)
-        round_dirs_all = list_round_dirs(DATA_BASE)
-        if not round_dirs_all:
-            st.info("Ingen runder fundet.")
-            st.stop()
-
-        all_rows_icons = []
-        for round_dir in round_dirs_all:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path), str(f7_path) if f7_path else None, str(f70_path) if f70_path else None, SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    all_rows_icons.append(df_throw)
-
-        if not all_rows_icons:
-            st.info("Ingen indkast fundet.")
-            st.stop()
-
-        icons_df = pd.concat(all_rows_icons, ignore_index=True)
-
-        # Sikr kolonner
-        if "Taker" not in icons_df.columns:
-            icons_df["Taker"] = icons_df.get("Taker id", "").fillna("").replace({"": "Unknown"})
-        icons_df["Team"] = icons_df["Team"].fillna("Unknown")
-        icons_df["Taker"] = icons_df["Taker"].fillna("Unknown")
-
-        # Hold-liste
-        teams_sorted = sorted(t for t in icons_df["Team"].dropna().unique())
-
-        # 2) Hold-filter
-        team_sel = st.selectbox("Vælg hold", ["(Alle)"] + teams_sorted, index=0, key="icons_team")
-
-        df_filt = icons_df.copy()
-        if team_sel != "(Alle)":
-            df_filt = df_filt[df_filt["Team"] == team_sel]
-
-        # 3) Aggreger pr. (Team, Taker) for kortmetadata
-        g = df_filt.groupby(["Team", "Taker"], dropna=False)
-        meta = g.agg(
-            ti=("Taker", "size"),
-            avg_delay=("Delay (s)", lambda s: pd.to_numeric(s, errors="coerce").mean()),
-            thrown_box=("Thrown into the box", lambda s: pd.Series(s).fillna(False).sum())
-        ).reset_index()
-
-        meta["avg_delay"] = pd.to_numeric(meta["avg_delay"], errors="coerce").round(2)
-        meta["thrown_box"] = pd.to_numeric(meta["thrown_box"], errors="coerce").astype("Int64")
-
-
-        if meta.empty:
-            st.info("Ingen spillere matcher filtrene.")
-            st.stop()
-
-        # 4) Billedkilder
-        _logo_dir = _ensure_logos_synced(force=st.session_state.get('force_logo_resync', False))
-        _logo_map = _build_logo_dataurl_map(_logo_dir) if _logo_dir else {}
-        st.session_state['force_logo_resync'] = False
-        _photo_index = build_player_photo_index(st.session_state.get('img_version', 0))
-
-        def _initials(name: str) -> str:
-            parts = [p for p in _norm(name).split(" ") if p]
-            return "".join(s[0].upper() for s in parts[:2]) or "?"
-
-        # Sorter (f.eks. flest kast først)
-        meta = meta.sort_values(["Team", "ti", "Taker"], ascending=[True, False, True]).reset_index(drop=True)
-
-        # 5) Render – hvis "(Alle)", vis gruppevis per hold
-        def render_grid(df_team: pd.DataFrame, team_name: str | None):
-            st.markdown(f"#### {team_name}" if team_name else "#### Spillere")
-            st.markdown("<div class='player-grid'>", unsafe_allow_html=True)
-            for _, row in df_team.iterrows():
-                team = row["Team"]
-                player = row["Taker"] or "Unknown"
-                img = get_player_photo_dataurl(team, player, _photo_index) or _logo_lookup(_logo_map, team)
-
-                if img:
-                    img_html = f'<img class="player-img" src="{img}" />'
-                else:
-                    img_html = f'<div class="player-initials">{_initials(player)}</div>'
-
-                card_html = f"""
-                <div class="player-card">
-                  {img_html}
-                  <div class="player-name">{player}</div>
-                  <div class="player-team">{team}</div>
-                  <div class="player-meta">Throw-ins: <b>{int(row['ti'])}</b> · Avg delay: <b>{row['avg_delay'] if pd.notna(row['avg_delay']) else '—'} s</b></div>
-                </div>
-                """
-                st.markdown(card_html, unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-        if team_sel == "(Alle)":
-            for team in teams_sorted:
-                df_team = meta[meta["Team"] == team]
-                if not df_team.empty:
-                    render_grid(df_team, team)
-        else:
-            render_grid(meta, team_sel)
-
-    # ---- Kampe ----
-    with tab_matches:
-        st.header("Matches")
-        for round_dir in list_round_dirs(DATA_BASE):
-            rows = collect_round_data(round_dir)
-            if rows:
-                df = pd.DataFrame(rows)
-                if "_sortdate" in df.columns:
-                    df = df.sort_values("_sortdate", na_position="last")
-                st.subheader(round_dir.name)
-                st.dataframe(df.drop(columns=["_sortdate"]), hide_index=True)
+def _keyed_jobs(jobs: list[dict]) -> tuple:
+    """Jobs som hashbar tuple inkl. fingerprint – cache-nøglen for en sæsontabel."""
+    return tuple(
+        (j["Round"], j["Match"], j["f24"], j["f7"], j["f70"], match_fingerprint(j["f24"], j["f7"], j["f70"]))
+        for j in jobs
+    )
 
-        # ---- Kampdata (indkast pr. kamp) ----
-    with tab_data:
-        st.header("Throw-in data")
-        rounds = list_round_dirs(DATA_BASE)
-        if rounds:
-            round_choice = st.selectbox("Choose round/s", rounds, format_func=lambda p: p.name)
-            rows = collect_round_data(round_choice)
-            if rows:
-                matches_df = pd.DataFrame(rows)
-                match_choice = st.selectbox("Choose game", matches_df["Match"])
+@st.cache_data(show_spinner=False)
+def _ingest_matches_cached(table: str, keyed: tuple, cache_buster: int = SCHEMA_VER, _workers: int = 1) -> pd.DataFrame:
+    frames = _load_partitions(table, keyed, _workers)
+    store = _season_store(table, cache_buster)
+    with store["lock"]:   # samme manifest som _ingest_incremental, så begge stier rydder op efter sig
+        retired = _record_partitions(table, store, keyed)
+        for f24 in [f for f in store["manifest"] if not Path(f).exists()]:   # kampe der er væk fra disk
+            retired.add(Path(store["manifest"].pop(f24)["artifact"]).name)
+            store["frames"].pop(f24, None)
+        if retired:
+            _gc_artifacts(table, store["manifest"], retired)
+        _save_manifest(table, store["manifest"])
+    out = [df for df in frames if not df.empty]
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+
+def _load_partitions(table: str, keyed, workers: int) -> list[pd.DataFrame]:
+    """Én tabel pr. kamp (med Round/Match): artefakter læses, manglende kampe parses parallelt."""
+    if _HAS_PARQUET:
+        _prune_artifacts(SCHEMA_VER)
+    args = [(table, fp, f24, f7, f70) for _, _, f24, f7, f70, fp in keyed]
+    missing = [i for i, a in enumerate(args) if not (_HAS_PARQUET and _artifact_path(table, a[1]).exists())]
+
+    frames = [None] * len(args)
+    for i, df in zip(missing, _run_parallel(_ingest_worker, [args[i] for i in missing], workers)):
+        frames[i] = df
+    for i, a in enumerate(args):
+        if frames[i] is None:
+            frames[i] = _ingest_worker(*a)
+
+    for (rnd, match, *_), df in zip(keyed, frames):
+        if not df.empty:
+            df["Round"] = rnd
+            df["Match"] = match
+    return frames
+
+# --- Inkrementel sæson-ingest (manifest over indlæste kampe) ------------------
+def _manifest_path(table: str) -> Path:
+    return ARTIFACT_CACHE / f"v{SCHEMA_VER}" / table / "manifest.json"
 
-                f24_file = matches_df.loc[matches_df["Match"] == match_choice, "F24 file"].values[0]
-                f7_file  = matches_df.loc[matches_df["Match"] == match_choice, "F7 file"].values[0]
-                f70_file = matches_df.loc[matches_df["Match"] == match_choice, "F70 file"].values[0]
+@st.cache_resource(show_spinner=False)
+def _season_store(table: str, cache_buster: int = SCHEMA_VER) -> dict:
+    """
+    Proces-delt sæsontabel for `table`, bygget af én rå partition pr. kamp.
+    manifest: {f24-sti: {"fingerprint", "round", "match", "artifact"}} – gemmes på disk,
+    så gamle artefakter kan ryddes op når en kamp erstattes eller forsvinder. Deles af
+    _ingest_incremental og ingest_matches.
+    """
+    try:
+        manifest = json.loads(_manifest_path(table).read_text())
+    except Exception:
+        manifest = {}
+    return {"manifest": manifest, "frames": {}, "keyed": None, "lock": threading.Lock()}
 
-                f24_path = round_choice / f24_file
-                f7_path  = (round_choice / f7_file)  if f7_file  != "(mangler)" else None
-                f70_path = (round_choice / f70_file) if f70_file != "(mangler)" else None
+@st.cache_resource(show_spinner=False, max_entries=THROWIN_PARAM_CACHE_MAX)
+def _season_view(table: str, variant, cache_buster: int = SCHEMA_VER) -> dict:
+    """Afledt sæsontabel for ét variant (fx et ThrowinParams-sæt): {f24: (rå partition, afledt)}."""
+    return {"frames": {}, "keyed": None, "df": pd.DataFrame(), "lock": threading.Lock()}
 
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path),
-                    str(f7_path) if f7_path else None,
-                    str(f70_path) if f70_path else None,
-                    SCHEMA_VER
-                )
+def _ingest_incremental(
+    table: str, jobs: list[dict], prepare=None, finalize=None, workers: int | None = None, variant=None,
+    persist: bool = False,
+) -> pd.DataFrame:
+    """
+    Sæsontabel der kun genindlæser nye/ændrede kampe: rå partitioner hvis fingerprint, runde og
+    kampnavn er uændret genbruges, resten læses/parses og erstattes. prepare(df, job) køres pr.
+    partition og caches pr. variant, så et nyt variant kun genberegner prepare – ikke parsingen.
+    finalize(df) køres på den samlede tabel.
 
-                if "Thrown into the box" not in df_throw.columns and "End in box" in df_throw.columns:
-                    df_throw["Thrown into the box"] = df_throw["End in box"]
+    persist=True gemmer også den afledte tabel (før finalize) på disk under kampenes fingerprints,
+    så en kold proces læser én fil i stedet for to pr. kamp + prepare. Kun for ét variant pr. tabel.
+    """
+    keyed = _keyed_jobs(jobs)
+    if persist:
+        view = _season_view(table, variant, SCHEMA_VER)
+        with view["lock"]:
+            if view["keyed"] == keyed:
+                return view["df"]
+            df = None if view["frames"] else _load_season(table, keyed)   # kold proces: én fil
+            if df is not None:
+                view["df"] = finalize(df) if (finalize and not df.empty) else df
+                view["keyed"] = keyed
+                return view["df"]
+    store = _season_store(table, SCHEMA_VER)
+    with store["lock"]:
+        manifest, frames = store["manifest"], store["frames"]
+        if store["keyed"] != keyed:
+            current = {f24: (rnd, match, fp) for rnd, match, f24, f7, f70, fp in keyed}
+            todo = []
+            for k in keyed:
+                rnd, match, f24, _, _, fp = k
+                ent = manifest.get(f24)
+                if f24 in frames and ent and (ent["fingerprint"], ent["round"], ent["match"]) == (fp, rnd, match):
+                    continue
+                todo.append(k)
+
+            loaded = _load_partitions(table, todo, workers or INGEST_WORKERS)
+            retired = _record_partitions(table, store, todo)
+            for k, df in zip(todo, loaded):
+                frames[k[2]] = df
+
+            for f24 in [f for f in manifest if f not in current]:
+                retired.add(Path(manifest.pop(f24)["artifact"]).name)
+                frames.pop(f24, None)
+            _gc_artifacts(table, manifest, retired)
+            store["keyed"] = keyed
+            _save_manifest(table, manifest)
+        raw = {k[2]: frames[k[2]] for k in keyed}
+
+    view = _season_view(table, variant, SCHEMA_VER)
+    with view["lock"]:
+        if view["keyed"] == keyed:
+            return view["df"]
+        derived = {}
+        for k in keyed:
+            df, hit = raw[k[2]], view["frames"].get(k[2])
+            if hit is not None and hit[0] is df:   # samme rå partition → genbrug
+                derived[k[2]] = hit
+            else:
+                derived[k[2]] = (df, prepare(df, k) if (prepare and not df.empty) else df)
+        out = [d for _, d in (derived[k[2]] for k in keyed) if not d.empty]
+        df = pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+        if persist:
+            _save_season(table, keyed, df)
+        view["df"] = finalize(df) if (finalize and not df.empty) else df
+        view["frames"], view["keyed"] = derived, keyed
+        return view["df"]
+
+def _season_path(table: str, keyed) -> Path:
+    """
+    Afledt sæsontabel, nøglet på (runde, kamp, fingerprint) for alle kampe. Ændres prepare-logikken
+    (enrich_throwins/_prepare_throwins), skal SCHEMA_VER op.
+    """
+    key = hashlib.blake2b(json.dumps([(rnd, match, fp) for rnd, match, _, _, _, fp in keyed]).encode(),
+                          digest_size=16).hexdigest()
+    return ARTIFACT_CACHE / f"v{SCHEMA_VER}" / f"{table}_season" / f"{key}.parquet"
 
-                for col, default in [
-                    ("Thrown into the box", False),
-                    ("end_x", None), ("end_y", None),
-                    ("End zone", None), ("End third", None),
-                    ("Seq events", None), ("Seq passes", None), ("Seq duration (s)", None),
-                    ("Seq ends with shot", None), ("Seq last type", None), ("Seq last x", None), ("Seq last y", None),
-                    ("Ball retention", False),
-                    ("Shot in 30s", False), ("Goal in 30s", False),
-                    ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (30s)", 0.0),
-                    ("Distance (m)", None),
-                ]:
-                    if col not in df_throw.columns:
-                        df_throw[col] = default
+def _load_season(table: str, keyed) -> pd.DataFrame | None:
+    path = _season_path(table, keyed)
+    if not (_HAS_PARQUET and path.exists()):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None   # korrupt/halvskrevet fil → byg fra partitionerne
 
-                if not df_throw.empty:
-                    def _to_seconds(mmss):
-                        try:
-                            m, s = str(mmss).split(":")
-                            return int(m) * 60 + int(s)
-                        except Exception:
-                            return 10**9
+def _save_season(table: str, keyed, df: pd.DataFrame) -> None:
+    """Gem den afledte sæsontabel og slet ældre udgaver (kun den nyeste kampliste beholdes)."""
+    if not _HAS_PARQUET:
+        return
+    path = _season_path(table, keyed)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        for old in path.parent.glob("*.parquet"):
+            if old != path:
+                old.unlink(missing_ok=True)
+    except Exception:
+        pass  # best effort
 
-                    df_throw["_sort"] = (
-                        pd.to_numeric(df_throw["Period"], errors="coerce").fillna(0).astype(int) * 10_000
-                        + df_throw["Ball out (mm:ss)"].map(_to_seconds)
-                    )
-                    df_throw = df_throw.sort_values("_sort").drop(columns=["_sort"]).reset_index(drop=True)
-                    df_throw["Throw-in #"] = range(1, len(df_throw) + 1)
-                    df_throw["is_FCK"] = df_throw["Team"].apply(lambda t: t in TEAM_ALIASES)
-                    df_throw["is_outlier"] = _mark_outliers(df_throw, OUTLIER_THR)
+def _record_partitions(table: str, store: dict, keyed) -> set[str]:
+    """
+    Skriv kampene i keyed ind i manifestet (kaldes under store["lock"]). Returnerer artefakt-navnene
+    som erstattede poster pegede på; deres rå partitioner smides også ud af store["frames"].
+    """
+    manifest, retired = store["manifest"], set()
+    for rnd, match, f24, _, _, fp in keyed:
+        artifact = str(_artifact_path(table, fp).relative_to(ARTIFACT_CACHE))
+        old = manifest.get(f24)
+        if old and old["artifact"] != artifact:
+            retired.add(Path(old["artifact"]).name)
+            store["frames"].pop(f24, None)
+        manifest[f24] = {"fingerprint": fp, "round": rnd, "match": match, "artifact": artifact}
+    return retired
+
+def _gc_artifacts(table: str, manifest: dict, retired: set[str]) -> None:
+    """
+    Slet de artefakter for `table` (og dens companions) som ingesten selv har erstattet eller fjernet
+    fra manifestet – medmindre en nuværende post stadig peger på dem. Andre filer i mappen (fx skrevet
+    af enkeltkamp-stien via load_artifact) røres ikke.
+    """
+    if not _HAS_PARQUET:
+        return
+    dead = retired - {Path(ent["artifact"]).name for ent in manifest.values()}
+    for name in (table, *_TABLE_COMPANIONS.get(table, {})):
+        for fname in dead:
+            (ARTIFACT_CACHE / f"v{SCHEMA_VER}" / name / fname).unlink(missing_ok=True)
+
+def _save_manifest(table: str, manifest: dict) -> None:
+    path = _manifest_path(table)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, path)
+    except Exception:
+        pass  # best effort
 
-                    # ---------- FILTERS ABOVE GRAPH ----------
-                    c1, c2, c3, c4, c5, c6 = st.columns(6)
-                    with c1:
-                        with filter_card("Home/Away"):
-                            side_tog = st.radio(" ", ["All", "Home", "Away"], horizontal=False, key="data_side_filter")
-                    with c2:
-                        with filter_card("Third"):
-                            third_tog = st.radio("  ", ["All", "First 1/3", "Second 1/3", "Last 1/3"],
-                                                horizontal=False, key="data_third_filter")
-                    with c3:
-                        with filter_card("Thrown into the box"):
-                            thrownbox_tog = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="data_thrownbox_filter")
-                    with c4:
-                        with filter_card("Ball retention (≥7s)"):
-                            retention_tog = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="data_retention_filter")
-                    with c5:
-                        with filter_card("Shot ≤30s"):
-                            shot30_tog = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="data_shot30_filter")
-                    with c6:
-                        with filter_card("Goal ≤30s"):
-                            goal30_tog = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="data_goal30_filter")
-
-                    # plot/dataframes baseret på filtre
-                    df_plot = df_throw.copy()
-                    if side_tog != "All":
-                        df_plot = df_plot[df_plot["Side"] == side_tog]
-                    if third_tog != "All":
-                        df_plot = df_plot[df_plot["Third"] == third_tog]
-                    if thrownbox_tog != "All":
-                        df_plot = df_plot[df_plot["Thrown into the box"] == (thrownbox_tog == "Yes")]
-                    if retention_tog != "All":
-                        df_plot = df_plot[df_plot["Ball retention"] == (retention_tog == "Retained")]
-                    if shot30_tog != "All":
-                        df_plot = df_plot[df_plot["Shot in 30s"] == (shot30_tog == "Yes")]
-                    if goal30_tog != "All":
-                        df_plot = df_plot[df_plot["Goal in 30s"] == (goal30_tog == "Yes")]
-
-                    df_table = df_plot.copy()
+# --- Sæson-register: hold/spillere internet til små heltal -------------------
+class SeasonRegistry:
+    """
+    Hold- og spiller-id'er for hele sæsonen → int32-koder med kanoniske navne fra alle F7-filer
+    (nyeste kamp vinder). Både 't420'/'420' og 'p451555'/'451555' giver samme kode. Id'er der ikke
+    står i nogen F7 internes ved første opslag (navn = id). Koder ændres aldrig, kun tilføjes.
 
-                    st.subheader(f"Throw ins – {match_choice}")
+    Registret bruges kun på de færdige sæsontabeller (se _intern_throwins). EventTable/MatchBundle
+    beholder deres lokale koder pr. kamp: de bygges i worker-processer og caches pr. kamp, så et
+    proces-delt register kan ikke følge med ind i dem. Lokale koder oversættes via team_ids/player_ids.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {"t": {}, "p": {}}
+        self._names = {"t": [], "p": []}
+
+    @staticmethod
+    def _canon(uid: str, prefix: str) -> str:
+        uid = str(uid or "").strip()
+        return uid[1:] if uid.startswith(prefix) and uid[1:].isdigit() else uid
+
+    def _intern(self, kind: str, uid, name=None) -> int:
+        key = self._canon(uid, kind)
+        codes, names = self._codes[kind], self._names[kind]
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(names)
+            names.append(name or (normalize_team_name(key) if kind == "t" else key) or "Unknown")
+        elif name:
+            names[code] = name
+        return code
+
+    def add_sheet(self, sheet: "MatchSheet") -> None:
+        with self._lock:
+            for tid, name in sheet.team_names.items():
+                self._intern("t", tid, name)
+            for pid, name in sheet.players.items():
+                self._intern("p", pid, name)
+
+    def _codes_for(self, kind: str, ids) -> np.ndarray:
+        ids = pd.Series(ids, dtype=object).fillna("")
+        uniq, inv = np.unique(ids.to_numpy(dtype=str), return_inverse=True)
+        with self._lock:
+            lut = np.array([self._intern(kind, u) for u in uniq.tolist()], dtype=np.int32)
+        return lut[inv] if len(uniq) else np.zeros(0, np.int32)
+
+    def team_codes(self, ids) -> np.ndarray:
+        return self._codes_for("t", ids)
+
+    def player_codes(self, ids) -> np.ndarray:
+        return self._codes_for("p", ids)
+
+    def team_names(self, codes) -> pd.Categorical:
+        """Navne til visning – som Categorical, så groupby/filtrering kører på koderne."""
+        return self._labels("t", codes)
+
+    def player_names(self, codes) -> pd.Categorical:
+        return self._labels("p", codes)
+
+    def state(self) -> dict:
+        """Koder og navne som JSON-venlig dict (se _save_registry)."""
+        with self._lock:
+            return {kind: {"codes": dict(self._codes[kind]), "names": list(self._names[kind])} for kind in ("t", "p")}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "SeasonRegistry":
+        reg = cls()
+        for kind in ("t", "p"):
+            reg._codes[kind] = dict(state[kind]["codes"])
+            reg._names[kind] = list(state[kind]["names"])
+        return reg
+
+    def _labels(self, kind: str, codes) -> pd.Categorical:
+        with self._lock:
+            names = np.array(self._names[kind] + ["Unknown"], dtype=object)
+        cats, name_codes = np.unique(names.astype(str), return_inverse=True)
+        return pd.Categorical.from_codes(name_codes[np.asarray(codes)], categories=cats)
+
+def _registry_path() -> Path:
+    return ARTIFACT_CACHE / f"v{SCHEMA_VER}" / "registry.json"
 
-                    col1, col2 = st.columns([0.8, 1.9])
-                    with col1:
-                        try:
-                            from mplsoccer import Pitch
-                            import matplotlib.pyplot as plt
-                            import matplotlib.patheffects as pe
+@st.cache_resource(show_spinner=False)
+def _registry_store(cache_buster: int = SCHEMA_VER) -> dict:
+    """
+    Registret + de (F7-sti, fingerprint) der er lagt ind. Gemmes på disk ved siden af manifesterne,
+    så en kold proces kun parser F7-filer der er nye eller ændrede siden sidst.
+    """
+    try:
+        saved = json.loads(_registry_path().read_text())
+        registry = SeasonRegistry.from_state(saved["registry"])
+        sheets = {tuple(k) for k in saved["sheets"]}
+    except Exception:
+        registry, sheets = SeasonRegistry(), set()
+    return {"registry": registry, "sheets": sheets, "lock": threading.Lock()}
+
+def season_registry(jobs: list[dict]) -> SeasonRegistry:
+    """Proces-delt register; F7-filer der ikke er set før (pr. fingerprint) lægges ind i kamp-rækkefølge."""
+    store = _registry_store(SCHEMA_VER)
+    with store["lock"]:
+        added = False
+        for j in jobs:
+            f7 = j.get("f7")
+            key = (f7, file_fingerprint(f7)) if f7 else None
+            if key and key not in store["sheets"]:
+                store["registry"].add_sheet(match_sheet(f7))
+                store["sheets"].add(key)
+                added = True
+        if added:
+            _save_registry(store)
+    return store["registry"]
+
+def _save_registry(store: dict) -> None:
+    path = _registry_path()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"registry": store["registry"].state(), "sheets": sorted(store["sheets"])}))
+        os.replace(tmp, path)
+    except Exception:
+        pass  # best effort
+
+# --- Sæsontabel for indkast (delt af alle indkast-faner) ----------------------
+_THROWIN_DEFAULTS = [
+    ("Thrown into the box", False),
+    ("end_x", None), ("end_y", None),
+    ("End zone", None), ("End third", None),
+    ("Seq events", None), ("Seq passes", None), ("Seq duration (s)", None),
+    ("Seq ends with shot", None), ("Seq last type", None), ("Seq last x", None), ("Seq last y", None),
+    ("Ball retention", False),
+    ("Shot in window", False), ("Goal in window", False),
+    ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (window)", 0.0),
+    ("Distance (m)", None),
+]
+
+def season_throwins(params: ThrowinParams = ThrowinParams()) -> pd.DataFrame:
+    """
+    Alle sæsonens indkast (alle runder) med Round/Match, default-kolonner, numeriske
+    typer og is_outlier – beriget efter params. Kun nye/ændrede kampe indlæses, og et nyt
+    parametersæt genberiger kun fra cachede events; fanerne filtrerer kun.
+    """
+    return _season_throwins(params).copy(deep=False)
 
-                            pitch = Pitch(pitch_type="opta", line_zorder=2,
-                                          pitch_color="white", line_color="black")
-                            fig, ax = pitch.draw(figsize=(4.6, 3.1))
-                            fig.set_dpi(160)
-                            if df_plot.empty:
-                                st.info("Ingen indkast matcher de valgte filtre.")
-                            else:
-                                def color_for_team(team):
-                                    return BRAND["primary"] if team in TEAM_ALIASES else "#C8CDD9"
+def _season_throwins(params: ThrowinParams) -> pd.DataFrame:
+    jobs = match_jobs(list_round_dirs(DATA_BASE))
+    registry = season_registry(jobs)
 
-                                for team, sub in df_plot.groupby(df_plot["Team"].fillna("Unknown")):
-                                    x = pd.to_numeric(sub["x"], errors="coerce")
-                                    y = pd.to_numeric(sub["y"], errors="coerce")
-                                    mask = x.notna() & y.notna()
-                                    if not mask.any():
-                                        continue
-                                    sizes = 60 + pd.to_numeric(sub["Delay (s)"], errors="coerce").fillna(0) * 10
-                                    face = color_for_team(team)
-                                    edge = "#000000" if team in TEAM_ALIASES else "#666666"
+    def prepare(raw: pd.DataFrame, job: tuple) -> pd.DataFrame:
+        _, _, f24, f7, f70, fp = job
+        return _prepare_throwins(enrich_throwins(raw, _throwin_events(f24, f7, f70, fp, SCHEMA_VER), params), params)
 
-                                    ax.scatter(
-                                        x[mask].astype(float), y[mask].astype(float),
-                                        s=sizes[mask],
-                                        facecolors=face,
-                                        edgecolors=edge,
-                                        linewidth=0.8,
-                                        alpha=0.95,
-                                        zorder=3,
-                                        label=team
-                                    )
+    return _ingest_incremental(
+        "throwins", jobs, prepare=prepare,
+        finalize=lambda df: _intern_throwins(df, registry), variant=params,
+        persist=params == ThrowinParams(),   # standard-sættet læses fra én fil ved kold start
+    )
 
-                                    for _, row in sub[mask].iterrows():
-                                        ax.text(
-                                            float(row["x"]), float(row["y"]), str(int(row["Throw-in #"])),
-                                            ha="center", va="center",
-                                            fontsize=7, color="white",
-                                            zorder=4,
-                                            path_effects=[pe.withStroke(linewidth=1.8, foreground="black")]
-                                        )
+def _prepare_throwins(df: pd.DataFrame, params: ThrowinParams = ThrowinParams()) -> pd.DataFrame:
+    if "Thrown into the box" not in df.columns and "End in box" in df.columns:
+        df["Thrown into the box"] = df["End in box"]
+    for col, default in _THROWIN_DEFAULTS:
+        if col not in df.columns:
+            df[col] = default
+    if "Taker" not in df.columns:
+        df["Taker"] = df.get("Taker id", "").fillna("").replace({"": "Unknown"})
+
+    for col in ("Delay (s)", "Shot xG (window)", "Distance (m)"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["is_outlier"] = _mark_outliers(df, params.outlier_s)
+    return df
+
+def _intern_throwins(df: pd.DataFrame, registry: SeasonRegistry) -> pd.DataFrame:
+    """
+    team_code/taker_code (int32) + Team/Taker som Categorical med kanoniske navne fra registret,
+    og filter_bits til throwin_mask.
+    """
+    df["team_code"] = registry.team_codes(df["throwin_team_id"])
+    df["taker_code"] = registry.player_codes(df["Taker id"])
+    df["Team"] = registry.team_names(df["team_code"].to_numpy())
+    df["Taker"] = registry.player_names(df["taker_code"].to_numpy())
+    df["filter_bits"] = throwin_filter_bits(df)
+    return df
+
+def rounds_view(df: pd.DataFrame, round_dirs) -> pd.DataFrame:
+    """Egen kopi af sæsontabellen begrænset til de valgte runde-mapper."""
+    if df.empty:
+        return df.copy()
+    return df[rounds_mask(df, round_dirs)].copy()
+
+def rounds_mask(df: pd.DataFrame, round_dirs) -> np.ndarray:
+    """Bool pr. række: indkastet ligger i en af de valgte runde-mapper."""
+    if df.empty:
+        return np.zeros(0, dtype=bool)
+    return df["Round"].isin({p.name for p in round_dirs}).to_numpy(dtype=bool)
+
+# --- Filter-bitmaps: én uint16 pr. indkast, ét AND pr. filterkombination ------
+# dimension -> (kolonne, {radio-valg: værdi}); hvert (dimension, valg) har sin egen bit
+THROWIN_FILTERS = {
+    "side":      ("Side", {"Home": "Home", "Away": "Away"}),
+    "third":     ("Third", {"First 1/3": "First 1/3", "Second 1/3": "Second 1/3", "Last 1/3": "Last 1/3"}),
+    "box":       ("Thrown into the box", {"Yes": True, "No": False}),
+    "retention": ("Ball retention", {"Retained": True, "Lost": False}),
+    "shot":      ("Shot in window", {"Yes": True, "No": False}),
+    "goal":      ("Goal in window", {"Yes": True, "No": False}),
+    "outlier":   ("is_outlier", {"Yes": True, "No": False}),
+}
+_FILTER_BIT = {
+    key: 1 << i for i, key in enumerate((dim, c) for dim, (_, choices) in THROWIN_FILTERS.items() for c in choices)
+}
 
-                                handles, labels = ax.get_legend_handles_labels()
-                                if labels:
-                                    order = sorted(range(len(labels)), key=lambda i: 0 if labels[i] in TEAM_ALIASES else 1)
-                                    handles = [handles[i] for i in order]
-                                    labels = [labels[i] for i in order]
-                                    ax.legend(handles, labels,
-                                              loc="upper center", bbox_to_anchor=(0.5, -0.05),
-                                              ncol=3, frameon=True, title="Hold")
+def throwin_filter_bits(df: pd.DataFrame) -> np.ndarray:
+    """Pakket bitmap pr. række (uint16): bit sat når kolonnen har valgets værdi."""
+    bits = np.zeros(len(df), dtype=np.uint16)
+    for (dim, choice), bit in _FILTER_BIT.items():
+        col, choices = THROWIN_FILTERS[dim]
+        if col in df.columns:
+            hit = (df[col] == choices[choice]).to_numpy(dtype=bool, na_value=False)
+            bits[hit] |= np.uint16(bit)
+    return bits
+
+def throwin_mask(df: pd.DataFrame, **choices) -> np.ndarray:
+    """
+    Bool pr. række for radio-valgene (fx side="Home", box="Yes", outlier="No"; "All" = intet filter).
+    Bruger den forudberegnede filter_bits-kolonne hvis den findes – rækkerne materialiseres først af kalderen.
+    """
+    req = 0
+    for dim, choice in choices.items():
+        if choice != "All":
+            req |= _FILTER_BIT[(dim, choice)]
+    bits = df["filter_bits"].to_numpy() if "filter_bits" in df.columns else throwin_filter_bits(df)
+    return (bits & req) == req
+
+# --- Metrik-register: én linje pr. metrik, ét groupby.agg pr. visning ----------
+def _flag(col: str):
+    return lambda df: df[col].fillna(False).astype(bool)
+
+# Basis: navn -> (kolonne eller udtryk df -> Series, reduktion, decimaler)
+THROWIN_METRICS = {
+    "Games":              ("Match", "nunique", None),
+    "Total throw-ins":    ("Match", "size", None),
+    "Avg. delay (s)":     ("Delay (s)", "mean", 2),
+    "Throw-ins <7s":      (lambda df: pd.to_numeric(df["Delay (s)"], errors="coerce") < 7, "sum", None),
+    "Total delay (s)":    ("Delay (s)", "sum", 1),
+    "Thrown into box":    (_flag("Thrown into the box"), "sum", None),
+    "Retained throw-ins": (_flag("Ball retention"), "sum", None),
+    "Shots ≤window":      (_flag("Shot in window"), "sum", None),
+    "Goals ≤window":      (_flag("Goal in window"), "sum", None),
+    "xG ≤window":         ("Shot xG (window)", "sum", 2),
+    "Avg. distance (m)":  ("Distance (m)", "mean", 2),
+    "Max distance (m)":   ("Distance (m)", "max", 2),
+    "Total distance (m)": ("Distance (m)", "sum", 1),
+}
+# Afledte: navn -> (tæller, nævner, faktor, decimaler) – regnes af de (afrundede) basisværdier
+THROWIN_RATIOS = {
+    "Throw-ins per game":       ("Total throw-ins", "Games", 1, 2),
+    "Delay per throw-in (s)":   ("Total delay (s)", "Total throw-ins", 1, 2),
+    "% thrown into box":        ("Thrown into box", "Total throw-ins", 100, 1),
+    "Thrown into box per game": ("Thrown into box", "Games", 1, 2),
+    "Retention %":              ("Retained throw-ins", "Total throw-ins", 100, 1),
+    "Retained per game":        ("Retained throw-ins", "Games", 1, 2),
+    "% Shots ≤window":          ("Shots ≤window", "Total throw-ins", 100, 1),
+    "% Goals ≤window":          ("Goals ≤window", "Total throw-ins", 100, 1),
+    "xG per ≤window":           ("xG ≤window", "Total throw-ins", 1, 3),
+    "xG per game ≤window":      ("xG ≤window", "Games", 1, 2),
+}
 
-                            st.pyplot(fig, use_container_width=False, clear_figure=True)
-                            st.caption("Circle size = Delay in seconds • Direction of play for both teams = Right")
-                        except Exception as e:
-                            st.warning(f"Kunne ikke tegne banen: {e}")
+def window_label(name: str, params: ThrowinParams) -> str:
+    """Visningsnavn: "window" i kolonne-/metriknavne bliver skudvinduet, fx "Shots ≤window" → "Shots ≤30s"."""
+    return name.replace("window", f"{params.shot_window_s}s")
+
+def window_labels(params: ThrowinParams) -> dict:
+    """rename-dict (kolonne/metrik → visningsnavn) for alt der afhænger af skudvinduet."""
+    names = [*THROWIN_METRICS, *THROWIN_RATIOS, *(col for col, _ in _THROWIN_DEFAULTS)]
+    return {n: window_label(n, params) for n in names if "window" in n}
+
+def _metric_deps(metrics: list[str]) -> list[str]:
+    """Basis-metrikker bag metrics (afledte → tæller/nævner), i første-forekomst-rækkefølge."""
+    need = []
+    for m in metrics:
+        for dep in (THROWIN_RATIOS[m][:2] if m in THROWIN_RATIOS else (m,)):
+            if dep not in need:
+                need.append(dep)
+    return need
+
+def _metric_columns(df: pd.DataFrame, names) -> tuple[pd.DataFrame, dict]:
+    """(df med udtryks-kolonner, {navn: kildekolonne}) for basis-metrikkerne names."""
+    exprs, cols = {}, {}
+    for name in names:
+        src = THROWIN_METRICS[name][0]
+        if callable(src):
+            exprs[f"__m{len(exprs)}"] = src(df)
+            src = f"__m{len(exprs) - 1}"
+        cols[name] = src
+    return (df.assign(**exprs) if exprs else df), cols
+
+def _finish_metrics(out: pd.DataFrame, need: list[str], metrics: list[str], rounded: bool,
+                    rename: dict | None) -> pd.DataFrame:
+    if rounded:
+        for name in need:
+            digits = THROWIN_METRICS[name][2]
+            if digits is not None:
+                out[name] = out[name].round(digits)
+    for m in metrics:
+        if m in THROWIN_RATIOS:
+            num, den, factor, digits = THROWIN_RATIOS[m]
+            out[m] = (out[num] / out[den]) * factor
+            if rounded:
+                out[m] = out[m].round(digits)
+    return out[metrics].rename(columns=rename or {}).reset_index()
+
+def aggregate_metrics(df: pd.DataFrame, by, metrics: list[str], rounded: bool = True,
+                      rename: dict | None = None) -> pd.DataFrame:
+    """
+    Metrikker fra THROWIN_METRICS/THROWIN_RATIOS pr. by: basis i ét groupby.agg, afledte
+    kolonnevis bagefter. Med rounded afrundes basis før de afledte (som tabellerne altid har gjort).
+    """
+    need = _metric_deps(metrics)
+    work, cols = _metric_columns(df, need)
+    out = work.groupby(by, dropna=False, observed=True).agg(
+        **{name: (cols[name], THROWIN_METRICS[name][1]) for name in need}
+    )
+    return _finish_metrics(out, need, metrics, rounded, rename)
 
-                    with col2:
-                        display_cols = [
-                            "Period", "Ball out (mm:ss)", "Throw-in (mm:ss)",
-                            "Delay (s)", "Team", "Taker", "Side", "Third", "Zone",
-                            "x", "y", "end_x", "end_y", "End zone", "End third",
-                            "Distance (m)",
-                            "Thrown into the box", "Ball retention",
-                            "Seq events", "Seq passes", "Seq duration (s)", "Seq ends with shot", "Seq last type",
-                            "Shot in 30s", "Goal in 30s", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (30s)",
-                            "Game date", "Throw-in #", "is_outlier", "is_FCK",
-                            "throwin_event_id", "throwin_team_id", "throwin_time_s", "throwin_period",
-                        ]
-                        show_cols = [c for c in display_cols if c in df_table.columns]
-                        st.dataframe(df_table[show_cols], hide_index=True, height=380)
+# --- Indkast-kube: summer pr. (Round, Match, Team, filter_bits) -----------------
+# filter_bits dækker alle radio-dimensioner + outlier. Match er med for Games (unikke kampnavne, så
+# samme opgør i to runder tæller én gang) – et hold spiller én kamp pr. runde, så Match giver ingen
+# ekstra celler ud over (Round, Team); kuben vokser kun med antal runder, og runde-intervaller
+# klares af RoundPrefix uafhængigt af sæsonens længde.
+CUBE_KEYS = ["Round", "Match", "Team", "filter_bits"]
 
+def build_throwin_cube(df: pd.DataFrame, keys: list[str] = CUBE_KEYS) -> pd.DataFrame:
+    """
+    Additive dele af THROWIN_METRICS pr. kube-celle: size/sum/max direkte, mean som "Σ" + "n".
+    nunique (Games) kan kun være på Match, som derfor ligger i nøglen (se CUBE_KEYS).
+    """
+    names = [n for n, (_, how, _) in THROWIN_METRICS.items() if how != "nunique"]
+    work, cols = _metric_columns(df, names)
+    spec = {}
+    for name in names:
+        how = THROWIN_METRICS[name][1]
+        if how == "mean":
+            spec[f"{name} Σ"], spec[f"{name} n"] = (cols[name], "sum"), (cols[name], "count")
+        else:
+            spec[name] = (cols[name], how)
+    return work.groupby(keys, dropna=False, observed=True).agg(**spec).reset_index()
+
+@st.cache_resource(show_spinner=False, max_entries=THROWIN_PARAM_CACHE_MAX * 2)
+def _cube_store(params: ThrowinParams, by: tuple) -> dict:
+    return {"df": None, "cube": pd.DataFrame(), "prefix": {}, "players": {}, "lock": threading.Lock()}
+
+def _season_throwin_cube(params: ThrowinParams, by: tuple) -> pd.DataFrame:
+    """
+    Kuben for sæsontabellen (params) med gruppe-nøglerne by (fx ("Team", "Taker")) –
+    bygges igen kun når sæsontabellen er ny. Delt; læses af season_round_prefix/player_throwin_table.
+    """
+    df = _season_throwins(params)
+    store = _cube_store(params, by)
+    with store["lock"]:
+        if store["df"] is not df:
+            keys = ["Round", "Match", *by, "filter_bits"]
+            store["cube"] = build_throwin_cube(df, keys) if not df.empty else pd.DataFrame()
+            store["df"], store["prefix"], store["players"] = df, {}, {}
+        return store["cube"]
+
+# --- Prefix-summer over runder: runde-interval = to opslag og en subtraktion ----
+PREFIX_CACHE_MAX = 32         # filterkombinationer pr. kube
+PLAYER_TABLE_CACHE_MAX = 64   # (runde-interval, filtre) pr. kube
+
+def _lru_get(cache: dict, key):
+    """Opslag i en dict brugt som LRU (sidst brugt bagerst); None ved miss. Kaldes under lås."""
+    hit = cache.pop(key, None)
+    if hit is not None:
+        cache[key] = hit
+    return hit
+
+def _lru_put(cache: dict, key, value, max_entries: int) -> None:
+    cache[key] = value
+    while len(cache) > max_entries:
+        cache.pop(next(iter(cache)))
+
+def round_number(name: str) -> int | None:
+    """'R12' → 12 (None hvis mappen ikke hedder R<nr>)."""
+    m = re.search(r"R(\d+)$", str(name))
+    return int(m.group(1)) if m else None
+
+def _prefix_sum(grid: np.ndarray) -> np.ndarray:
+    """Kumulative summer langs akse 0 med en nul-række først: rækkerne [a, b) summer til cum[b] - cum[a]."""
+    return np.concatenate([np.zeros((1, grid.shape[1]), dtype=grid.dtype), np.cumsum(grid, axis=0)])
+
+class RoundPrefix:
+    """
+    Basis-metrikker fra kube-celler pr. (runde, gruppe) som kumulative summer langs runde-aksen:
+    runderne [lo, hi] er cum[b] - cum[a], uafhængigt af sæsonens længde. Max tages over intervallets
+    runder. Games (unikke kampnavne – samme opgør i to runder tæller én gang) tælles fra en lille
+    tabel med én række pr. (runde, gruppe, kamp).
+    """
+    def __init__(self, cells: pd.DataFrame, by: list[str]):
+        self.rounds, self.groups, self.cum, self.per_round = np.zeros(0, dtype=int), pd.Index([]), {}, {}
+        self.distinct = {}
+        if cells.empty:
+            return
+        cells = cells.assign(_round=cells["Round"].map(round_number)).dropna(subset=["_round"])
+        cells["_round"] = cells["_round"].astype(int)
+        self.groups = cells.groupby(by, observed=True).size().index
+        spec = {}
+        for name, (src, how, _) in THROWIN_METRICS.items():
+            if how == "nunique":
+                occ = cells[["_round", *by, src]].drop_duplicates()
+                group_pos = self.groups.get_indexer(occ[by[0]] if len(by) == 1 else pd.MultiIndex.from_frame(occ[by]))
+                value = pd.factorize(occ[src])[0]
+                self.distinct[name] = (occ["_round"].to_numpy(), group_pos, value, int(value.max(initial=0)) + 1)
+            elif how == "mean":
+                spec[f"{name} Σ"], spec[f"{name} n"] = (f"{name} Σ", "sum"), (f"{name} n", "sum")
+            else:
+                spec[name] = (name, "max" if how == "max" else "sum")
+        grouped = cells.groupby(["_round", *by], observed=True)
+        per = grouped.agg(**spec)
+        self.rounds = np.unique(cells["_round"].to_numpy())
+        r_pos = np.searchsorted(self.rounds, per.index.get_level_values(0))
+        g_pos = self.groups.get_indexer(per.index.droplevel(0))
+        shape = (len(self.rounds), len(self.groups))
+        for col in per.columns:
+            vals = per[col].to_numpy()
+            if spec[col][1] == "max":
+                grid = np.full(shape, np.nan)
+                grid[r_pos, g_pos] = vals
+                self.per_round[col] = grid
+            else:
+                grid = np.zeros(shape, dtype=vals.dtype)
+                grid[r_pos, g_pos] = vals
+                self.cum[col] = _prefix_sum(grid)
+
+    def _span(self, lo: int, hi: int) -> tuple[int, int]:
+        return int(np.searchsorted(self.rounds, lo, "left")), int(np.searchsorted(self.rounds, hi, "right"))
+
+    def _sum(self, col: str, a: int, b: int) -> np.ndarray:
+        cum = self.cum[col]
+        return cum[b] - cum[a]
+
+    def total(self, lo: int, hi: int) -> int:
+        """Antal indkast i runderne [lo, hi]."""
+        a, b = self._span(lo, hi)
+        return int(self._sum("Total throw-ins", a, b).sum()) if self.cum else 0
+
+    def metrics(self, lo: int, hi: int, metrics: list[str], rounded: bool = True,
+                rename: dict | None = None) -> pd.DataFrame:
+        """Som aggregate_metrics pr. gruppe, for runderne [lo, hi]."""
+        a, b = self._span(lo, hi)
+        need = _metric_deps(metrics)
+        out = pd.DataFrame(index=self.groups)
+        for name in need:
+            how = THROWIN_METRICS[name][1]
+            if how == "nunique":
+                rnd, group_pos, value, radix = self.distinct[name]
+                sel = (rnd >= lo) & (rnd <= hi)
+                pairs = np.unique(group_pos[sel] * radix + value[sel])
+                out[name] = np.bincount(pairs // radix, minlength=len(self.groups))
+            elif how == "mean":
+                out[name] = pd.Series(self._sum(f"{name} Σ", a, b), index=self.groups) / self._sum(f"{name} n", a, b)
+            elif how == "max":
+                grid = self.per_round[name][a:b]
+                out[name] = np.fmax.reduce(grid, axis=0) if len(grid) else np.nan
+            else:
+                out[name] = self._sum(name, a, b)
+        out = out[self._sum("Total throw-ins", a, b) > 0]
+        return _finish_metrics(out, need, metrics, rounded, rename)
+
+def season_round_prefix(params: ThrowinParams = ThrowinParams(), by: tuple = ("Team",), **choices) -> RoundPrefix:
+    """RoundPrefix for kuben (params, by) begrænset til radio-valgene (se throwin_mask) – caches pr. valg."""
+    cube = _season_throwin_cube(params, by)
+    store = _cube_store(params, by)
+    key = _choices_key(choices)
+    with store["lock"]:
+        prefix = _lru_get(store["prefix"], key)
+        if prefix is None:
+            cells = cube[throwin_mask(cube, **choices)] if not cube.empty else cube
+            prefix = RoundPrefix(cells, list(by))
+            _lru_put(store["prefix"], key, prefix, PREFIX_CACHE_MAX)
+    return prefix
+
+def _choices_key(choices: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in choices.items() if v != "All"))
+
+PLAYER_METRICS = [
+    "Games", "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
+    "Thrown into box", "% thrown into box",
+    "Retained throw-ins", "Retention %",
+    "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window",
+    "xG ≤window", "xG per ≤window",
+    "Avg. distance (m)", "Max distance (m)", "Total distance (m)",
+]
+
+def player_throwin_table(params: ThrowinParams, lo: int, hi: int, **choices) -> pd.DataFrame:
+    """
+    Individuals-tabellen: én række pr. (Team, Player) uden outliers for runderne [lo, hi] og
+    radio-valgene, med Label og is_FCK. LRU-cachet pr. sæsontabel, så min.-kast, sortering og
+    Top 3 kun arbejder på den lille tabel.
+    """
+    by = ("Team", "Taker")
+    cube = _season_throwin_cube(params, by)
+    store = _cube_store(params, by)
+    key = (lo, hi, _choices_key(choices))
+    with store["lock"]:
+        table = _lru_get(store["players"], key)
+    if table is not None:
+        return table.copy(deep=False)
+
+    table = season_round_prefix(params, by, **choices, outlier="No").metrics(lo, hi, PLAYER_METRICS)
+    table = table.rename(columns={"Taker": "Player"}).astype({"Team": str, "Player": str})
+    table["Label"] = table["Player"].fillna("Unknown") + " — " + table["Team"].fillna("Unknown")
+    table["is_FCK"] = table["Team"].apply(lambda t: t in TEAM_ALIASES)
+    with store["lock"]:
+        if store["cube"] is cube:   # ikke en forældet tabel ind i en nyere cache
+            _lru_put(store["players"], key, table, PLAYER_TABLE_CACHE_MAX)
+    return table.copy(deep=False)
+
+
+def prefetch_match_bundles(jobs: list[dict], workers: int | None = None, projection: str = "all") -> None:
+    """Byg de MatchBundles der ikke allerede er i cachen parallelt og læg dem ind i bundle-cachen."""
+    loaded = _loaded_bundles()
+    todo = []
+    for j in jobs:
+        fp = match_fingerprint(j["f24"], j["f7"], j["f70"])
+        if (fp, projection) not in loaded:
+            todo.append((j["f24"], j["f7"], j["f70"], fp))
+    todo = todo[:BUNDLE_CACHE_MAX]
+    if len(todo) < 2:
+        return
+    bundles = _run_parallel(_bundle_worker, [(*t[:3], projection) for t in todo], workers or INGEST_WORKERS)
+    for (f24, f7, f70, fp), bundle in zip(todo, bundles):
+        _load_match_bundle(f24, f7, f70, fp, SCHEMA_VER, projection, _prebuilt=bundle)
 
 
 # === Module switcher (SIDEBAR) ===
@@ -2409,7 +2000,22 @@ with st.sidebar:
 #                                  MODULES
 # =============================================================================
 
+def throwin_params_sidebar() -> ThrowinParams:
+    """Tærsklerne bag de afledte indkast-kolonner (kæde, skud-vindue, retention, outliers)."""
+    d = ThrowinParams()
+    with st.sidebar.expander("Indkast-parametre"):
+        return ThrowinParams(
+            max_gap_s=int(st.number_input("Max pause i kæde (s)", 1, 60, d.max_gap_s, key="ti_max_gap_s")),
+            shot_window_s=int(st.number_input("Skud-vindue efter indkast (s)", 5, 120, d.shot_window_s,
+                                              key="ti_shot_window_s")),
+            retention_s=float(st.number_input("Ball retention fra (s)", 0.0, 60.0, d.retention_s, step=0.5,
+                                              key="ti_retention_s")),
+            outlier_s=float(st.number_input("Outlier over (s)", 5.0, 300.0, d.outlier_s, step=1.0,
+                                            key="ti_outlier_s")),
+        )
+
 def render_throwins_module():
+    params = throwin_params_sidebar()
     # NY: Tilføj “Spillerikoner”-fane
     tab_superliga, tab_Comparison, tab_individuals, tab_icons, tab_data, tab_matches = st.tabs(
         ["Throw in overview", "Comparison", "Individuals", "Spillerikoner", "Throw in Data", "Matches"]
@@ -2448,124 +2054,49 @@ def render_throwins_module():
             with filter_card("Thrown into the box"):
                 thrown_box_filter = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="superliga_thrownbox_filter")
         with c4:
-            with filter_card("Ball retention (≥7s)"):
+            with filter_card(f"Ball retention (≥{params.retention_s:g}s)"):
                 retention_filter = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="superliga_retention_filter")
         with c5:
-            with filter_card("Shot ≤30s"):
-                shot30_filter = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="superliga_shot30_filter")
+            with filter_card(f"Shot ≤{params.shot_window_s}s"):
+                shot_filter = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="superliga_shot_filter")
         with c6:
-            with filter_card("Goal ≤30s"):
-                goal30_filter = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="superliga_goal30_filter")
+            with filter_card(f"Goal ≤{params.shot_window_s}s"):
+                goal_filter = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="superliga_goal_filter")
         # ----------------------------------------
 
         selected_rounds = {r for r in range(sel_min, sel_max + 1)}
         round_dirs = [p for p in round_dirs_all if _round_num(p) in selected_rounds]
 
-        all_rows = []
-        for round_dir in round_dirs:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(str(f24_path), str(f7_path) if f7_path else None,
-                                                                str(f70_path) if f70_path else None, SCHEMA_VER)
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows.append(df_throw)
-
-        if not all_rows:
+        choices = dict(side=side_filter, third=third_filter, box=thrown_box_filter,
+                       retention=retention_filter, shot=shot_filter, goal=goal_filter)
+        if season_round_prefix(params).total(sel_min, sel_max) == 0:
             st.info("Ingen indkast fundet i det valgte interval.")
             st.stop()
-
-        season_df = pd.concat(all_rows, ignore_index=True)
-
-        if "Thrown into the box" not in season_df.columns and "End in box" in season_df.columns:
-            season_df["Thrown into the box"] = season_df["End in box"]
-
-        for col, default in [
-            ("Thrown into the box", False),
-            ("end_x", None), ("end_y", None),
-            ("End zone", None), ("End third", None),
-            ("Seq events", None), ("Seq passes", None), ("Seq duration (s)", None),
-            ("Seq ends with shot", None), ("Seq last type", None), ("Seq last x", None), ("Seq last y", None),
-            ("Ball retention", False),
-            ("Shot in 30s", False), ("Goal in 30s", False),
-            ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (30s)", 0.0),
-            ("Distance (m)", None),
-        ]:
-            if col not in season_df.columns:
-                season_df[col] = default
-
-        if side_filter != "All":
-            season_df = season_df[season_df["Side"] == side_filter]
-        if third_filter != "All":
-            season_df = season_df[season_df["Third"] == third_filter]
-        if thrown_box_filter != "All":
-            season_df = season_df[season_df["Thrown into the box"] == (thrown_box_filter == "Yes")]
-        if retention_filter != "All":
-            season_df = season_df[season_df["Ball retention"] == (retention_filter == "Retained")]
-        if shot30_filter != "All":
-            season_df = season_df[season_df["Shot in 30s"] == (shot30_filter == "Yes")]
-        if goal30_filter != "All":
-            season_df = season_df[season_df["Goal in 30s"] == (goal30_filter == "Yes")]
-
-        if season_df.empty:
+        if season_round_prefix(params, **choices).total(sel_min, sel_max) == 0:
             st.info("Ingen indkast efter valgte filtre.")
             st.stop()
 
-        season_df["Delay (s)"] = pd.to_numeric(season_df["Delay (s)"], errors="coerce")
-        season_df["Shot xG (30s)"] = pd.to_numeric(season_df["Shot xG (30s)"], errors="coerce")
-        season_df["is_outlier"] = _mark_outliers(season_df)
-        season_df_used = season_df[~season_df["is_outlier"]].copy()
-
-        g = season_df_used.groupby("Team", dropna=False)
-
-        games = g["Match"].nunique().rename("Games")
-        tot_throw = g.size().rename("Total throw-ins")
-        avg_delay = g["Delay (s)"].mean().round(2).rename("Avg. delay (s)")
-        lt7 = g.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay = g["Delay (s)"].sum().round(1).rename("Total delay (s)")
-
-        thrown_cnt = g.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        thrown_pct = ((thrown_cnt / tot_throw) * 100).round(1).rename("% thrown into box")
-        thrown_per_game = (thrown_cnt / games).round(2).rename("Thrown into box per game")
-
-        retained_cnt = g.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        pct_retained = ((retained_cnt / tot_throw) * 100).round(1).rename("Retention %")
-        retained_per_game = (retained_cnt / games).round(2).rename("Retained per game")
-
-        shot30_cnt = g.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("Shots ≤30s")
-        shot30_pct = ((shot30_cnt / tot_throw) * 100).round(1).rename("% Shots ≤30s")
-        goal30_cnt = g.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("Goals ≤30s")
-        goal30_pct = ((goal30_cnt / tot_throw) * 100).round(1).rename("% Goals ≤30s")
-        xg30_sum   = g["Shot xG (30s)"].sum().round(2).rename("xG ≤30s")
-        xg30_per_ti = (xg30_sum / tot_throw).round(3).rename("xG per ≤30s")
-        xg30_per_game = (xg30_sum / games).round(2).rename("xG per game ≤30s")
-
-        overview = pd.concat(
-            [games, tot_throw, avg_delay, lt7, total_delay,
-             thrown_cnt, thrown_pct, thrown_per_game,
-             retained_cnt, pct_retained, retained_per_game,
-             shot30_cnt, shot30_pct, goal30_cnt, goal30_pct, xg30_sum, xg30_per_ti, xg30_per_game],
-            axis=1
-        ).reset_index()
-        overview["Throw-ins per game"] = (overview["Total throw-ins"] / overview["Games"]).round(2)
-        overview["Delay per throw-in (s)"] = (overview["Total delay (s)"] / overview["Total throw-ins"]).round(2)
+        season_all = season_throwins(params)
+        season_df = season_all[rounds_mask(season_all, round_dirs) & throwin_mask(season_all, **choices)]
+
+        overview = season_round_prefix(params, **choices, outlier="No").metrics(sel_min, sel_max, [
+            "Games", "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
+            "Thrown into box", "% thrown into box", "Thrown into box per game",
+            "Retained throw-ins", "Retention %", "Retained per game",
+            "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window", "xG ≤window", "xG per ≤window", "xG per game ≤window",
+            "Throw-ins per game", "Delay per throw-in (s)",
+        ], rename=window_labels(params)).astype({"Team": str})
 
         import altair as alt
         metric = st.selectbox(
             "Choose metric",
-            ["Avg. delay (s)", "Delay per throw-in (s)", "Throw-ins per game",
-             "Total throw-ins", "Throw-ins <7s", "Total delay (s)",
-             "Thrown into box", "% thrown into box", "Thrown into box per game",
-             "Retained throw-ins", "Retention %", "Retained per game",
-             "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-             "xG ≤30s", "xG per ≤30s", "xG per game ≤30s"]
+            [window_label(m, params) for m in [
+                "Avg. delay (s)", "Delay per throw-in (s)", "Throw-ins per game",
+                "Total throw-ins", "Throw-ins <7s", "Total delay (s)",
+                "Thrown into box", "% thrown into box", "Thrown into box per game",
+                "Retained throw-ins", "Retention %", "Retained per game",
+                "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window",
+                "xG ≤window", "xG per ≤window", "xG per game ≤window"]]
         )
         overview_sorted = overview.sort_values([metric, "Team"], ascending=[False, True]).reset_index(drop=True)
         chart_df = pd.DataFrame({
@@ -2597,11 +2128,11 @@ def render_throwins_module():
                 "Period", "Ball out (mm:ss)", "Throw-in (mm:ss)", "Delay (s)", "Team", "Game date",
                 "is_outlier", "is_FCK",
                 "Seq events", "Seq passes", "Seq duration (s)", "Seq ends with shot", "Seq last type", "Seq last x", "Seq last y",
-                "Shot in 30s", "Goal in 30s", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (30s)",
+                "Shot in window", "Goal in window", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (window)",
                 "throwin_event_id", "throwin_team_id", "throwin_time_s", "throwin_period",
             ]
             raw_cols = [c for c in season_df.columns if c in raw_cols]
-            st.dataframe(season_df[raw_cols], hide_index=True)
+            st.dataframe(season_df[raw_cols].rename(columns=window_labels(params)), hide_index=True)
 
     # ---- Comparison ----
     with tab_Comparison:
@@ -2633,94 +2164,26 @@ def render_throwins_module():
                 third_filter2 = st.radio("     ", ["All", "First 1/3", "Second 1/3", "Last 1/3"],
                                          horizontal=False, key="cmp_third")
 
-        selected_rounds2 = {r for r in range(sel_min2, sel_max2 + 1)}
-        round_dirs2 = [p for p in round_dirs_all if _round_num2(p) in selected_rounds2]
-
-        all_rows2 = []
-        for round_dir in round_dirs2:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path),
-                    str(f7_path) if f7_path else None,
-                    str(f70_path) if f70_path else None,
-                    SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows2.append(df_throw)
-
-        if not all_rows2:
+        if season_round_prefix(params).total(sel_min2, sel_max2) == 0:
             st.info("Ingen indkast i det valgte interval.")
             st.stop()
-
-        season_cmp = pd.concat(all_rows2, ignore_index=True)
-
-        if "Thrown into the box" not in season_cmp.columns and "End in box" in season_cmp.columns:
-            season_cmp["Thrown into the box"] = season_cmp["End in box"]
-        for col, default in [
-            ("Thrown into the box", False), ("Ball retention", False),
-            ("Shot in 30s", False), ("Goal in 30s", False),
-            ("Shot xG (30s)", 0.0), ("Distance (m)", None)
-        ]:
-            if col not in season_cmp.columns:
-                season_cmp[col] = default
-
-        if side_filter2 != "All":
-            season_cmp = season_cmp[season_cmp["Side"] == side_filter2]
-        if third_filter2 != "All":
-            season_cmp = season_cmp[season_cmp["Third"] == third_filter2]
-
-        if season_cmp.empty:
+        if season_round_prefix(params, side=side_filter2, third=third_filter2).total(sel_min2, sel_max2) == 0:
             st.info("Ingen data efter filtre.")
             st.stop()
 
-        season_cmp["Delay (s)"] = pd.to_numeric(season_cmp["Delay (s)"], errors="coerce")
-        season_cmp["Shot xG (30s)"] = pd.to_numeric(season_cmp["Shot xG (30s)"], errors="coerce")
-        season_cmp["is_outlier"] = _mark_outliers(season_cmp)
-        season_cmp_used = season_cmp[~season_cmp["is_outlier"]].copy()
-
-        gcmp = season_cmp_used.groupby("Team", dropna=False)
-        games_cmp = gcmp["Match"].nunique().rename("Games")
-        tot_throw_cmp = gcmp.size().rename("Total throw-ins")
-        avg_delay_cmp = gcmp["Delay (s)"].mean().rename("Avg. delay (s)")
-        lt7_cmp = gcmp.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay_cmp = gcmp["Delay (s)"].sum().rename("Total delay (s)")
-
-        thrown_cnt_cmp = gcmp.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        thrown_pct_cmp = ((thrown_cnt_cmp / tot_throw_cmp) * 100).rename("% thrown into box")
-        thrown_per_game_cmp = (thrown_cnt_cmp / games_cmp).rename("Thrown into box per game")
-
-        retained_cnt_cmp = gcmp.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        pct_retained_cmp = ((retained_cnt_cmp / tot_throw_cmp) * 100).rename("Retention %")
-        retained_per_game_cmp = (retained_cnt_cmp / games_cmp).rename("Retained per game")
-
-        shot30_cnt_cmp = gcmp.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("TI shots ≤30s")
-        shot30_pct_cmp = ((shot30_cnt_cmp / tot_throw_cmp) * 100).rename("% TI shots ≤30s")
-        goal30_cnt_cmp = gcmp.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("TI goals ≤30s")
-        goal30_pct_cmp = ((goal30_cnt_cmp / tot_throw_cmp) * 100).rename("% TI goals ≤30s")
-        xg30_sum_cmp   = gcmp["Shot xG (30s)"].sum().rename("TI xG ≤30s")
-        xg30_per_ti_cmp = (xg30_sum_cmp / tot_throw_cmp).rename("xG per TI ≤30s")
-        xg30_per_game_cmp = (xg30_sum_cmp / games_cmp).rename("xG per game ≤30s")
-
-        overview_cmp = pd.concat(
-            [games_cmp, tot_throw_cmp, avg_delay_cmp, lt7_cmp, total_delay_cmp,
-             thrown_cnt_cmp, thrown_pct_cmp, thrown_per_game_cmp,
-             retained_cnt_cmp, pct_retained_cmp, retained_per_game_cmp,
-             shot30_cnt_cmp, shot30_pct_cmp, goal30_cnt_cmp, goal30_pct_cmp,
-             xg30_sum_cmp, xg30_per_ti_cmp, xg30_per_game_cmp],
-            axis=1
-        ).reset_index()
-
-        overview_cmp["Throw-ins per game"] = (overview_cmp["Total throw-ins"] / overview_cmp["Games"])
-        overview_cmp["Delay per throw-in (s)"] = (overview_cmp["Total delay (s)"] / overview_cmp["Total throw-ins"])
+        overview_cmp = season_round_prefix(
+            params, side=side_filter2, third=third_filter2, outlier="No",
+        ).metrics(sel_min2, sel_max2, [
+            "Games", "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
+            "Thrown into box", "% thrown into box", "Thrown into box per game",
+            "Retained throw-ins", "Retention %", "Retained per game",
+            "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window", "xG ≤window", "xG per ≤window", "xG per game ≤window",
+            "Throw-ins per game", "Delay per throw-in (s)",
+        ], rounded=False, rename={**window_labels(params), **{m: window_label(ti, params) for m, ti in {
+            "Shots ≤window": "TI shots ≤window", "% Shots ≤window": "% TI shots ≤window",
+            "Goals ≤window": "TI goals ≤window", "% Goals ≤window": "% TI goals ≤window",
+            "xG ≤window": "TI xG ≤window", "xG per ≤window": "xG per TI ≤window",
+        }.items()}}).astype({"Team": str})
 
         overview_cmp = overview_cmp.loc[:, ~overview_cmp.columns.duplicated()].copy()
         metric_options = [
@@ -2733,9 +2196,10 @@ def render_throwins_module():
             "Games",
             "Thrown into box", "% thrown into box", "Thrown into box per game",
             "Retained throw-ins", "Retention %", "Retained per game",
-            "TI shots ≤30s", "% TI shots ≤30s", "TI goals ≤30s", "% TI goals ≤30s",
-            "TI xG ≤30s", "xG per TI ≤30s", "xG per game ≤30s",
+            "TI shots ≤window", "% TI shots ≤window", "TI goals ≤window", "% TI goals ≤window",
+            "TI xG ≤window", "xG per TI ≤window", "xG per game ≤window",
         ]
+        metric_options = [window_label(m, params) for m in metric_options]
         for col in metric_options:
             if col in overview_cmp.columns:
                 overview_cmp[col] = pd.to_numeric(overview_cmp[col], errors="coerce")
@@ -2835,108 +2299,24 @@ def render_throwins_module():
             with filter_card("Thrown into the box"):
                 box_i = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="ind_box")
         with c4:
-            with filter_card("Ball retention (≥7s)"):
+            with filter_card(f"Ball retention (≥{params.retention_s:g}s)"):
                 ret_i = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="ind_ret")
         with c5:
-            with filter_card("Shot ≤30s"):
+            with filter_card(f"Shot ≤{params.shot_window_s}s"):
                 shot_i = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="ind_shot")
         with c6:
-            with filter_card("Goal ≤30s"):
+            with filter_card(f"Goal ≤{params.shot_window_s}s"):
                 goal_i = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="ind_goal")
 
-        selected_rounds_i = {r for r in range(sel_min_i, sel_max_i + 1)}
-        round_dirs_i = [p for p in round_dirs_all if _round_num_ind(p) in selected_rounds_i]
-
-        all_rows_i = []
-        for round_dir in round_dirs_i:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path), str(f7_path) if f7_path else None, str(f70_path) if f70_path else None, SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    df_throw["Round"] = round_dir.name
-                    df_throw["Match"] = r["Match"]
-                    all_rows_i.append(df_throw)
-
-        if not all_rows_i:
+        choices_i = dict(side=side_i, third=third_i, box=box_i, retention=ret_i, shot=shot_i, goal=goal_i)
+        if season_round_prefix(params).total(sel_min_i, sel_max_i) == 0:
             st.info("Ingen indkast i det valgte interval.")
             st.stop()
-
-        indiv_df = pd.concat(all_rows_i, ignore_index=True)
-
-        if "Thrown into the box" not in indiv_df.columns and "End in box" in indiv_df.columns:
-            indiv_df["Thrown into the box"] = indiv_df["End in box"]
-        if "Taker" not in indiv_df.columns:
-            indiv_df["Taker"] = indiv_df.get("Taker id", "").fillna("").replace({"": "Unknown"})
-        if "Distance (m)" not in indiv_df.columns:
-            indiv_df["Distance (m)"] = None
-
-        if side_i != "All":
-            indiv_df = indiv_df[indiv_df["Side"] == side_i]
-        if third_i != "All":
-            indiv_df = indiv_df[indiv_df["Third"] == third_i]
-        if box_i != "All":
-            indiv_df = indiv_df[indiv_df["Thrown into the box"] == (box_i == "Yes")]
-        if ret_i != "All":
-            indiv_df = indiv_df[indiv_df["Ball retention"] == (ret_i == "Retained")]
-        if shot_i != "All":
-            indiv_df = indiv_df[indiv_df["Shot in 30s"] == (shot_i == "Yes")]
-        if goal_i != "All":
-            indiv_df = indiv_df[indiv_df["Goal in 30s"] == (goal_i == "Yes")]
-
-        if indiv_df.empty:
+        if season_round_prefix(params, **choices_i).total(sel_min_i, sel_max_i) == 0:
             st.info("Ingen indkast efter valgte filtre.")
             st.stop()
 
-        indiv_df["Delay (s)"] = pd.to_numeric(indiv_df["Delay (s)"], errors="coerce")
-        indiv_df["Shot xG (30s)"] = pd.to_numeric(indiv_df["Shot xG (30s)"], errors="coerce").fillna(0.0)
-        indiv_df["Distance (m)"] = pd.to_numeric(indiv_df["Distance (m)"], errors="coerce")
-        indiv_df["is_outlier"] = _mark_outliers(indiv_df)
-        indiv_used = indiv_df[~indiv_df["is_outlier"]].copy()
-        indiv_used["is_FCK"] = indiv_used["Team"].apply(lambda t: t in TEAM_ALIASES)
-
-        gpi = indiv_used.groupby(["Team", "Taker"], dropna=False)
-        games_pi = gpi["Match"].nunique().rename("Games")
-        tot_ti_pi = gpi.size().rename("Total throw-ins")
-        avg_delay_pi = gpi["Delay (s)"].mean().round(2).rename("Avg. delay (s)")
-        lt7_pi = gpi.apply(lambda x: (pd.to_numeric(x["Delay (s)"], errors="coerce") < 7).sum()).rename("Throw-ins <7s")
-        total_delay_pi = gpi["Delay (s)"].sum().round(1).rename("Total delay (s)")
-
-        box_cnt_pi = gpi.apply(lambda x: x["Thrown into the box"].fillna(False).sum()).rename("Thrown into box")
-        box_pct_pi = ((box_cnt_pi / tot_ti_pi) * 100).round(1).rename("% thrown into box")
-
-        ret_cnt_pi = gpi.apply(lambda x: x["Ball retention"].fillna(False).sum()).rename("Retained throw-ins")
-        ret_pct_pi = ((ret_cnt_pi / tot_ti_pi) * 100).round(1).rename("Retention %")
-
-        shot_cnt_pi = gpi.apply(lambda x: x["Shot in 30s"].fillna(False).sum()).rename("Shots ≤30s")
-        shot_pct_pi = ((shot_cnt_pi / tot_ti_pi) * 100).round(1).rename("% Shots ≤30s")
-        goal_cnt_pi = gpi.apply(lambda x: x["Goal in 30s"].fillna(False).sum()).rename("Goals ≤30s")
-        goal_pct_pi = ((goal_cnt_pi / tot_ti_pi) * 100).round(1).rename("% Goals ≤30s")
-        xg_sum_pi   = gpi["Shot xG (30s)"].sum().round(2).rename("xG ≤30s")
-        xg_per_ti_pi = (xg_sum_pi / tot_ti_pi).round(3).rename("xG per ≤30s")
-
-        avg_dist_pi  = gpi["Distance (m)"].mean().round(2).rename("Avg. distance (m)")
-        max_dist_pi  = gpi["Distance (m)"].max().round(2).rename("Max distance (m)")
-        sum_dist_pi  = gpi["Distance (m)"].sum().round(1).rename("Total distance (m)")
-
-        overview_pi = pd.concat(
-            [games_pi, tot_ti_pi, avg_delay_pi, lt7_pi, total_delay_pi,
-             box_cnt_pi, box_pct_pi,
-             ret_cnt_pi, ret_pct_pi,
-             shot_cnt_pi, shot_pct_pi, goal_cnt_pi, goal_pct_pi,
-             xg_sum_pi, xg_per_ti_pi,
-             avg_dist_pi, max_dist_pi, sum_dist_pi],
-            axis=1
-        ).reset_index().rename(columns={"Team": "Team", "Taker": "Player"})
-        overview_pi["Label"] = overview_pi["Player"].fillna("Unknown") + " — " + overview_pi["Team"].fillna("Unknown")
-        overview_pi["is_FCK"] = overview_pi["Team"].apply(lambda t: t in TEAM_ALIASES)
+        overview_pi = player_throwin_table(params, sel_min_i, sel_max_i, **choices_i).rename(columns=window_labels(params))
 
         # --- NYT: slider for minimum antal kast pr. spiller ---
         max_ti = int(overview_pi["Total throw-ins"].max()) if not overview_pi.empty else 1
@@ -2958,12 +2338,13 @@ def render_throwins_module():
         import altair as alt
         metric_ind = st.selectbox(
             "Choose metric",
-            ["Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
-             "Thrown into box", "% thrown into box",
-             "Retained throw-ins", "Retention %",
-             "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-             "xG ≤30s", "xG per ≤30s", "Games",
-             "Avg. distance (m)", "Max distance (m)", "Total distance (m)"],
+            [window_label(m, params) for m in [
+                "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s", "Total delay (s)",
+                "Thrown into box", "% thrown into box",
+                "Retained throw-ins", "Retention %",
+                "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window",
+                "xG ≤window", "xG per ≤window", "Games",
+                "Avg. distance (m)", "Max distance (m)", "Total distance (m)"]],
             index=0
         )
 
@@ -3040,11 +2421,11 @@ def render_throwins_module():
             show_cols_pi = ["Player", "Team", "Games", "Total throw-ins", "Avg. delay (s)", "Throw-ins <7s",
                             "Thrown into box", "% thrown into box",
                             "Retained throw-ins", "Retention %",
-                            "Shots ≤30s", "% Shots ≤30s", "Goals ≤30s", "% Goals ≤30s",
-                            "xG ≤30s", "xG per ≤30s",
+                            "Shots ≤window", "% Shots ≤window", "Goals ≤window", "% Goals ≤window",
+                            "xG ≤window", "xG per ≤window",
                             "Avg. distance (m)", "Max distance (m)", "Total distance (m)",
                             "Total delay (s)"]
-            show_cols_pi = [c for c in show_cols_pi if c in overview_pi_sorted.columns]
+            show_cols_pi = [c for c in (window_label(m, params) for m in show_cols_pi) if c in overview_pi_sorted.columns]
             st.dataframe(overview_pi_sorted[show_cols_pi], hide_index=True)
 
     # ---- Spillerikoner ---------------------------------------------------
@@ -3056,30 +2437,11 @@ def render_throwins_module():
             st.info("Ingen runder fundet.")
             st.stop()
 
-        all_rows_icons = []
-        for round_dir in round_dirs_all:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"])  if r["F7 file"]  != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                df_throw = parse_throwin_delays_from_f24_cached(
-                    str(f24_path), str(f7_path) if f7_path else None, str(f70_path) if f70_path else None, SCHEMA_VER
-                )
-                if not df_throw.empty:
-                    all_rows_icons.append(df_throw)
-
-        if not all_rows_icons:
+        icons_df = rounds_view(season_throwins(params), round_dirs_all)
+        if icons_df.empty:
             st.info("Ingen indkast fundet.")
             st.stop()
 
-        icons_df = pd.concat(all_rows_icons, ignore_index=True)
-
-        if "Taker" not in icons_df.columns:
-            icons_df["Taker"] = icons_df.get("Taker id", "").fillna("").replace({"": "Unknown"})
         icons_df["Team"] = icons_df["Team"].fillna("Unknown")
         icons_df["Taker"] = icons_df["Taker"].fillna("Unknown")
 
@@ -3091,15 +2453,11 @@ def render_throwins_module():
         if team_sel != "(Alle)":
             df_filt = df_filt[df_filt["Team"] == team_sel]
 
-        g = df_filt.groupby(["Team", "Taker"], dropna=False)
-        meta = g.agg(
-            ti=("Taker", "size"),
-            avg_delay=("Delay (s)", lambda s: pd.to_numeric(s, errors="coerce").mean()),
-            thrown_box=("Thrown into the box", lambda s: pd.Series(s).fillna(False).sum())
-        ).reset_index()
-
-        meta["avg_delay"] = pd.to_numeric(meta["avg_delay"], errors="coerce").round(2)
-        meta["thrown_box"] = pd.to_numeric(meta["thrown_box"], errors="coerce").astype("Int64")
+        meta = aggregate_metrics(
+            df_filt, ["Team", "Taker"], ["Total throw-ins", "Avg. delay (s)", "Thrown into box"],
+            rename={"Total throw-ins": "ti", "Avg. delay (s)": "avg_delay", "Thrown into box": "thrown_box"},
+        ).astype({"Team": str, "Taker": str})
+        meta["thrown_box"] = meta["thrown_box"].astype("Int64")
 
         if meta.empty:
             st.info("Ingen spillere matcher filtrene.")
@@ -3183,7 +2541,8 @@ def render_throwins_module():
                     str(f24_path),
                     str(f7_path) if f7_path else None,
                     str(f70_path) if f70_path else None,
-                    SCHEMA_VER
+                    SCHEMA_VER,
+                    params,
                 )
 
                 if "Thrown into the box" not in df_throw.columns and "End in box" in df_throw.columns:
@@ -3196,8 +2555,8 @@ def render_throwins_module():
                     ("Seq events", None), ("Seq passes", None), ("Seq duration (s)", None),
                     ("Seq ends with shot", None), ("Seq last type", None), ("Seq last x", None), ("Seq last y", None),
                     ("Ball retention", False),
-                    ("Shot in 30s", False), ("Goal in 30s", False),
-                    ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (30s)", 0.0),
+                    ("Shot in window", False), ("Goal in window", False),
+                    ("Shot time from TI (s)", None), ("Shot x", None), ("Shot y", None), ("Shot xG (window)", 0.0),
                     ("Distance (m)", None),
                 ]:
                     if col not in df_throw.columns:
@@ -3218,7 +2577,7 @@ def render_throwins_module():
                     df_throw = df_throw.sort_values("_sort").drop(columns=["_sort"]).reset_index(drop=True)
                     df_throw["Throw-in #"] = range(1, len(df_throw) + 1)
                     df_throw["is_FCK"] = df_throw["Team"].apply(lambda t: t in TEAM_ALIASES)
-                    df_throw["is_outlier"] = _mark_outliers(df_throw, OUTLIER_THR)
+                    df_throw["is_outlier"] = _mark_outliers(df_throw, params.outlier_s)
 
                     # ---------- FILTERS ABOVE GRAPH ----------
                     c1, c2, c3, c4, c5, c6 = st.columns(6)
@@ -3233,28 +2592,19 @@ def render_throwins_module():
                         with filter_card("Thrown into the box"):
                             thrownbox_tog = st.radio("   ", ["All", "Yes", "No"], horizontal=False, key="data_thrownbox_filter")
                     with c4:
-                        with filter_card("Ball retention (≥7s)"):
+                        with filter_card(f"Ball retention (≥{params.retention_s:g}s)"):
                             retention_tog = st.radio("    ", ["All", "Retained", "Lost"], horizontal=False, key="data_retention_filter")
                     with c5:
-                        with filter_card("Shot ≤30s"):
-                            shot30_tog = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="data_shot30_filter")
+                        with filter_card(f"Shot ≤{params.shot_window_s}s"):
+                            shot_tog = st.radio("     ", ["All", "Yes", "No"], horizontal=False, key="data_shot_filter")
                     with c6:
-                        with filter_card("Goal ≤30s"):
-                            goal30_tog = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="data_goal30_filter")
-
-                    df_plot = df_throw.copy()
-                    if side_tog != "All":
-                        df_plot = df_plot[df_plot["Side"] == side_tog]
-                    if third_tog != "All":
-                        df_plot = df_plot[df_plot["Third"] == third_tog]
-                    if thrownbox_tog != "All":
-                        df_plot = df_plot[df_plot["Thrown into the box"] == (thrownbox_tog == "Yes")]
-                    if retention_tog != "All":
-                        df_plot = df_plot[df_plot["Ball retention"] == (retention_tog == "Retained")]
-                    if shot30_tog != "All":
-                        df_plot = df_plot[df_plot["Shot in 30s"] == (shot30_tog == "Yes")]
-                    if goal30_tog != "All":
-                        df_plot = df_plot[df_plot["Goal in 30s"] == (goal30_tog == "Yes")]
+                        with filter_card(f"Goal ≤{params.shot_window_s}s"):
+                            goal_tog = st.radio("      ", ["All", "Yes", "No"], horizontal=False, key="data_goal_filter")
+
+                    df_plot = df_throw[throwin_mask(
+                        df_throw, side=side_tog, third=third_tog, box=thrownbox_tog,
+                        retention=retention_tog, shot=shot_tog, goal=goal_tog,
+                    )]
 
                     st.subheader(f"Throw ins – {match_choice}")
 
@@ -3327,12 +2677,12 @@ def render_throwins_module():
                             "Distance (m)",
                             "Thrown into the box", "Ball retention",
                             "Seq events", "Seq passes", "Seq duration (s)", "Seq ends with shot", "Seq last type",
-                            "Shot in 30s", "Goal in 30s", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (30s)",
+                            "Shot in window", "Goal in window", "Shot time from TI (s)", "Shot x", "Shot y", "Shot xG (window)",
                             "Game date", "Throw-in #", "is_outlier", "is_FCK",
                             "throwin_event_id", "throwin_team_id", "throwin_time_s", "throwin_period",
                         ]
                         show_cols = [c for c in display_cols if c in df_plot.columns]
-                        st.dataframe(df_plot[show_cols], hide_index=True, height=380)
+                        st.dataframe(df_plot[show_cols].rename(columns=window_labels(params)), hide_index=True, height=380)
 
 
 def render_xg_module():
@@ -3366,44 +2716,29 @@ def render_xg_module():
         sel_rounds = {r for r in range(sel_min, sel_max + 1)}
         round_dirs = [p for p in round_dirs_all if _round_num(p) in sel_rounds]
 
-        all_rows = []
-        for round_dir in round_dirs:
-            rows = collect_round_data(round_dir)
-            if not rows:
-                continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"]) if r["F7 file"] != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                if not f24_path.exists() or not (f70_path and f70_path.exists()):
-                    continue
+        jobs = [j for j in match_jobs(round_dirs)
+                if Path(j["f24"]).exists() and j["f70"] and Path(j["f70"]).exists()]
+        prefetch_match_bundles(jobs, projection="analysis")
 
-                name_map, _ = build_team_maps_from_f7(round_dir / r["F7 file"]) if r["F7 file"] != "(mangler)" else ({}, {})
-                xg_map = build_xg_map_from_f70(f70_path)
-
-                try:
-                    root = ET.parse(str(f24_path)).getroot()
-                except Exception:
-                    continue
+        all_rows = []
+        for j in jobs:
+            bundle = load_match_bundle(j["f24"], j["f7"], j["f70"], SCHEMA_VER, projection="analysis")
+            xg_map = bundle.xg
 
-                for game in root.findall(".//Game"):
-                    for ev in game.findall("Event"):
-                        if ev.attrib.get("type_id") not in {"13", "14", "15", "16"}:
-                            continue
-                        if (not include_pen_tot) and _xml_event_has_qualifier(ev, 9):
-                            continue
-
-                        ev_id = ev.attrib.get("id")
-                        team_id = ev.attrib.get("team_id")
-                        team = name_map.get(team_id, team_id)
-                        xg = float(xg_map.get(str(ev_id), 0.0))
-                        all_rows.append({
-                            "Round": round_dir.name,
-                            "Match": r["Match"],
-                            "Team": team,
-                            "xG": xg
-                        })
+            ev = bundle.events
+            if ev is None:
+                continue
+            shots = ev.is_shot
+            if not include_pen_tot:
+                shots &= ~ev.qualifier_mask(QUALIFIER_PENALTY)
+            for k in np.flatnonzero(shots).tolist():
+                xg = float(xg_map.get(str(ev.event_id[k]), 0.0))
+                all_rows.append({
+                    "Round": j["Round"],
+                    "Match": j["Match"],
+                    "Team": ev.team_names[ev.team[k]],
+                    "xG": xg
+                })
 
         if not all_rows:
             st.info("Ingen xG-data fundet for det valgte interval.")
@@ -3473,159 +2808,30 @@ def render_xg_module():
         sel_rounds_c = {r for r in range(sel_min_c, sel_max_c + 1)}
         round_dirs_c = [p for p in round_dirs_all if _round_num(p) in sel_rounds_c]
 
-        # NYT (kun til tælling af ALL chains, ikke til at ændre din visualisering):
-        def _assign_chain_ids(seq, gap_s: int):
-            cid = -1
-            last = None
-            for e in seq:
-                if last is None:
-                    cid += 1
-                else:
-                    boundary = (
-                        (e["team_id"] != last["team_id"])
-                        or (e["period_id"] != last["period_id"])
-                        or ((e["time_s"] - last["time_s"]) > gap_s)
-                    )
-                    if boundary:
-                        cid += 1
-                e["chain_local_id"] = cid
-                last = e
-            return seq
-
-        # Samler (som før) kæder MED skud til xGChain + Contribs (with shot)
-        # Samler (nyt) bidrag i ALLE kæder til en separat tælling pr. (Team, Player)
-        from collections import defaultdict
-        all_chain_contribs = defaultdict(int)  # (team_name, player_name) -> antal events i ALLE kæder
-
-        def _build_seq_events_for_all(game, name_map, side_map, xg_map, include_pen: bool):
-            _, events = _parse_game_events(game, team_name_map=name_map, team_side_map=side_map)
-            seq = []
-            for e in events:
-                if not (_is_pass(e) or _is_shot(e)):
-                    continue
-                q = e.get("qualifiers", set())
-                etype = "shot" if _is_shot(e) else "pass"
-                # ekskluderede straffe bliver behandlet som "pass" (ingen xG, ingen shot-flag)
-                is_pen = (9 in q)
-                if etype == "shot" and (not include_pen) and is_pen:
-                    etype = "pass"
-                seq.append({
-                    "team_id":   e["team_id"],
-                    "team_name": e["team_name"],
-                    "player_id": e["player_id"],
-                    "player_name": e.get("player_name") or e["player_id"],
-                    "period_id": e["period_id"],
-                    "time_s":    e["time_s"],
-                    "event_id":  e["event_id"],
-                    "etype":     etype,
-                })
-            return seq
+        jobs_c = [j for j in match_jobs(round_dirs_c)
+                  if Path(j["f24"]).exists() and j["f7"] and Path(j["f7"]).exists()
+                  and j["f70"] and Path(j["f70"]).exists()]
+        prefetch_match_bundles(jobs_c, projection="analysis")
 
-        chain_rows = []
-        for round_dir in round_dirs_c:
-            rows = collect_round_data(round_dir)
-            if not rows:
+        chain_parts, all_parts = [], []
+        for job in jobs_c:
+            bundle = load_match_bundle(job["f24"], job["f7"], job["f70"], SCHEMA_VER, projection="analysis")
+            if not bundle.ok:
                 continue
-            df_round = pd.DataFrame(rows)
-            for _, r in df_round.iterrows():
-                f24_path = round_dir / r["F24 file"]
-                f7_path  = (round_dir / r["F7 file"]) if r["F7 file"] != "(mangler)" else None
-                f70_path = (round_dir / r["F70 file"]) if r["F70 file"] != "(mangler)" else None
-                if not f24_path.exists() or not (f7_path and f7_path.exists()) or not (f70_path and f70_path.exists()):
-                    continue
-
-                name_map, side_map = build_team_maps_from_f7(f7_path)
-                player_map = build_player_map_from_f7(f7_path)
-                xg_map = build_xg_map_from_f70(f70_path)
-
-                try:
-                    root = ET.parse(str(f24_path)).getroot()
-                except Exception:
-                    continue
+            for _, ev in bundle.games:
+                contribs, everyone = xg_chain_frames(
+                    ev, bundle.players, bundle.xg, include_pen=include_pen_chain,
+                    max_gap_s=max_gap_s, last_pass_only=include_last_pass_only,
+                )
+                all_parts.append(everyone)
+                if not contribs.empty:
+                    chain_parts.append(contribs.assign(Round=job["Round"], Match=job["Match"]))
 
-                for game in root.findall(".//Game"):
-                    # --- NYT: tælle ALL chains (uden at røre din visualisering)
-                    seq_all = _build_seq_events_for_all(game, name_map, side_map, xg_map, include_pen_chain)
-                    if seq_all:
-                        # udfyld spillernavne
-                        for e in seq_all:
-                            e["player_name"] = player_map.get(e["player_id"], e["player_name"]) or "Unknown"
-                        seq_all = _assign_chain_ids(seq_all, max_gap_s)
-                        # for hver chain: tæl ALLE events som bidrag
-                        for e in seq_all:
-                            key = (e["team_name"], e["player_name"])
-                            all_chain_contribs[key] += 1
-
-                    # --- Din oprindelige kæde-bygning fra skud baglæns (med skud)
-                    _, events = _parse_game_events(game, team_name_map=name_map, team_side_map=side_map)
-                    seq_events = [e for e in events if _is_pass(e) or _is_shot(e)]
-
-                    for i, ev in enumerate(seq_events):
-                        if not _is_shot(ev):
-                            continue
-                        if (not include_pen_chain) and (9 in ev.get("qualifiers", set())):
-                            continue
-
-                        shot_xg = float(xg_map.get(str(ev.get("event_id","")), 0.0))
-                        if shot_xg <= 0:
-                            continue
-
-                        # Din eksisterende backward chain
-                        idxs = []
-                        def _backward_chain(seq_events, shot_idx, max_gap: int = 10):
-                            chain = [shot_idx]
-                            team = seq_events[shot_idx]["team_id"]
-                            period = seq_events[shot_idx]["period_id"]
-                            cur = shot_idx
-                            while cur - 1 >= 0:
-                                prev = seq_events[cur - 1]
-                                if prev["period_id"] != period: break
-                                if prev["team_id"]  != team:    break
-                                if (seq_events[cur]["time_s"] - prev["time_s"]) > max_gap: break
-                                if not (_is_pass(prev) or _is_shot(prev)): break
-                                chain.append(cur - 1)
-                                cur -= 1
-                            chain.sort()
-                            return chain
-                        idxs = _backward_chain(seq_events, i, max_gap=max_gap_s)
-                        if include_last_pass_only:
-                            cand = [j for j in idxs if _is_pass(seq_events[j])]
-                            idxs = [cand[-1], i] if cand else [i]
-
-                                                # NEW: one credit per player per chain (dedupe within the chain)
-                        unique_contributors = set()
-
-                        # tilføj alle i kæden (afleveringer + evt. skud hvis med i idxs)
-                        for j in idxs:
-                            plid  = seq_events[j]["player_id"]
-                            team  = seq_events[j]["team_name"]
-                            pname = player_map.get(plid, plid) or "Unknown"
-                            unique_contributors.add((team, pname))
-
-                        # sikre at skytten altid er med (hvis ikke allerede)
-                        shooter_plid  = ev["player_id"]
-                        shooter_team  = ev["team_name"]
-                        shooter_pname = player_map.get(shooter_plid, shooter_plid) or "Unknown"
-                        unique_contributors.add((shooter_team, shooter_pname))
-
-                        # én række pr. (Team, Player) i denne skudkæde
-                        for (team, pname) in unique_contributors:
-                            chain_rows.append({
-                                "Round": round_dir.name,
-                                "Match": r["Match"],
-                                "Team": team,
-                                "Player": pname,
-                                "EventID": ev.get("event_id",""),
-                                "ShotEventID": ev.get("event_id",""),
-                                "xGChain": shot_xg
-                            })
-
-
-        if not chain_rows:
+        if not chain_parts:
             st.info("Ingen xG Chain data fundet for de valgte runder.")
             st.stop()
 
-        df_chain = pd.DataFrame(chain_rows)
+        df_chain = pd.concat(chain_parts, ignore_index=True)
 
         # Aggreger pr. spiller (bevar dine navne/kolonner)
         g_player_all = (
@@ -3637,9 +2843,10 @@ def render_xg_module():
         g_player_all["xG per chain"] = (g_player_all["xGChain"] / g_player_all["Contribs"]).replace([np.inf, -np.inf], np.nan)
 
         # NYT: tilføj tælling for ALLE kæder (inkl. uden skud) som nævner
-        def _all_contrib_lookup(row):
-            return all_chain_contribs.get((row["Team"], row["Player"]), 0)
-        g_player_all["AllChainContribs"] = g_player_all.apply(_all_contrib_lookup, axis=1)
+        all_chain_contribs = pd.concat(all_parts, ignore_index=True).groupby(["Team", "Player"]).size()
+        g_player_all["AllChainContribs"] = all_chain_contribs.reindex(
+            pd.MultiIndex.from_frame(g_player_all[["Team", "Player"]]), fill_value=0
+        ).to_numpy()
         g_player_all["xG per chain (all)"] = (
             g_player_all["xGChain"] / g_player_all["AllChainContribs"].replace(0, np.nan)
         ).replace([np.inf, -np.inf], np.nan)
@@ -3726,11 +2933,13 @@ def render_xg_module():
         st.altair_chart(chart_pl, use_container_width=True)
 
 
-
 # =========================
 # Router
 # =========================
-if module.startswith("Throw-ins"):
-    render_throwins_module()
-elif module.startswith("xG"):
-    render_xg_module()
+try:
+    if module.startswith("Throw-ins"):
+        render_throwins_module()
+    elif module.startswith("xG"):
+        render_xg_module()
+finally:
+    save_fingerprints()